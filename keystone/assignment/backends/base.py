@@ -293,6 +293,69 @@ class AssignmentDriverV9(AssignmentDriverBase):
         """Delete all assignments for a domain."""
         raise exception.NotImplemented()
 
+    # NOTE: The methods below maintain an optional store of effective role
+    # assignments, used if [assignment] materialize_effective_assignments is
+    # enabled. Drivers that do not support it may leave them unimplemented.
+
+    def get_effective_role_ids(self, user_id, target_id, is_domain):
+        """Get the stored effective role IDs of a user on a project or domain.
+
+        :returns: a list of role IDs, or None if the roles of the user on the
+                  target are not stored.
+
+        """
+        raise exception.NotImplemented()  # pragma: no cover
+
+    def begin_effective_role_ids(self, user_id, target_id, is_domain):
+        """Claim the storing of the effective roles of a user on a target.
+
+        :returns: a token to pass to store_effective_role_ids, or None if the
+                  roles are already stored or being stored by someone else.
+
+        """
+        raise exception.NotImplemented()  # pragma: no cover
+
+    def store_effective_role_ids(self, user_id, target_id, is_domain, token,
+                                 role_ids):
+        """Store the effective role IDs of a user on a target.
+
+        The role IDs are not stored if they have been invalidated since
+        begin_effective_role_ids returned `token`.
+
+        :returns: True if the role IDs were stored.
+
+        """
+        raise exception.NotImplemented()  # pragma: no cover
+
+    def invalidate_effective_role_ids(self, user_ids=None, target_ids=None):
+        """Remove stored effective role IDs.
+
+        :param user_ids: remove the role IDs of these users
+        :param target_ids: remove the role IDs on these projects and domains
+
+        If neither is given, all stored role IDs are removed.
+
+        """
+        raise exception.NotImplemented()  # pragma: no cover
+
+    def list_effective_role_ids(self):
+        """List all stored effective role IDs.
+
+        :returns: a dict mapping (user_id, target_id, is_domain) tuples to
+                  lists of role IDs.
+
+        """
+        raise exception.NotImplemented()  # pragma: no cover
+
+    def replace_effective_role_ids(self, effective_role_ids):
+        """Replace all stored effective role IDs.
+
+        :param effective_role_ids: a dict in the format returned by
+                                   list_effective_role_ids.
+
+        """
+        raise exception.NotImplemented()  # pragma: no cover
+
 
 class V9AssignmentWrapperForV8Driver(AssignmentDriverV9):
     """Wrapper class to supported a V8 legacy driver.
@@ -12,12 +12,25 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import datetime
+import uuid
+
+from oslo_utils import timeutils
+import sqlalchemy
+
 from keystone.assignment.backends import base
 from keystone.common import sql
+import keystone.conf
 from keystone import exception
 from keystone.i18n import _
 
 
+CONF = keystone.conf.CONF
+
+# The number of IDs invalidated with each query.
+_INVALIDATE_CHUNK_SIZE = 500
+
+
 class AssignmentType(object):
     USER_PROJECT = 'UserProject'
     GROUP_PROJECT = 'GroupProject'
@@ -290,6 +303,150 @@ class Assignment(base.AssignmentDriverV9):
             )
             q.delete(False)
 
+    def _effective_target_query(self, session, user_id, target_id, is_domain):
+        return session.query(EffectiveAssignmentTarget).filter_by(
+            user_id=user_id, target_id=target_id, is_domain=is_domain)
+
+    def get_effective_role_ids(self, user_id, target_id, is_domain):
+        with sql.session_for_read() as session:
+            query = session.query(
+                EffectiveAssignmentTarget.build_token,
+                EffectiveAssignment.role_id)
+            query = query.outerjoin(EffectiveAssignment, sqlalchemy.and_(
+                EffectiveAssignment.user_id ==
+                EffectiveAssignmentTarget.user_id,
+                EffectiveAssignment.target_id ==
+                EffectiveAssignmentTarget.target_id,
+                EffectiveAssignment.is_domain ==
+                EffectiveAssignmentTarget.is_domain))
+            query = query.filter(
+                EffectiveAssignmentTarget.user_id == user_id,
+                EffectiveAssignmentTarget.target_id == target_id,
+                EffectiveAssignmentTarget.is_domain == is_domain)
+            refs = query.all()
+        if not refs or refs[0].build_token is not None:
+            return None
+        return [ref.role_id for ref in refs if ref.role_id is not None]
+
+    def begin_effective_role_ids(self, user_id, target_id, is_domain):
+        token = uuid.uuid4().hex
+        now = timeutils.utcnow()
+        try:
+            with sql.session_for_write() as session:
+                session.add(EffectiveAssignmentTarget(
+                    user_id=user_id, target_id=target_id,
+                    is_domain=is_domain, build_token=token, created_at=now))
+        except sql.DBDuplicateEntry:
+            return self._reclaim_effective_role_ids(
+                user_id, target_id, is_domain, token, now)
+        return token
+
+    def _reclaim_effective_role_ids(self, user_id, target_id, is_domain,
+                                    token, now):
+        # The roles are being stored by another request, or by one that
+        # failed before completing them. Take over builds that are older than
+        # the timeout, so that a failed build doesn't stop the roles from
+        # ever being stored. If the original build completes after all, its
+        # token no longer matches and its roles are discarded.
+        stale = now - datetime.timedelta(
+            seconds=CONF.assignment.effective_assignment_build_timeout)
+        with sql.session_for_write() as session:
+            query = self._effective_target_query(
+                session, user_id, target_id, is_domain)
+            query = query.filter(
+                EffectiveAssignmentTarget.build_token.isnot(None),
+                sqlalchemy.or_(
+                    EffectiveAssignmentTarget.created_at.is_(None),
+                    EffectiveAssignmentTarget.created_at < stale))
+            if not query.update({'build_token': token, 'created_at': now},
+                                synchronize_session=False):
+                return None
+        return token
+
+    def store_effective_role_ids(self, user_id, target_id, is_domain, token,
+                                 role_ids):
+        with sql.session_for_write() as session:
+            # NOTE: Completing the target row locks it until the role IDs are
+            # committed, so an invalidation that deletes it afterwards also
+            # sees, and deletes, the role IDs. If the row was deleted before,
+            # the role IDs may be stale and are not stored.
+            query = self._effective_target_query(
+                session, user_id, target_id, is_domain)
+            query = query.filter_by(build_token=token)
+            if not query.update({'build_token': None},
+                                synchronize_session=False):
+                return False
+            for role_id in set(role_ids):
+                session.add(EffectiveAssignment(
+                    user_id=user_id, target_id=target_id,
+                    is_domain=is_domain, role_id=role_id))
+        return True
+
+    def invalidate_effective_role_ids(self, user_ids=None, target_ids=None):
+        if user_ids is not None and not user_ids:
+            return
+        if target_ids is not None and not target_ids:
+            return
+        user_id_chunks = _chunks(user_ids)
+        target_id_chunks = _chunks(target_ids)
+        with sql.session_for_write() as session:
+            # Delete the target rows first, see store_effective_role_ids.
+            for model in (EffectiveAssignmentTarget, EffectiveAssignment):
+                for user_id_chunk in user_id_chunks:
+                    for target_id_chunk in target_id_chunks:
+                        query = session.query(model)
+                        if user_id_chunk is not None:
+                            query = query.filter(
+                                model.user_id.in_(user_id_chunk))
+                        if target_id_chunk is not None:
+                            query = query.filter(
+                                model.target_id.in_(target_id_chunk))
+                        query.delete(synchronize_session=False)
+
+    def list_effective_role_ids(self):
+        effective_role_ids = {}
+        with sql.session_for_read() as session:
+            query = session.query(EffectiveAssignmentTarget).filter_by(
+                build_token=None)
+            for ref in query:
+                effective_role_ids[
+                    (ref.user_id, ref.target_id, ref.is_domain)] = []
+            for ref in session.query(EffectiveAssignment):
+                key = (ref.user_id, ref.target_id, ref.is_domain)
+                if key in effective_role_ids:
+                    effective_role_ids[key].append(ref.role_id)
+        return effective_role_ids
+
+    def replace_effective_role_ids(self, effective_role_ids):
+        now = timeutils.utcnow()
+        with sql.session_for_write() as session:
+            session.query(EffectiveAssignmentTarget).delete(
+                synchronize_session=False)
+            session.query(EffectiveAssignment).delete(
+                synchronize_session=False)
+            for (user_id, target_id, is_domain), role_ids in (
+                    effective_role_ids.items()):
+                session.add(EffectiveAssignmentTarget(
+                    user_id=user_id, target_id=target_id,
+                    is_domain=is_domain, build_token=None, created_at=now))
+                for role_id in set(role_ids):
+                    session.add(EffectiveAssignment(
+                        user_id=user_id, target_id=target_id,
+                        is_domain=is_domain, role_id=role_id))
+
+
+def _chunks(ids):
+    """Split a list of IDs into lists small enough for an IN clause.
+
+    :returns: the lists of IDs, or [None] if `ids` is None
+
+    """
+    if ids is None:
+        return [None]
+    ids = list(ids)
+    return [ids[i:i + _INVALIDATE_CHUNK_SIZE]
+            for i in range(0, len(ids), _INVALIDATE_CHUNK_SIZE)]
+
 
 class RoleAssignment(sql.ModelBase, sql.DictBase):
     __tablename__ = 'assignment'
@@ -317,3 +474,41 @@ class RoleAssignment(sql.ModelBase, sql.DictBase):
         parent implementation is not applicable.
         """
         return dict(self.items())
+
+
+class EffectiveAssignmentTarget(sql.ModelBase, sql.DictBase):
+    """A user and target whose effective role assignments are stored.
+
+    The row is created with a `build_token` while the roles are computed, and
+    the token is cleared once they have been stored as EffectiveAssignments.
+    `created_at` is when the current build started, so that builds that never
+    complete can be taken over.
+
+    """
+
+    __tablename__ = 'effective_assignment_target'
+    attributes = ['user_id', 'target_id', 'is_domain', 'build_token',
+                  'created_at']
+    user_id = sql.Column(sql.String(64), nullable=False)
+    target_id = sql.Column(sql.String(64), nullable=False)
+    is_domain = sql.Column(sql.Boolean, nullable=False)
+    build_token = sql.Column(sql.String(64), nullable=True)
+    created_at = sql.Column(sql.DateTime, nullable=True)
+    __table_args__ = (
+        sql.PrimaryKeyConstraint('user_id', 'target_id', 'is_domain'),
+        sql.Index('ix_effective_assignment_target_target_id', 'target_id'),
+    )
+
+
+class EffectiveAssignment(sql.ModelBase, sql.DictBase):
+    __tablename__ = 'effective_assignment'
+    attributes = ['user_id', 'target_id', 'is_domain', 'role_id']
+    user_id = sql.Column(sql.String(64), nullable=False)
+    target_id = sql.Column(sql.String(64), nullable=False)
+    is_domain = sql.Column(sql.Boolean, nullable=False)
+    role_id = sql.Column(sql.String(64), nullable=False)
+    __table_args__ = (
+        sql.PrimaryKeyConstraint('user_id', 'target_id', 'is_domain',
+                                 'role_id'),
+        sql.Index('ix_effective_assignment_target_id', 'target_id'),
+    )
@@ -876,6 +876,12 @@ class RoleAssignmentV3(controller.V3Controller):
             msg = _('Specify a user or group, not both')
             raise exception.ValidationError(msg)
 
+    def _assert_no_marker(self, marker):
+        if marker is not None:
+            msg = _('Role assignments cannot be listed starting after a '
+                    'marker')
+            raise exception.ValidationError(msg)
+
     def _list_role_assignments(self, request, filters, include_subtree=False):
         """List role assignments to user and groups on domains and projects.
 
@@ -898,8 +904,12 @@ class RoleAssignmentV3(controller.V3Controller):
         As a role assignment contains only one actor and one target, providing
         both user and group ids or domain and project ids is invalid as well.
 
+        Role assignments have no ID to page by, so a marker is rejected.
+
         """
         params = request.params
+        self._assert_no_marker(params.get('marker'))
+
         effective = 'effective' in params and (
             self.query_filter_is_true(params['effective']))
         include_names = ('include_names' in params and
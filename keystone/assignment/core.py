@@ -14,6 +14,7 @@
 
 """Main entry point into the Assignment service."""
 
+import collections
 import copy
 
 from oslo_cache import core as oslo_cache
@@ -49,6 +50,12 @@ MEMOIZE_COMPUTED_ASSIGNMENTS = cache.get_memoization_decorator(
     region=COMPUTED_ASSIGNMENTS_REGION)
 
 
+def _invalidate_computed_assignments():
+    COMPUTED_ASSIGNMENTS_REGION.invalidate()
+    notifications.Audit.internal(
+        notifications.INVALIDATE_COMPUTED_ASSIGNMENTS, None)
+
+
 @notifications.listener
 @dependency.provider('assignment_api')
 @dependency.requires('credential_api', 'identity_api', 'resource_api',
@@ -112,10 +119,7 @@ class Manager(manager.Manager):
         self.driver.delete_domain_assignments(domain_id)
 
     def _get_group_ids_for_user_id(self, user_id):
-        # TODO(morganfainberg): Implement a way to get only group_ids
-        # instead of the more expensive to_dict() call for each record.
-        return [x['id'] for
-                x in self.identity_api.list_groups_for_user(user_id)]
+        return self.identity_api.list_group_ids_for_user(user_id)
 
     def list_user_ids_for_project(self, tenant_id):
         self.resource_api.get_project(tenant_id)
@@ -126,8 +130,7 @@ class Manager(manager.Manager):
 
     def _list_parent_ids_of_project(self, project_id):
         if CONF.os_inherit.enabled:
-            return [x['id'] for x in (
-                self.resource_api.list_project_parents(project_id))]
+            return self.resource_api.list_project_parent_ids(project_id)
         else:
             return []
 
@@ -145,10 +148,10 @@ class Manager(manager.Manager):
 
         """
         self.resource_api.get_project(tenant_id)
-        assignment_list = self.list_role_assignments(
-            user_id=user_id, project_id=tenant_id, effective=True)
-        # Use set() to process the list to remove any duplicates
-        return list(set([x['role_id'] for x in assignment_list]))
+        return self._get_effective_role_ids(
+            user_id, tenant_id, False,
+            lambda: self.list_role_assignments(
+                user_id=user_id, project_id=tenant_id, effective=True))
 
     @MEMOIZE_COMPUTED_ASSIGNMENTS
     def get_roles_for_user_and_domain(self, user_id, domain_id):
@@ -159,10 +162,103 @@ class Manager(manager.Manager):
 
         """
         self.resource_api.get_domain(domain_id)
-        assignment_list = self.list_role_assignments(
-            user_id=user_id, domain_id=domain_id, effective=True)
-        # Use set() to process the list to remove any duplicates
-        return list(set([x['role_id'] for x in assignment_list]))
+        return self._get_effective_role_ids(
+            user_id, domain_id, True,
+            lambda: self.list_role_assignments(
+                user_id=user_id, domain_id=domain_id, effective=True))
+
+    def _get_effective_role_ids(self, user_id, target_id, is_domain,
+                                list_assignments):
+        """Get the role IDs of a user's effective assignments on a target.
+
+        If `[assignment] materialize_effective_assignments` is enabled, the
+        role IDs are read from the driver's store, and `list_assignments` is
+        only called to fill it when they have not been stored yet.
+
+        """
+        def compute_role_ids():
+            # Use set() to process the list to remove any duplicates
+            return list(set([x['role_id'] for x in list_assignments()]))
+
+        if not CONF.assignment.materialize_effective_assignments:
+            return compute_role_ids()
+        try:
+            role_ids = self.driver.get_effective_role_ids(
+                user_id, target_id, is_domain)
+            if role_ids is not None:
+                return role_ids
+            token = self.driver.begin_effective_role_ids(
+                user_id, target_id, is_domain)
+        except exception.NotImplemented:
+            return compute_role_ids()
+        role_ids = compute_role_ids()
+        if token is not None:
+            self.driver.store_effective_role_ids(
+                user_id, target_id, is_domain, token, role_ids)
+        return role_ids
+
+    def invalidate_effective_role_ids(self, user_ids=None, target_ids=None,
+                                      group_id=None):
+        """Remove stored effective role IDs that a change could affect.
+
+        :param user_ids: the users whose role IDs are removed
+        :param target_ids: the projects and domains whose role IDs are removed
+        :param group_id: remove the role IDs of the members of this group
+
+        If nothing is specified, all stored role IDs are removed. This does
+        nothing unless `[assignment] materialize_effective_assignments` is
+        enabled.
+
+        """
+        if not CONF.assignment.materialize_effective_assignments:
+            return
+        if group_id is not None:
+            try:
+                user_ids = self.identity_api.list_user_ids_in_group(group_id)
+            except exception.GroupNotFound:
+                return
+        try:
+            self.driver.invalidate_effective_role_ids(user_ids, target_ids)
+        except exception.NotImplemented:  # nosec
+            # The driver does not store effective role IDs.
+            pass
+
+    def rebuild_effective_role_ids(self):
+        """Recompute and store the effective role IDs of all users.
+
+        :returns: the number of stored user and target pairs
+
+        """
+        effective_role_ids = self._compute_all_effective_role_ids()
+        self.driver.replace_effective_role_ids(effective_role_ids)
+        return len(effective_role_ids)
+
+    def verify_effective_role_ids(self):
+        """Compare the stored effective role IDs with computed ones.
+
+        :returns: a list of (user_id, target_id, is_domain, stored role IDs,
+                  computed role IDs) tuples, one for each stored pair whose
+                  role IDs differ from the computed ones.
+
+        """
+        computed = self._compute_all_effective_role_ids()
+        mismatches = []
+        for key, role_ids in self.driver.list_effective_role_ids().items():
+            expected = computed.get(key, [])
+            if set(role_ids) != set(expected):
+                mismatches.append(key + (sorted(role_ids), sorted(expected)))
+        return mismatches
+
+    def _compute_all_effective_role_ids(self):
+        effective_role_ids = {}
+        for ref in self.list_role_assignments(effective=True):
+            if 'project_id' in ref:
+                key = (ref['user_id'], ref['project_id'], False)
+            else:
+                key = (ref['user_id'], ref['domain_id'], True)
+            effective_role_ids.setdefault(key, set()).add(ref['role_id'])
+        return {key: list(role_ids)
+                for key, role_ids in effective_role_ids.items()}
 
     def get_roles_for_groups(self, group_ids, project_id=None, domain_id=None):
         """Get a list of roles for this group on domain and/or project."""
@@ -179,7 +275,7 @@ class Manager(manager.Manager):
             raise AttributeError(_("Must specify either domain or project"))
 
         role_ids = list(set([x['role_id'] for x in assignment_list]))
-        return self.role_api.list_roles_from_ids(role_ids)
+        return self.role_api.get_roles(role_ids)
 
     def add_user_to_project(self, tenant_id, user_id):
         """Add user to a tenant by creating a default role relationship.
@@ -213,7 +309,8 @@ class Manager(manager.Manager):
                 user_id,
                 tenant_id,
                 CONF.member_role_id)
-        COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        self.invalidate_effective_role_ids(user_ids=[user_id])
+        _invalidate_computed_assignments()
 
     @notifications.role_assignment('created')
     def _add_role_to_user_and_project_adapter(self, role_id, user_id=None,
@@ -233,7 +330,8 @@ class Manager(manager.Manager):
     def add_role_to_user_and_project(self, user_id, tenant_id, role_id):
         self._add_role_to_user_and_project_adapter(
             role_id, user_id=user_id, project_id=tenant_id)
-        COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        self.invalidate_effective_role_ids(user_ids=[user_id])
+        _invalidate_computed_assignments()
 
     def remove_user_from_project(self, tenant_id, user_id):
         """Remove user from a tenant.
@@ -257,7 +355,8 @@ class Manager(manager.Manager):
             except exception.RoleNotFound:
                 LOG.debug("Removing role %s failed because it does not exist.",
                           role_id)
-        COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        self.invalidate_effective_role_ids(user_ids=[user_id])
+        _invalidate_computed_assignments()
 
     # TODO(henry-nash): We might want to consider list limiting this at some
     # point in the future.
@@ -267,7 +366,7 @@ class Manager(manager.Manager):
         # Use set() to process the list to remove any duplicates
         project_ids = list(set([x['project_id'] for x in assignment_list
                                 if x.get('project_id')]))
-        return self.resource_api.list_projects_from_ids(list(project_ids))
+        return self.resource_api.get_projects(project_ids)
 
     # TODO(henry-nash): We might want to consider list limiting this at some
     # point in the future.
@@ -277,21 +376,21 @@ class Manager(manager.Manager):
         # Use set() to process the list to remove any duplicates
         domain_ids = list(set([x['domain_id'] for x in assignment_list
                                if x.get('domain_id')]))
-        return self.resource_api.list_domains_from_ids(domain_ids)
+        return self.resource_api.get_domains(domain_ids)
 
     def list_domains_for_groups(self, group_ids):
         assignment_list = self.list_role_assignments(
             source_from_group_ids=group_ids, effective=True)
         domain_ids = list(set([x['domain_id'] for x in assignment_list
                                if x.get('domain_id')]))
-        return self.resource_api.list_domains_from_ids(domain_ids)
+        return self.resource_api.get_domains(domain_ids)
 
     def list_projects_for_groups(self, group_ids):
         assignment_list = self.list_role_assignments(
             source_from_group_ids=group_ids, effective=True)
         project_ids = list(set([x['project_id'] for x in assignment_list
                                if x.get('project_id')]))
-        return self.resource_api.list_projects_from_ids(project_ids)
+        return self.resource_api.get_projects(project_ids)
 
     @notifications.role_assignment('deleted')
     def _remove_role_from_user_and_project_adapter(self, role_id, user_id=None,
@@ -317,7 +416,8 @@ class Manager(manager.Manager):
     def remove_role_from_user_and_project(self, user_id, tenant_id, role_id):
         self._remove_role_from_user_and_project_adapter(
             role_id, user_id=user_id, project_id=tenant_id)
-        COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        self.invalidate_effective_role_ids(user_ids=[user_id])
+        _invalidate_computed_assignments()
 
     def _emit_invalidate_user_token_persistence(self, user_id):
         self.identity_api.emit_invalidate_user_token_persistence(user_id)
@@ -346,7 +446,8 @@ class Manager(manager.Manager):
             self.resource_api.get_project(project_id)
         self.driver.create_grant(role_id, user_id, group_id, domain_id,
                                  project_id, inherited_to_projects)
-        COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        self._invalidate_effective_role_ids_of_actor(user_id, group_id)
+        _invalidate_computed_assignments()
 
     def get_grant(self, role_id, user_id=None, group_id=None,
                   domain_id=None, project_id=None,
@@ -370,7 +471,7 @@ class Manager(manager.Manager):
             self.resource_api.get_project(project_id)
         grant_ids = self.list_grant_role_ids(
             user_id, group_id, domain_id, project_id, inherited_to_projects)
-        return self.role_api.list_roles_from_ids(grant_ids)
+        return self.role_api.get_roles(grant_ids)
 
     @notifications.role_assignment('deleted')
     def _emit_revoke_user_grant(self, role_id, user_id, domain_id, project_id,
@@ -403,10 +504,10 @@ class Manager(manager.Manager):
                 if CONF.token.revoke_by_id:
                     # NOTE(morganfainberg): The user ids are the important part
                     # for invalidating tokens below, so extract them here.
-                    for user in self.identity_api.list_users_in_group(
+                    for user_id in self.identity_api.list_user_ids_in_group(
                             group_id):
                         self._emit_revoke_user_grant(
-                            role_id, user['id'], domain_id, project_id,
+                            role_id, user_id, domain_id, project_id,
                             inherited_to_projects, context)
             except exception.GroupNotFound:
                 LOG.debug('Group %s not found, no tokens to invalidate.',
@@ -424,7 +525,14 @@ class Manager(manager.Manager):
             self.resource_api.get_project(project_id)
         self.driver.delete_grant(role_id, user_id, group_id, domain_id,
                                  project_id, inherited_to_projects)
-        COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        self._invalidate_effective_role_ids_of_actor(user_id, group_id)
+        _invalidate_computed_assignments()
+
+    def _invalidate_effective_role_ids_of_actor(self, user_id, group_id):
+        if group_id is not None:
+            self.invalidate_effective_role_ids(group_id=group_id)
+        else:
+            self.invalidate_effective_role_ids(user_ids=[user_id])
 
     # The methods _expand_indirect_assignment, _list_direct_role_assignments
     # and _list_effective_role_assignments below are only used on
@@ -505,8 +613,8 @@ class Manager(manager.Manager):
             if user_id:
                 return [create_group_assignment(ref, user_id=user_id)]
 
-            return [create_group_assignment(ref, user_id=m['id'])
-                    for m in self.identity_api.list_users_in_group(
+            return [create_group_assignment(ref, user_id=member_id)
+                    for member_id in self.identity_api.list_user_ids_in_group(
                         ref['group_id'])]
 
         def expand_inherited_assignment(ref, user_id, project_id, subtree_ids,
@@ -598,9 +706,8 @@ class Manager(manager.Manager):
                     if ref.get('project_id'):
                         if ref['project_id'] in project_ids:
                             project_ids = (
-                                [x['id'] for x in
-                                    self.resource_api.list_projects_in_subtree(
-                                        ref['project_id'])])
+                                self.resource_api.list_project_ids_in_subtree(
+                                    ref['project_id']))
             elif ref.get('domain_id'):
                 # A domain inherited assignment, so apply it to all projects
                 # in this domain
@@ -610,10 +717,8 @@ class Manager(manager.Manager):
                             ref['domain_id'])])
             else:
                 # It must be a project assignment, so apply it to its subtree
-                project_ids = (
-                    [x['id'] for x in
-                        self.resource_api.list_projects_in_subtree(
-                            ref['project_id'])])
+                project_ids = self.resource_api.list_project_ids_in_subtree(
+                    ref['project_id'])
 
             new_refs = []
             if 'group_id' in ref:
@@ -642,7 +747,60 @@ class Manager(manager.Manager):
             return expand_group_assignment(ref, user_id)
         return [ref]
 
-    def add_implied_roles(self, role_refs):
+    def _get_implied_role_closure(self):
+        """Get the closure of the role inference rules, if it is cached.
+
+        Building the closure reads every role and inference rule, which only
+        pays off when it is reused. Without role caching, or if the role
+        driver doesn't support implied roles, None is returned and the rules
+        of the roles being expanded are read instead.
+
+        """
+        if not (CONF.cache.enabled and CONF.role.caching):
+            return None
+        try:
+            return self.role_api.get_implied_role_closure()
+        except exception.NotImplemented:
+            return None
+
+    def _add_implied_roles_per_role(self, role_refs):
+        # Follow the inference rules of each role reached, reading the rules
+        # of each distinct role once.
+        def _make_implied_ref_copy(prior_ref, implied_role_id):
+            implied_ref = copy.deepcopy(prior_ref)
+            implied_ref['role_id'] = implied_role_id
+            indirect = implied_ref.setdefault('indirect', {})
+            indirect['role_id'] = prior_ref['role_id']
+            return implied_ref
+
+        implied_roles_cache = {}
+        role_refs_to_check = list(role_refs)
+        ref_results = list(role_refs)
+        checked_role_refs = list()
+        while(role_refs_to_check):
+            next_ref = role_refs_to_check.pop()
+            checked_role_refs.append(next_ref)
+            next_role_id = next_ref['role_id']
+            if next_role_id in implied_roles_cache:
+                implied_roles = implied_roles_cache[next_role_id]
+            else:
+                implied_roles = (
+                    self.role_api.list_implied_roles(next_role_id))
+                implied_roles_cache[next_role_id] = implied_roles
+            for implied_role in implied_roles:
+                implied_ref = (
+                    _make_implied_ref_copy(
+                        next_ref, implied_role['implied_role_id']))
+                if implied_ref in checked_role_refs:
+                    msg = _LE('Circular reference found '
+                              'role inference rules - %(prior_role_id)s.')
+                    LOG.error(msg, {'prior_role_id': next_ref['role_id']})
+                else:
+                    ref_results.append(implied_ref)
+                    role_refs_to_check.append(implied_ref)
+        return ref_results
+
+    def add_implied_roles(self, role_refs, closure=None):
         """Expand out implied roles.
 
         The role_refs passed in have had all inheritance and group assignments
@@ -652,48 +810,49 @@ class Manager(manager.Manager):
         in the indirect dict that is part of such a duplicated ref, so that a
         caller can determine where the assignment came from.
 
+        :param closure: the result of
+            :meth:`RoleManager.get_implied_role_closure`, if the caller already
+            has it.
+
         """
-        def _make_implied_ref_copy(prior_ref, implied_role_id):
-            # Create a ref for an implied role from the ref of a prior role,
-            # setting the new role_id to be the implied role and the indirect
-            # role_id to be the prior role
-            implied_ref = copy.deepcopy(prior_ref)
+        def _make_implied_ref_copy(ref, prior_role_id, implied_role_id):
+            # Create a ref for an implied role from the ref the prior role was
+            # reached from, setting the new role_id to be the implied role and
+            # the indirect role_id to be the prior role
+            implied_ref = copy.deepcopy(ref)
             implied_ref['role_id'] = implied_role_id
             indirect = implied_ref.setdefault('indirect', {})
-            indirect['role_id'] = prior_ref['role_id']
+            indirect['role_id'] = prior_role_id
             return implied_ref
 
+        def _ref_key(ref):
+            return tuple(sorted(
+                (k, tuple(sorted(v.items())) if isinstance(v, dict) else v)
+                for k, v in ref.items()))
+
         if not CONF.token.infer_roles:
             return role_refs
-        try:
-            implied_roles_cache = {}
-            role_refs_to_check = list(role_refs)
-            ref_results = list(role_refs)
-            checked_role_refs = list()
-            while(role_refs_to_check):
-                next_ref = role_refs_to_check.pop()
-                checked_role_refs.append(next_ref)
-                next_role_id = next_ref['role_id']
-                if next_role_id in implied_roles_cache:
-                    implied_roles = implied_roles_cache[next_role_id]
-                else:
-                    implied_roles = (
-                        self.role_api.list_implied_roles(next_role_id))
-                    implied_roles_cache[next_role_id] = implied_roles
-                for implied_role in implied_roles:
-                    implied_ref = (
-                        _make_implied_ref_copy(
-                            next_ref, implied_role['implied_role_id']))
-                    if implied_ref in checked_role_refs:
-                        msg = _LE('Circular reference found '
-                                  'role inference rules - %(prior_role_id)s.')
-                        LOG.error(msg, {'prior_role_id': next_ref['role_id']})
-                    else:
-                        ref_results.append(implied_ref)
-                        role_refs_to_check.append(implied_ref)
-        except exception.NotImplemented:
-            LOG.error('Role driver does not support implied roles.')
-
+        if closure is None:
+            closure = self._get_implied_role_closure()
+        if closure is None:
+            try:
+                return self._add_implied_roles_per_role(role_refs)
+            except exception.NotImplemented:
+                LOG.error('Role driver does not support implied roles.')
+                return role_refs
+
+        implied_roles = closure['implied']
+        ref_results = list(role_refs)
+        seen_refs = set(_ref_key(ref) for ref in role_refs)
+        for ref in role_refs:
+            for prior_role_id, implied_role_id in implied_roles.get(
+                    ref['role_id'], []):
+                implied_ref = _make_implied_ref_copy(
+                    ref, prior_role_id, implied_role_id)
+                key = _ref_key(implied_ref)
+                if key not in seen_refs:
+                    seen_refs.add(key)
+                    ref_results.append(implied_ref)
         return ref_results
 
     def _filter_by_role_id(self, role_id, ref_results):
@@ -704,17 +863,25 @@ class Manager(manager.Manager):
                 filter_results.append(ref)
         return filter_results
 
-    def _strip_domain_roles(self, role_refs):
+    def _strip_domain_roles(self, role_refs, closure=None):
         """Post process assignment list for domain roles.
 
         Domain roles are only designed to do the job of inferring other roles
         and since that has been done before this method is called, we need to
         remove any assignments that include a domain role.
 
+        :param closure: the result of
+            :meth:`RoleManager.get_implied_role_closure`, whose role domain IDs
+            are used when given.
+
         """
+        domain_ids = dict(closure['domain_ids']) if closure else {}
+
         def _role_is_global(role_id):
-            ref = self.role_api.get_role(role_id)
-            return (ref['domain_id'] is None)
+            if role_id not in domain_ids:
+                ref = self.role_api.get_role(role_id)
+                domain_ids[role_id] = ref['domain_id']
+            return domain_ids[role_id] is None
 
         filter_results = []
         for ref in role_refs:
@@ -819,9 +986,8 @@ class Manager(manager.Manager):
                     # they are from the same tree the only places these can
                     # come from are from parents of the main project or
                     # inherited assignments on the project or subtree itself.
-                    source_ids = [project['id'] for project in
-                                  self.resource_api.list_project_parents(
-                                      project_id)]
+                    source_ids = self.resource_api.list_project_parent_ids(
+                        project_id)
                     if subtree_ids:
                         source_ids += project_ids_of_interest
                     if source_ids:
@@ -881,9 +1047,12 @@ class Manager(manager.Manager):
             refs += self._expand_indirect_assignment(
                 ref, user_id, project_id, subtree_ids, expand_groups)
 
-        refs = self.add_implied_roles(refs)
+        # The closure of the inference rules, when cached, is read once for
+        # both expanding implied roles and stripping domain roles.
+        closure = self._get_implied_role_closure()
+        refs = self.add_implied_roles(refs, closure=closure)
         if strip_domain_roles:
-            refs = self._strip_domain_roles(refs)
+            refs = self._strip_domain_roles(refs, closure=closure)
         if role_id:
             refs = self._filter_by_role_id(role_id, refs)
 
@@ -966,9 +1135,8 @@ class Manager(manager.Manager):
 
         subtree_ids = None
         if project_id and include_subtree:
-            subtree_ids = (
-                [x['id'] for x in
-                    self.resource_api.list_projects_in_subtree(project_id)])
+            subtree_ids = self.resource_api.list_project_ids_in_subtree(
+                project_id)
 
         if effective:
             role_assignments = self._list_effective_role_assignments(
@@ -985,41 +1153,71 @@ class Manager(manager.Manager):
         return role_assignments
 
     def _get_names_from_role_assignments(self, role_assignments):
-        role_assign_list = []
+        def _refs_by_id(ids, list_from_ids):
+            return {ref['id']: ref for ref in list_from_ids(list(ids))}
+
+        def _ref(refs, id_, get):
+            # NOTE: anything missing from the bulk read is read on its own, so
+            # that an entity which doesn't exist raises the same error as it
+            # always has.
+            if id_ not in refs:
+                refs[id_] = get(id_)
+            return refs[id_]
+
+        # Read each type of entity in bulk, then the domains that own them.
+        ids = collections.defaultdict(set)
+        for role_asgmt in role_assignments:
+            for id_type in ('domain_id', 'user_id', 'group_id', 'project_id',
+                            'role_id'):
+                if id_type in role_asgmt:
+                    ids[id_type].add(role_asgmt[id_type])
+        users = _refs_by_id(ids['user_id'], self.identity_api.get_users)
+        groups = _refs_by_id(ids['group_id'],
+                             self.identity_api.list_groups_from_ids)
+        projects = _refs_by_id(ids['project_id'],
+                               self.resource_api.get_projects)
+        roles = _refs_by_id(ids['role_id'], self.role_api.get_roles)
+        domain_ids = set(ids['domain_id'])
+        for refs in (users, groups, projects):
+            domain_ids.update(ref['domain_id'] for ref in refs.values())
+        domains = _refs_by_id(domain_ids, self.resource_api.get_domains)
+
+        def _domain_name(domain_id):
+            return _ref(domains, domain_id, self.resource_api.get_domain)[
+                'name']
 
+        role_assign_list = []
         for role_asgmt in role_assignments:
             new_assign = {}
             for id_type, id_ in role_asgmt.items():
                 if id_type == 'domain_id':
-                    _domain = self.resource_api.get_domain(id_)
+                    _domain = _ref(domains, id_, self.resource_api.get_domain)
                     new_assign['domain_id'] = _domain['id']
                     new_assign['domain_name'] = _domain['name']
                 elif id_type == 'user_id':
-                    _user = self.identity_api.get_user(id_)
+                    _user = _ref(users, id_, self.identity_api.get_user)
                     new_assign['user_id'] = _user['id']
                     new_assign['user_name'] = _user['name']
                     new_assign['user_domain_id'] = _user['domain_id']
                     new_assign['user_domain_name'] = (
-                        self.resource_api.get_domain(_user['domain_id'])
-                        ['name'])
+                        _domain_name(_user['domain_id']))
                 elif id_type == 'group_id':
-                    _group = self.identity_api.get_group(id_)
+                    _group = _ref(groups, id_, self.identity_api.get_group)
                     new_assign['group_id'] = _group['id']
                     new_assign['group_name'] = _group['name']
                     new_assign['group_domain_id'] = _group['domain_id']
                     new_assign['group_domain_name'] = (
-                        self.resource_api.get_domain(_group['domain_id'])
-                        ['name'])
+                        _domain_name(_group['domain_id']))
                 elif id_type == 'project_id':
-                    _project = self.resource_api.get_project(id_)
+                    _project = _ref(projects, id_,
+                                    self.resource_api.get_project)
                     new_assign['project_id'] = _project['id']
                     new_assign['project_name'] = _project['name']
                     new_assign['project_domain_id'] = _project['domain_id']
                     new_assign['project_domain_name'] = (
-                        self.resource_api.get_domain(_project['domain_id'])
-                        ['name'])
+                        _domain_name(_project['domain_id']))
                 elif id_type == 'role_id':
-                    _role = self.role_api.get_role(id_)
+                    _role = _ref(roles, id_, self.role_api.get_role)
                     new_assign['role_id'] = _role['id']
                     new_assign['role_name'] = _role['name']
             role_assign_list.append(new_assign)
@@ -1027,6 +1225,9 @@ class Manager(manager.Manager):
 
     def delete_tokens_for_role_assignments(self, role_id):
         assignments = self.list_role_assignments(role_id=role_id)
+        # Read the members of all the groups with this role at once.
+        user_ids_in_groups = self.identity_api.list_user_ids_in_groups(
+            [x['group_id'] for x in assignments if 'group_id' in x])
 
         # Iterate over the assignments for this role and build the list of
         # user or user+project IDs for the tokens we need to delete
@@ -1049,10 +1250,9 @@ class Manager(manager.Manager):
             elif 'group_id' in assignment:
                 # Add in any users for this group, being tolerant of any
                 # cross-driver database integrity errors.
-                try:
-                    users = self.identity_api.list_users_in_group(
-                        assignment['group_id'])
-                except exception.GroupNotFound:
+                group_user_ids = user_ids_in_groups.get(
+                    assignment['group_id'])
+                if group_user_ids is None:
                     # Ignore it, but log a debug message
                     if 'project_id' in assignment:
                         target = _('Project (%s)') % assignment['project_id']
@@ -1067,13 +1267,12 @@ class Manager(manager.Manager):
                     continue
 
                 if 'project_id' in assignment:
-                    for user in users:
+                    for user_id in group_user_ids:
                         user_and_project_ids.append(
-                            (user['id'], assignment['project_id']))
+                            (user_id, assignment['project_id']))
                 elif 'domain_id' in assignment:
-                    for user in users:
-                        self._emit_invalidate_user_token_persistence(
-                            user['id'])
+                    for user_id in group_user_ids:
+                        self._emit_invalidate_user_token_persistence(user_id)
 
         # Now process the built up lists.  Before issuing calls to delete any
         # tokens, let's try and minimize the number of calls by pruning out
@@ -1163,11 +1362,28 @@ class RoleManager(manager.Manager):
     def get_role(self, role_id):
         return self.driver.get_role(role_id)
 
+    def get_roles(self, role_ids):
+        """Get the roles with the given IDs.
+
+        Roles already cached by :meth:`get_role` are read from the cache in
+        one go, the rest with a single driver call.
+
+        :param role_ids: list of role ids
+
+        :returns: a list of role_refs, in the order of role_ids. IDs that
+                  don't belong to any role are left out.
+
+        """
+        return cache.get_memoized_multi(
+            MEMOIZE, RoleManager.get_role, self, role_ids,
+            self.driver.list_roles_from_ids)
+
     def create_role(self, role_id, role, initiator=None):
         ret = self.driver.create_role(role_id, role)
         notifications.Audit.created(self._ROLE, role_id, initiator)
         if MEMOIZE.should_cache(ret):
             self.get_role.set(ret, self, role_id)
+        self.get_implied_role_closure.invalidate(self)
         return ret
 
     @manager.response_truncated
@@ -1190,10 +1406,57 @@ class RoleManager(manager.Manager):
         self.assignment_api.delete_tokens_for_role_assignments(role_id)
         self.assignment_api.delete_role_assignments(role_id)
         self.driver.delete_role(role_id)
+        self.assignment_api.invalidate_effective_role_ids()
         notifications.Audit.deleted(self._ROLE, role_id, initiator)
         self.get_role.invalidate(self, role_id)
+        self.get_implied_role_closure.invalidate(self)
         COMPUTED_ASSIGNMENTS_REGION.invalidate()
 
+    @MEMOIZE
+    def get_implied_role_closure(self):
+        """Get the roles implied by each role, directly or not.
+
+        All the role inference rules are read at once and followed from each
+        prior role, so that expanding implied roles is a dictionary lookup.
+        The result is cached until a role or a role inference rule is created
+        or deleted.
+
+        :returns: a dictionary with two keys. ``implied`` maps each prior
+                  role ID to the list of ``[prior_role_id, implied_role_id]``
+                  rules reached from that role, breadth first and each rule
+                  once. ``domain_ids`` maps the ID of every role to its
+                  domain ID, which is None for global roles.
+        :raises keystone.exception.NotImplemented: If the driver does not
+            support implied roles.
+
+        """
+        rules = {}
+        for rule in self.driver.list_role_inference_rules():
+            rules.setdefault(rule['prior_role_id'], []).append(
+                rule['implied_role_id'])
+
+        implied = {}
+        for role_id in rules:
+            reached = []
+            visited = set([role_id])
+            to_visit = collections.deque([role_id])
+            while to_visit:
+                prior_role_id = to_visit.popleft()
+                for implied_role_id in rules.get(prior_role_id, []):
+                    reached.append([prior_role_id, implied_role_id])
+                    if implied_role_id == role_id:
+                        msg = _LE('Circular reference found '
+                                  'role inference rules - %(prior_role_id)s.')
+                        LOG.error(msg, {'prior_role_id': role_id})
+                    elif implied_role_id not in visited:
+                        visited.add(implied_role_id)
+                        to_visit.append(implied_role_id)
+            implied[role_id] = reached
+
+        domain_ids = dict((role['id'], role['domain_id']) for role in
+                          self.driver.list_roles(driver_hints.Hints()))
+        return {'implied': implied, 'domain_ids': domain_ids}
+
     # TODO(ayoung): Add notification
     def create_implied_role(self, prior_role_id, implied_role_id):
         implied_role = self.driver.get_role(implied_role_id)
@@ -1202,12 +1465,16 @@ class RoleManager(manager.Manager):
             raise exception.InvalidImpliedRole(role_id=implied_role_id)
         response = self.driver.create_implied_role(
             prior_role_id, implied_role_id)
-        COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        self.get_implied_role_closure.invalidate(self)
+        self.assignment_api.invalidate_effective_role_ids()
+        _invalidate_computed_assignments()
         return response
 
     def delete_implied_role(self, prior_role_id, implied_role_id):
         self.driver.delete_implied_role(prior_role_id, implied_role_id)
-        COMPUTED_ASSIGNMENTS_REGION.invalidate()
+        self.get_implied_role_closure.invalidate(self)
+        self.assignment_api.invalidate_effective_role_ids()
+        _invalidate_computed_assignments()
 
 
 @versionutils.deprecated(
@@ -22,9 +22,11 @@ from oslo_utils import importutils
 import six
 import stevedore
 
+from keystone.auth import schema
 from keystone.common import controller
 from keystone.common import dependency
 from keystone.common import utils
+from keystone.common import validation
 from keystone.common import wsgi
 import keystone.conf
 from keystone import exception
@@ -563,6 +565,21 @@ class Auth(controller.V3Controller):
             del token_data['token']['catalog']
         return render_token_data_response(token_id, token_data)
 
+    @controller.protected()
+    def validate_tokens(self, request, tokens):
+        validation.lazy_validate(schema.tokens_validate, tokens)
+        include_catalog = 'nocatalog' not in request.params
+        results = self.token_provider_api.validate_tokens(tokens)
+        refs = []
+        for token_id in tokens:
+            token_data = results[token_id]
+            if (token_data is not None and not include_catalog and
+                    'catalog' in token_data['token']):
+                token_data = {'token': dict(token_data['token'])}
+                del token_data['token']['catalog']
+            refs.append(token_data)
+        return {'tokens': refs}
+
     @controller.protected()
     def revocation_list(self, request, auth=None):
         if not CONF.token.revoke_by_id:
@@ -0,0 +1,25 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+# The largest number of tokens that can be validated with a single request.
+MAX_TOKENS_PER_VALIDATION = 1000
+
+tokens_validate = {
+    'type': 'array',
+    'items': {
+        'type': 'string',
+        'minLength': 1
+    },
+    'minItems': 1,
+    'maxItems': MAX_TOKENS_PER_VALIDATION
+}
@@ -16,6 +16,7 @@ import abc
 
 import six
 
+from keystone.common import utils
 import keystone.conf
 from keystone import exception
 
@@ -299,6 +300,64 @@ class CatalogDriverV8(object):
 
         return v3_catalog
 
+    def get_v3_catalog_skeleton(self):
+        """Retrieve the user and project independent V3 service catalog.
+
+        The skeleton has the same structure as the catalog returned by
+        get_v3_catalog, but the endpoint URLs are left unformatted. Since it
+        only changes when regions, services or endpoints do, it can be cached
+        and turned into the catalog of any user and project by
+        format_v3_catalog.
+
+        :returns: A list representing the service catalog or an empty list
+        :raises keystone.exception.NotImplemented: If the driver can only
+            build the catalog for a given user and project.
+
+        """
+        raise exception.NotImplemented()  # pragma: no cover
+
+    def format_v3_catalog(self, skeleton, user_id, tenant_id):
+        """Format a V3 catalog skeleton for a user and project.
+
+        :param skeleton: The catalog returned by get_v3_catalog_skeleton.
+        :param user_id: The id of the user who has been authenticated for
+            creating service catalog.
+        :param tenant_id: The id of the project. 'tenant_id' will be None in
+            the case this being called to create a catalog to go in a domain
+            scoped token. In this case, any endpoint that requires a
+            tenant_id as part of their URL will be skipped.
+
+        :returns: A list representing the service catalog or an empty list
+
+        """
+        substitutions = utils.get_url_substitutions(user_id=user_id)
+        silent_keyerror_failures = []
+        if tenant_id:
+            substitutions.update({
+                'tenant_id': tenant_id,
+                'project_id': tenant_id,
+            })
+        else:
+            silent_keyerror_failures = ['tenant_id', 'project_id', ]
+
+        def format_endpoints(endpoints):
+            for endpoint in endpoints:
+                try:
+                    formatted_url = utils.format_url(
+                        endpoint['url'], substitutions,
+                        silent_keyerror_failures=silent_keyerror_failures)
+                except exception.MalformedEndpoint:  # nosec(tkelsey)
+                    # this failure is already logged in format_url()
+                    continue
+                if formatted_url:
+                    yield dict(endpoint, url=formatted_url)
+
+        # The skeleton may be shared with other requests, so the services and
+        # endpoints are copied rather than formatted in place.
+        return [dict(service,
+                     endpoints=list(format_endpoints(service['endpoints'])))
+                for service in skeleton]
+
     @abc.abstractmethod
     def add_endpoint_to_project(self, endpoint_id, project_id):
         """Create an endpoint to project association.
@@ -13,7 +13,6 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-import itertools
 
 import sqlalchemy
 from sqlalchemy.sql import true
@@ -266,9 +265,7 @@ class Catalog(base.CatalogDriverV8):
                   empty dict.
 
         """
-        substitutions = dict(
-            itertools.chain(CONF.items(), CONF.eventlet_server.items()))
-        substitutions.update({'user_id': user_id})
+        substitutions = utils.get_url_substitutions(user_id=user_id)
         silent_keyerror_failures = []
         if tenant_id:
             substitutions.update({
@@ -326,18 +323,10 @@ class Catalog(base.CatalogDriverV8):
         :returns: A list representing the service catalog or an empty list
 
         """
-        d = dict(
-            itertools.chain(CONF.items(), CONF.eventlet_server.items()))
-        d.update({'user_id': user_id})
-        silent_keyerror_failures = []
-        if tenant_id:
-            d.update({
-                'tenant_id': tenant_id,
-                'project_id': tenant_id,
-            })
-        else:
-            silent_keyerror_failures = ['tenant_id', 'project_id', ]
+        return self.format_v3_catalog(self.get_v3_catalog_skeleton(),
+                                      user_id, tenant_id)
 
+    def get_v3_catalog_skeleton(self):
         with sql.session_for_read() as session:
             services = (session.query(Service).filter(
                 Service.enabled == true()).options(
@@ -350,18 +339,6 @@ class Catalog(base.CatalogDriverV8):
                     del endpoint['legacy_endpoint_id']
                     del endpoint['enabled']
                     endpoint['region'] = endpoint['region_id']
-                    try:
-                        formatted_url = utils.format_url(
-                            endpoint['url'], d,
-                            silent_keyerror_failures=silent_keyerror_failures)
-                        if formatted_url:
-                            endpoint['url'] = formatted_url
-                        else:
-                            continue
-                    except exception.MalformedEndpoint:  # nosec(tkelsey)
-                        # this failure is already logged in format_url()
-                        continue
-
                     yield endpoint
 
             # TODO(davechen): If there is service with no endpoints, we should
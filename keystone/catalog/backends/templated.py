@@ -12,7 +12,6 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-import itertools
 import os.path
 
 from oslo_log import log
@@ -210,9 +209,7 @@ class Catalog(base.CatalogDriverV8):
                   empty dict.
 
         """
-        substitutions = dict(
-            itertools.chain(CONF.items(), CONF.eventlet_server.items()))
-        substitutions.update({'user_id': user_id})
+        substitutions = utils.get_url_substitutions(user_id=user_id)
         silent_keyerror_failures = []
         if tenant_id:
             substitutions.update({
@@ -15,6 +15,9 @@
 
 """Main entry point into the Catalog service."""
 
+import uuid
+
+from dogpile.cache import api
 from oslo_cache import core as oslo_cache
 from oslo_log import versionutils
 
@@ -23,6 +26,7 @@ from keystone.common import cache
 from keystone.common import dependency
 from keystone.common import driver_hints
 from keystone.common import manager
+from keystone.common import utils
 import keystone.conf
 from keystone import exception
 from keystone.i18n import _
@@ -44,6 +48,16 @@ MEMOIZE_COMPUTED_CATALOG = cache.get_memoization_decorator(
     group='catalog',
     region=COMPUTED_CATALOG_REGION)
 
+# This builds a discrete cache region for the part of the service catalog that
+# does not depend on the user or project. The skeleton is cached along with a
+# version, which is replaced whenever a region, service or endpoint changes,
+# rather than invalidating the region.
+CATALOG_SKELETON_REGION = oslo_cache.create_region()
+MEMOIZE_CATALOG_SKELETON = cache.get_memoization_decorator(
+    group='catalog',
+    region=CATALOG_SKELETON_REGION)
+CATALOG_VERSION_KEY = 'catalog-skeleton-version'
+
 
 @dependency.provider('catalog_api')
 @dependency.requires('resource_api')
@@ -63,6 +77,27 @@ class Manager(manager.Manager):
 
     def __init__(self):
         super(Manager, self).__init__(CONF.catalog.driver)
+        CONF.register_mutate_hook(utils.reset_url_substitutions)
+
+    def _invalidate_catalog(self):
+        self._bump_catalog_version()
+        COMPUTED_CATALOG_REGION.invalidate()
+
+    def _invalidate_computed_catalog(self):
+        COMPUTED_CATALOG_REGION.invalidate()
+        notifications.Audit.internal(
+            notifications.INVALIDATE_COMPUTED_CATALOG, None)
+
+    def _bump_catalog_version(self):
+        version = uuid.uuid4().hex
+        CATALOG_SKELETON_REGION.set(CATALOG_VERSION_KEY, version)
+        return version
+
+    def _get_catalog_version(self):
+        version = CATALOG_SKELETON_REGION.get(CATALOG_VERSION_KEY)
+        if version is api.NO_VALUE:
+            version = self._bump_catalog_version()
+        return version
 
     def create_region(self, region_ref, initiator=None):
         # Check duplicate ID
@@ -88,7 +123,7 @@ class Manager(manager.Manager):
             raise exception.RegionNotFound(region_id=parent_region_id)
 
         notifications.Audit.created(self._REGION, ret['id'], initiator)
-        COMPUTED_CATALOG_REGION.invalidate()
+        self._invalidate_catalog()
         return ret
 
     @MEMOIZE
@@ -107,7 +142,7 @@ class Manager(manager.Manager):
         ref = self.driver.update_region(region_id, region_ref)
         notifications.Audit.updated(self._REGION, region_id, initiator)
         self.get_region.invalidate(self, region_id)
-        COMPUTED_CATALOG_REGION.invalidate()
+        self._invalidate_catalog()
         return ref
 
     def delete_region(self, region_id, initiator=None):
@@ -115,7 +150,7 @@ class Manager(manager.Manager):
             ret = self.driver.delete_region(region_id)
             notifications.Audit.deleted(self._REGION, region_id, initiator)
             self.get_region.invalidate(self, region_id)
-            COMPUTED_CATALOG_REGION.invalidate()
+            self._invalidate_catalog()
             return ret
         except exception.NotFound:
             raise exception.RegionNotFound(region_id=region_id)
@@ -129,7 +164,7 @@ class Manager(manager.Manager):
         service_ref.setdefault('name', '')
         ref = self.driver.create_service(service_id, service_ref)
         notifications.Audit.created(self._SERVICE, service_id, initiator)
-        COMPUTED_CATALOG_REGION.invalidate()
+        self._invalidate_catalog()
         return ref
 
     @MEMOIZE
@@ -143,7 +178,7 @@ class Manager(manager.Manager):
         ref = self.driver.update_service(service_id, service_ref)
         notifications.Audit.updated(self._SERVICE, service_id, initiator)
         self.get_service.invalidate(self, service_id)
-        COMPUTED_CATALOG_REGION.invalidate()
+        self._invalidate_catalog()
         return ref
 
     def delete_service(self, service_id, initiator=None):
@@ -155,7 +190,7 @@ class Manager(manager.Manager):
             for endpoint in endpoints:
                 if endpoint['service_id'] == service_id:
                     self.get_endpoint.invalidate(self, endpoint['id'])
-            COMPUTED_CATALOG_REGION.invalidate()
+            self._invalidate_catalog()
             return ret
         except exception.NotFound:
             raise exception.ServiceNotFound(service_id=service_id)
@@ -186,7 +221,7 @@ class Manager(manager.Manager):
         ref = self.driver.create_endpoint(endpoint_id, endpoint_ref)
 
         notifications.Audit.created(self._ENDPOINT, endpoint_id, initiator)
-        COMPUTED_CATALOG_REGION.invalidate()
+        self._invalidate_catalog()
         return ref
 
     def update_endpoint(self, endpoint_id, endpoint_ref, initiator=None):
@@ -195,7 +230,7 @@ class Manager(manager.Manager):
         ref = self.driver.update_endpoint(endpoint_id, endpoint_ref)
         notifications.Audit.updated(self._ENDPOINT, endpoint_id, initiator)
         self.get_endpoint.invalidate(self, endpoint_id)
-        COMPUTED_CATALOG_REGION.invalidate()
+        self._invalidate_catalog()
         return ref
 
     def delete_endpoint(self, endpoint_id, initiator=None):
@@ -203,7 +238,7 @@ class Manager(manager.Manager):
             ret = self.driver.delete_endpoint(endpoint_id)
             notifications.Audit.deleted(self._ENDPOINT, endpoint_id, initiator)
             self.get_endpoint.invalidate(self, endpoint_id)
-            COMPUTED_CATALOG_REGION.invalidate()
+            self._invalidate_catalog()
             return ret
         except exception.NotFound:
             raise exception.EndpointNotFound(endpoint_id=endpoint_id)
@@ -226,28 +261,53 @@ class Manager(manager.Manager):
         except exception.NotFound:
             raise exception.NotFound('Catalog not found for user and tenant')
 
+    @MEMOIZE_CATALOG_SKELETON
+    def _get_v3_catalog_skeleton(self, version):
+        # The version is only part of the cache key.
+        return self.driver.get_v3_catalog_skeleton()
+
     @MEMOIZE_COMPUTED_CATALOG
-    def get_v3_catalog(self, user_id, tenant_id):
+    def _get_v3_catalog(self, user_id, tenant_id):
         return self.driver.get_v3_catalog(user_id, tenant_id)
 
+    def get_v3_catalog(self, user_id, tenant_id):
+        try:
+            skeleton = self._get_v3_catalog_skeleton(
+                self._get_catalog_version())
+        except exception.NotImplemented:
+            # The driver builds the catalog for each user and project, so
+            # cache each of them instead.
+            return self._get_v3_catalog(user_id, tenant_id)
+        return self.driver.format_v3_catalog(skeleton, user_id, tenant_id)
+
     def add_endpoint_to_project(self, endpoint_id, project_id):
         self.driver.add_endpoint_to_project(endpoint_id, project_id)
-        COMPUTED_CATALOG_REGION.invalidate()
+        self._invalidate_computed_catalog()
 
     def remove_endpoint_from_project(self, endpoint_id, project_id):
         self.driver.remove_endpoint_from_project(endpoint_id, project_id)
-        COMPUTED_CATALOG_REGION.invalidate()
+        self._invalidate_computed_catalog()
 
     def add_endpoint_group_to_project(self, endpoint_group_id, project_id):
         self.driver.add_endpoint_group_to_project(
             endpoint_group_id, project_id)
-        COMPUTED_CATALOG_REGION.invalidate()
+        self._invalidate_computed_catalog()
 
     def remove_endpoint_group_from_project(self, endpoint_group_id,
                                            project_id):
         self.driver.remove_endpoint_group_from_project(
             endpoint_group_id, project_id)
-        COMPUTED_CATALOG_REGION.invalidate()
+        self._invalidate_computed_catalog()
+
+    def update_endpoint_group(self, endpoint_group_id, endpoint_group):
+        ref = self.driver.update_endpoint_group(endpoint_group_id,
+                                                endpoint_group)
+        self._invalidate_computed_catalog()
+        return ref
+
+    def delete_endpoint_group(self, endpoint_group_id):
+        self.driver.delete_endpoint_group(endpoint_group_id)
+        self._invalidate_computed_catalog()
 
     def delete_endpoint_group_association_by_project(self, project_id):
         try:
@@ -317,6 +377,17 @@ class Manager(manager.Manager):
 
         return filtered_endpoints
 
+    @MEMOIZE_COMPUTED_CATALOG
+    def list_endpoint_ids_for_project(self, project_id):
+        """List the IDs of the endpoints associated with a project.
+
+        This is what filters the catalog of the project, so it is cached
+        along with the computed catalogs, which are invalidated whenever an
+        endpoint, endpoint group or association changes.
+
+        """
+        return sorted(self.list_endpoints_for_project(project_id))
+
     def delete_association_by_endpoint(self, endpoint_id):
         try:
             self.driver.delete_association_by_endpoint(endpoint_id)
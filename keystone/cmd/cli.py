@@ -17,6 +17,7 @@ from __future__ import print_function
 
 import os
 import sys
+import timeit
 import uuid
 
 from oslo_config import cfg
@@ -562,6 +563,50 @@ class FernetRotate(BasePermissionsSetup):
             fernet.rotate_keys(keystone_user_id, keystone_group_id)
 
 
+class IdentityReplicaSync(BaseApp):
+    """Refresh the SQL replicas of LDAP identity backends."""
+
+    name = 'identity_replica_sync'
+
+    @classmethod
+    def add_argument_parser(cls, subparsers):
+        parser = super(IdentityReplicaSync,
+                       cls).add_argument_parser(subparsers)
+        parser.add_argument('--domain-name', default=None,
+                            help=('Only refresh the replica of the domain '
+                                  'specified.'))
+        parser.add_argument('--full', default=False, action='store_true',
+                            help=('Read all the users and groups again, '
+                                  'rather than only the ones changed since '
+                                  'the last refresh.'))
+        return parser
+
+    @staticmethod
+    def main():
+        drivers = backends.load_backends()
+        identity_manager = drivers['identity_api']
+        domain_id = None
+        if CONF.command.domain_name is not None:
+            try:
+                domain_id = drivers['resource_api'].get_domain_by_name(
+                    CONF.command.domain_name)['id']
+            except exception.DomainNotFound:
+                raise SystemExit(_("Unknown domain '%(name)s' specified by "
+                                   "--domain-name") %
+                                 {'name': CONF.command.domain_name})
+        counts = identity_manager.sync_identity_replicas(
+            domain_id=domain_id, full=CONF.command.full)
+        if not counts:
+            raise SystemExit(_('No identity backend has a replica. Enable '
+                               '[ldap] use_sql_replica in the configuration '
+                               'of the LDAP backends to serve reads from '
+                               'one.'))
+        for domain_id, count in sorted(counts.items()):
+            print(_('Domain %(domain_id)s: read %(users)d users and '
+                    '%(groups)d groups, removed %(deleted)d.') %
+                  dict(count, domain_id=domain_id))
+
+
 class TokenFlush(BaseApp):
     """Flush expired tokens from the backend."""
 
@@ -580,6 +625,58 @@ class TokenFlush(BaseApp):
                         CONF.token.driver)
 
 
+class EffectiveAssignments(BaseApp):
+    """Rebuild or verify the stored effective role assignments."""
+
+    name = 'effective_assignments'
+
+    @classmethod
+    def add_argument_parser(cls, subparsers):
+        parser = super(EffectiveAssignments,
+                       cls).add_argument_parser(subparsers)
+        group = parser.add_mutually_exclusive_group(required=True)
+        group.add_argument('--rebuild', default=False, action='store_true',
+                           help=('Replace the stored effective role '
+                                 'assignments with freshly computed ones.'))
+        group.add_argument('--verify', default=False, action='store_true',
+                           help=('Compare the stored effective role '
+                                 'assignments with freshly computed ones, '
+                                 'and exit with a non-zero status if any '
+                                 'differ.'))
+        return parser
+
+    @staticmethod
+    def main():
+        drivers = backends.load_backends()
+        assignment_manager = drivers['assignment_api']
+        try:
+            if CONF.command.rebuild:
+                count = assignment_manager.rebuild_effective_role_ids()
+                print(_('Stored the effective roles of %d user and target '
+                        'pairs.') % count)
+                return
+            mismatches = assignment_manager.verify_effective_role_ids()
+        except exception.NotImplemented:
+            raise SystemExit(_('The assignment driver %s does not store '
+                               'effective role assignments.') %
+                             CONF.assignment.driver)
+        for (user_id, target_id, is_domain, stored, computed) in mismatches:
+            print(_('User %(user_id)s on %(target_type)s %(target_id)s: '
+                    'stored roles %(stored)s, computed roles %(computed)s') %
+                  {'user_id': user_id,
+                   'target_type': 'domain' if is_domain else 'project',
+                   'target_id': target_id,
+                   'stored': ', '.join(stored) or '-',
+                   'computed': ', '.join(computed) or '-'})
+        if mismatches:
+            raise SystemExit(_('%d stored effective role assignments differ '
+                               'from the computed ones. Run '
+                               'keystone-manage effective_assignments '
+                               '--rebuild to replace them.') %
+                             len(mismatches))
+        print(_('The stored effective role assignments are up to date.'))
+
+
 class MappingPurge(BaseApp):
     """Purge the mapping table."""
 
@@ -933,9 +1030,32 @@ class MappingEngineTester(BaseApp):
 
         assertion = MappingEngineTester.read_file(CONF.command.input)
         assertion = MappingEngineTester.normalize_assertion(assertion)
-        rp = mapping_engine.RuleProcessor(rules['rules'])
+        if CONF.command.benchmark:
+            MappingEngineTester.benchmark(rules, assertion,
+                                          CONF.command.iterations)
+            return
+        rp = mapping_engine.RuleProcessor(rules.get('id'), rules['rules'])
         print(jsonutils.dumps(rp.process(assertion), indent=2))
 
+    @staticmethod
+    def benchmark(rules, assertion, iterations):
+        """Print the average time taken to compile and process the rules."""
+        def compile_rules():
+            return mapping_engine.RuleProcessor(rules.get('id'),
+                                                rules['rules'])
+
+        rp = compile_rules()
+        steps = [
+            (_('compile'), compile_rules),
+            (_('process'), lambda: rp.process(assertion)),
+            (_('compile and process'),
+             lambda: compile_rules().process(assertion)),
+        ]
+        print(_('Average of %d iterations:') % iterations)
+        for name, step in steps:
+            elapsed = timeit.timeit(step, number=iterations)
+            print('%-20s %10.1f us' % (name, elapsed * 1e6 / iterations))
+
     @classmethod
     def add_argument_parser(cls, subparsers):
         parser = super(MappingEngineTester,
@@ -966,6 +1086,16 @@ class MappingEngineTester(BaseApp):
                             default=False, action="store_true",
                             help=("Enable debug messages from the mapping "
                                   "engine."))
+        parser.add_argument('--benchmark',
+                            default=False, action="store_true",
+                            help=("Rather than printing the result, print "
+                                  "the average time taken to compile the "
+                                  "rules, to process the input with the "
+                                  "compiled rules, and to do both, as when "
+                                  "the compiled rules aren't reused."))
+        parser.add_argument('--iterations', default=1000, type=int,
+                            help=("The number of times each step is run "
+                                  "with --benchmark."))
 
 
 CMDS = [
@@ -974,8 +1104,10 @@ CMDS = [
     DbVersion,
     Doctor,
     DomainConfigUpload,
+    EffectiveAssignments,
     FernetRotate,
     FernetSetup,
+    IdentityReplicaSync,
     MappingPurge,
     MappingEngineTester,
     PKISetup,
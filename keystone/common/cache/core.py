@@ -13,6 +13,8 @@
 # under the License.
 
 """Keystone Caching Layer Implementation."""
+import collections
+
 import dogpile.cache
 from dogpile.cache import api
 from oslo_cache import core as cache
@@ -125,3 +127,115 @@ def apply_invalidation_patch(region, region_name):
     invalidator = _RegionInvalidator(region=region, region_name=region_name)
     setattr(region, '_hard_invalidated', invalidator.hard_invalidated)
     setattr(region, '_soft_invalidated', invalidator.soft_invalidated)
+
+
+def get_memoized_values(memoize, method, owner, ids, load, region=None):
+    """Read the values of a memoized method for several IDs at once.
+
+    ``method`` must be a method memoized with ``memoize`` and taking a single
+    ID. The values cached for ``ids`` are read with one call to the cache
+    backend, and ``load`` is only called for the IDs that missed. The values
+    it returns are cached under the keys ``method`` uses, so that later calls
+    to ``method`` hit the cache too.
+
+    :param memoize: decorator from :func:`get_memoization_decorator`.
+    :param method: method memoized with ``memoize``, read from the class.
+    :param owner: the object ``method`` would be called on.
+    :param ids: list of IDs.
+    :param load: callable taking a list of IDs and returning a dictionary of
+                 the values of the ones that exist, keyed by ID.
+    :param region: the region ``memoize`` was created with.
+
+    :returns: a dictionary of values keyed by ID. IDs with no value are left
+              out.
+
+    """
+    if region is None:
+        region = CACHE_REGION
+    ids = list(collections.OrderedDict.fromkeys(ids))
+    if not ids:
+        return {}
+
+    key_generator = region.function_key_generator(None, method.original)
+    keys = [key_generator(owner, id_) for id_ in ids]
+    cached = region.get_multi(keys,
+                              expiration_time=memoize.get_expiration_time())
+
+    values = {}
+    missing = []
+    for id_, value in zip(ids, cached):
+        if value is api.NO_VALUE:
+            missing.append(id_)
+        else:
+            values[id_] = value
+    if missing:
+        loaded = load(missing)
+        values.update(loaded)
+        set_memoized_values(memoize, method, owner,
+                            dict((id_, loaded[id_]) for id_ in missing
+                                 if id_ in loaded),
+                            region=region)
+
+    return values
+
+
+def set_memoized_values(memoize, method, owner, values, region=None):
+    """Cache the values of a memoized method for several IDs at once.
+
+    :param memoize: decorator from :func:`get_memoization_decorator`.
+    :param method: method memoized with ``memoize``, read from the class.
+    :param owner: the object ``method`` would be called on.
+    :param values: dictionary of the values to cache, keyed by ID.
+    :param region: the region ``memoize`` was created with.
+
+    """
+    if region is None:
+        region = CACHE_REGION
+    key_generator = region.function_key_generator(None, method.original)
+    to_cache = dict((key_generator(owner, id_), value)
+                    for id_, value in values.items()
+                    if memoize.should_cache(value))
+    if to_cache:
+        region.set_multi(to_cache)
+
+
+def delete_memoized_values(method, owner, ids, region=None):
+    """Drop the cached values of a memoized method for several IDs at once.
+
+    :param method: method memoized in ``region``, read from the class.
+    :param owner: the object ``method`` would be called on.
+    :param ids: list of IDs.
+    :param region: the region ``method`` is memoized in.
+
+    """
+    if region is None:
+        region = CACHE_REGION
+    key_generator = region.function_key_generator(None, method.original)
+    keys = [key_generator(owner, id_) for id_ in ids]
+    if keys:
+        region.delete_multi(keys)
+
+
+def get_memoized_multi(memoize, method, owner, ids, load, region=None):
+    """Read several refs of a memoized method from the cache at once.
+
+    Like :func:`get_memoized_values`, for a ``method`` returning refs.
+
+    :param load: callable taking a list of IDs and returning a list of refs
+                 for the ones that exist.
+
+    :returns: a list of refs, in the order of ``ids``. IDs with no ref are
+              left out.
+
+    """
+    def load_refs(missing):
+        # NOTE: the backend may match IDs case insensitively, only keep the
+        # refs for the exact IDs asked for.
+        missing_ids = set(missing)
+        return dict((ref['id'], ref) for ref in load(missing)
+                    if ref['id'] in missing_ids)
+
+    refs = get_memoized_values(memoize, method, owner, ids, load_refs,
+                               region=region)
+    return [refs[id_] for id_ in collections.OrderedDict.fromkeys(ids)
+            if id_ in refs]
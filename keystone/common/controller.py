@@ -19,6 +19,7 @@ from oslo_log import log
 from oslo_log import versionutils
 from oslo_utils import strutils
 import six
+from six.moves import urllib
 
 from keystone.common import authorization
 from keystone.common import dependency
@@ -490,6 +491,7 @@ class V3Controller(wsgi.Application):
 
         if hints is not None:
             refs = cls.filter_by_attributes(refs, hints)
+            refs = cls.paginate(refs, hints)
 
         list_limited, refs = cls.limit(refs, hints)
 
@@ -504,9 +506,56 @@ class V3Controller(wsgi.Application):
 
         if list_limited:
             container['truncated'] = True
+            # Only a list ordered by ID can be continued after its last
+            # member.
+            if hints.paginated and refs:
+                container['links']['next'] = cls.next_url(
+                    context, refs[-1]['id'])
 
         return container
 
+    @classmethod
+    def next_url(cls, context, marker):
+        """Return the URL of the page of the collection after marker."""
+        query = [(key, value) for key, value in urllib.parse.parse_qsl(
+                 context['environment'].get('QUERY_STRING', ''),
+                 keep_blank_values=True) if key != 'marker']
+        query.append(('marker', marker))
+        return '%s?%s' % (cls.base_url(context, path=context['path']),
+                          urllib.parse.urlencode(query))
+
+    @classmethod
+    def paginate(cls, refs, hints):
+        """Start a list of entities after the marker, ordered by ID.
+
+        The underlying driver layer may have already paginated the collection
+        for us, but in case it was unable to we do it here. This is not
+        possible if the driver truncated the list without ordering it, or if
+        the entities have no ID.
+
+        :param refs: the list of members of the collection
+        :param hints: hints, containing, among other things, the marker and
+                      limit requested
+
+        :returns: the list of entities, from the first one after the marker.
+
+        """
+        if hints.paginated or (hints.marker is None and hints.limit is None):
+            return refs
+
+        if hints.limit is not None and hints.limit.get('truncated', False):
+            # The driver truncated the list without ordering it first
+            return refs
+
+        if not all('id' in ref for ref in refs):
+            return refs
+
+        refs = sorted(refs, key=lambda ref: ref['id'])
+        if hints.marker is not None:
+            refs = [ref for ref in refs if ref['id'] > hints.marker]
+        hints.paginated = True
+        return refs
+
     @classmethod
     def limit(cls, refs, hints):
         """Limit a list of entities.
@@ -606,6 +655,9 @@ class V3Controller(wsgi.Application):
     def build_driver_hints(cls, request, supported_filters):
         """Build list hints based on the context query string.
 
+        The ``marker`` and ``limit`` query parameters are taken as pagination
+        directives rather than filters.
+
         :param request: the current request
         :param supported_filters: list of filters supported, so ignore any
                                   keys in query_dict that are not in this list.
@@ -616,7 +668,26 @@ class V3Controller(wsgi.Application):
         if not request.params:
             return hints
 
+        marker = request.params.get('marker')
+        if marker is not None:
+            hints.set_marker(marker)
+
+        limit = request.params.get('limit')
+        if limit is not None:
+            try:
+                limit = int(limit)
+                if limit < 1:
+                    raise AssertionError()
+            except (ValueError, AssertionError):
+                msg = _('Invalid limit value')
+                raise exception.ValidationError(message=msg)
+            hints.set_page_limit(limit)
+
         for key, value in request.params.items():
+            if key in ('marker', 'limit'):
+                # These are pagination directives rather than filters
+                continue
+
             # Check if this is an exact filter
             if supported_filters is None or key in supported_filters:
                 hints.add_filter(key, value)
@@ -652,9 +723,6 @@ class V3Controller(wsgi.Application):
                                  comparator=comparator,
                                  case_sensitive=case_sensitive)
 
-        # NOTE(henry-nash): If we were to support pagination, we would pull any
-        # pagination directives out of the query_dict here, and add them into
-        # the hints list.
         return hints
 
     def _require_matching_id(self, value, ref):
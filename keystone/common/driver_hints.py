@@ -48,8 +48,10 @@ def truncated(f):
 
         # If we got more than the original limit then trim back the list and
         # mark it truncated.  In both cases, make sure we set the limit back
-        # to its original value.
-        if len(ref_list) > list_limit:
+        # to its original value. A page the driver didn't order is left
+        # whole, for the caller to paginate.
+        if len(ref_list) > list_limit and (hints.paginated or
+                                           not hints.paged):
             hints.set_limit(list_limit, truncated=True)
             return ref_list[:list_limit]
         else:
@@ -74,6 +76,13 @@ class Hints(object):
     accessed publicly. Also it contains a dict called limit, which will
     indicate the amount of data we want to limit our listing to.
 
+    For pagination, ``marker`` holds the ID of the last entity of the previous
+    page, and ``paged`` is set if the caller asked for a page, with a marker
+    or a limit of its own. A driver that returns its entities ordered by ID,
+    starting after the marker if there is one, sets ``paginated`` to indicate
+    so. Otherwise the caller pages through the list itself, so the driver
+    must not truncate it.
+
     If the filter is discovered to never match, then `cannot_match` can be set
     to indicate that there will not be any matches and the backend work can be
     short-circuited.
@@ -92,6 +101,9 @@ class Hints(object):
 
     def __init__(self):
         self.limit = None
+        self.marker = None
+        self.paged = False
+        self.paginated = False
         self.filters = list()
         self.cannot_match = False
 
@@ -113,3 +125,13 @@ class Hints(object):
     def set_limit(self, limit, truncated=False):
         """Set a limit to indicate the list should be truncated."""
         self.limit = {'limit': limit, 'type': 'limit', 'truncated': truncated}
+
+    def set_marker(self, marker):
+        """Set the ID of the entity the list should start after."""
+        self.marker = marker
+        self.paged = True
+
+    def set_page_limit(self, limit):
+        """Set the size of the page of the list the caller asked for."""
+        self.set_limit(limit)
+        self.paged = True
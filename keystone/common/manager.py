@@ -60,7 +60,9 @@ def response_truncated(f):
             return f(self, *args, **kwargs)
 
         list_limit = self.driver._get_list_limit()
-        if list_limit:
+        limit = kwargs['hints'].limit
+        # A smaller limit may have been asked for already.
+        if list_limit and (limit is None or limit['limit'] > list_limit):
             kwargs['hints'].set_limit(list_limit)
         return f(self, *args, **kwargs)
     return wrapper
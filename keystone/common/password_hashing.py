@@ -0,0 +1,300 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Hash and verify passwords off the request thread."""
+
+import datetime
+import hashlib
+import hmac
+import os
+import sys
+import threading
+import time
+
+from oslo_log import log
+from oslo_utils import timeutils
+import six
+from six.moves import queue
+
+from keystone.common import utils
+import keystone.conf
+from keystone import exception
+from keystone.i18n import _LW
+
+
+CONF = keystone.conf.CONF
+LOG = log.getLogger(__name__)
+
+
+class _Job(object):
+    __slots__ = ('func', 'args', 'done', 'result', 'exc_info', 'queued_at')
+
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+        self.done = threading.Event()
+        self.result = None
+        self.exc_info = None
+        self.queued_at = time.time()
+
+
+class HashingPool(object):
+    """A fixed set of threads running password hashing jobs.
+
+    At most `max_queue` jobs may wait for a worker; submitting another one
+    raises PasswordHashingBusy instead of blocking the request. With no
+    workers, jobs run on the calling thread. Either way the time spent
+    waiting for and running each job is recorded, and logged at debug level.
+
+    The workers are `threading` threads. If the process has monkeypatched
+    `threading` with eventlet, they are green threads: the pool still bounds
+    the number of requests hashing at once, but a hash blocks the hub while
+    it runs.
+
+    """
+
+    def __init__(self, workers, max_queue):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._threads = []
+        self._jobs = 0
+        self._rejected = 0
+        self._max_queue_depth = 0
+        self._wait_seconds = 0.0
+        self._hash_seconds = 0.0
+        self._max_hash_seconds = 0.0
+
+    def _start(self):
+        # NOTE: threads do not survive a fork, so a process forked after the
+        # pool was first used starts its own workers.
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._threads = []
+            for _ in range(self.workers):
+                worker = threading.Thread(target=self._work)
+                worker.daemon = True
+                worker.start()
+                self._threads.append(worker)
+            self._pid = os.getpid()
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            self._run(job)
+
+    def stop(self):
+        """Stop the workers once the jobs already queued have run."""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self._pid = None
+        for _ in range(self.workers):
+            self._queue.put(None)
+
+    def _run(self, job):
+        started = time.time()
+        try:
+            job.result = job.func(*job.args)
+        except Exception:
+            job.exc_info = sys.exc_info()
+        finished = time.time()
+        with self._lock:
+            self._jobs += 1
+            self._wait_seconds += started - job.queued_at
+            self._hash_seconds += finished - started
+            self._max_hash_seconds = max(self._max_hash_seconds,
+                                         finished - started)
+        LOG.debug('Password hashing job waited %(wait).3fs for a worker and '
+                  'ran in %(run).3fs, pool stats: %(stats)s',
+                  {'wait': started - job.queued_at, 'run': finished - started,
+                   'stats': self.stats()})
+        job.done.set()
+
+    def submit(self, func, *args):
+        """Run `func(*args)` on a worker and return its result.
+
+        :raises keystone.exception.PasswordHashingBusy: If the queue of jobs
+            waiting for a worker is full.
+
+        """
+        job = _Job(func, args)
+        if not self.workers:
+            self._run(job)
+        else:
+            self._start()
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                with self._lock:
+                    self._rejected += 1
+                LOG.warning(_LW('Rejecting password hashing request, %(jobs)d '
+                                'jobs are already waiting for a worker, pool '
+                                'stats: %(stats)s'),
+                            {'jobs': self.max_queue, 'stats': self.stats()})
+                raise exception.PasswordHashingBusy()
+            depth = self._queue.qsize()
+            with self._lock:
+                self._max_queue_depth = max(self._max_queue_depth, depth)
+            job.done.wait()
+        if job.exc_info is not None:
+            six.reraise(*job.exc_info)
+        return job.result
+
+    def stats(self):
+        """Return counters describing the work done by the pool."""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'jobs': self._jobs,
+                'rejected': self._rejected,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self._max_queue_depth,
+                'wait_seconds': self._wait_seconds,
+                'hash_seconds': self._hash_seconds,
+                'max_hash_seconds': self._max_hash_seconds,
+            }
+
+
+class VerifiedPasswordCache(object):
+    """Remember which password and stored hash pairs recently matched.
+
+    Entries are HMAC-SHA256 digests of the stored hash and the password,
+    keyed with a pepper generated per cache, so neither value is kept and the
+    digests are useless outside this process. The stored hash is part of the
+    digest, so changing a password (or its salt) orphans the old entry.
+
+    """
+
+    def __init__(self, cache_time, max_size):
+        self.cache_time = cache_time
+        self.max_size = max_size
+        self._pepper = os.urandom(32)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _digest(self, password, hashed):
+        return hmac.new(self._pepper,
+                        b'\0'.join([hashed.encode('utf-8'),
+                                    password.encode('utf-8')]),
+                        hashlib.sha256).digest()
+
+    def check(self, password, hashed):
+        """Return True if the pair was verified within the cache time."""
+        digest = self._digest(password, hashed)
+        with self._lock:
+            expires_at = self._entries.get(digest)
+            if expires_at is not None and expires_at > timeutils.utcnow():
+                self._hits += 1
+                return True
+            self._entries.pop(digest, None)
+            self._misses += 1
+            return False
+
+    def add(self, password, hashed):
+        """Record that the pair was just verified."""
+        digest = self._digest(password, hashed)
+        now = timeutils.utcnow()
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                self._entries = {k: v for k, v in self._entries.items()
+                                 if v > now}
+                if len(self._entries) >= self.max_size:
+                    self._entries.clear()
+            self._entries[digest] = now + datetime.timedelta(
+                seconds=self.cache_time)
+
+    def stats(self):
+        """Return counters describing the use of the cache."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+            }
+
+
+_POOL = None
+_CACHE = None
+_LOCK = threading.Lock()
+
+
+def _get_pool():
+    global _POOL
+    workers = CONF.identity.password_hash_workers
+    max_queue = CONF.identity.password_hash_queue_size
+    old_pool = None
+    with _LOCK:
+        if (_POOL is None or _POOL.workers != workers or
+                _POOL.max_queue != max_queue):
+            old_pool, _POOL = _POOL, HashingPool(workers, max_queue)
+        pool = _POOL
+    if old_pool is not None:
+        # The configuration changed, the workers of the previous pool finish
+        # the jobs already queued and exit.
+        old_pool.stop()
+    return pool
+
+
+def _get_cache():
+    global _CACHE
+    cache_time = CONF.identity.verified_password_cache_time
+    if not cache_time:
+        return None
+    max_size = CONF.identity.verified_password_cache_size
+    with _LOCK:
+        if (_CACHE is None or _CACHE.cache_time != cache_time or
+                _CACHE.max_size != max_size):
+            _CACHE = VerifiedPasswordCache(cache_time, max_size)
+        return _CACHE
+
+
+def hash_password(password):
+    """Hash a password using the hashing pool."""
+    return _get_pool().submit(utils.hash_password, password)
+
+
+def hash_user_password(user):
+    """Hash a user dict's password without modifying the passed-in dict."""
+    password = user.get('password')
+    if password is None:
+        return user
+
+    return dict(user, password=hash_password(password))
+
+
+def check_password(password, hashed):
+    """Check that a plaintext password matches hashed.
+
+    Pairs that matched within `[identity] verified_password_cache_time` are
+    accepted without hashing the password again.
+
+    """
+    if password is None or hashed is None:
+        return False
+    cache = _get_cache()
+    if cache is not None:
+        verified = cache.check(password, hashed)
+        LOG.debug('Verified password cache stats: %s', cache.stats())
+        if verified:
+            return True
+    verified = _get_pool().submit(utils.check_password, password, hashed)
+    if verified and cache is not None:
+        cache.add(password, hashed)
+    return verified
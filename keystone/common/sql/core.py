@@ -19,6 +19,7 @@ CONF() because it sets up configuration options.
 
 """
 import functools
+import re
 
 from oslo_db import exception as db_exception
 from oslo_db import options as db_options
@@ -130,17 +131,20 @@ class DictBase(models.ModelBase):
 
         return cls(**new_d)
 
-    def to_dict(self, include_extra_dict=False):
+    def to_dict(self, include_extra_dict=False, exclude=()):
         """Return the model's attributes as a dictionary.
 
         If include_extra_dict is True, 'extra' attributes are literally
         included in the resulting dictionary twice, for backwards-compatibility
         with a broken implementation.
 
+        Attributes named in exclude are left out without being read.
+
         """
         d = self.extra.copy()
         for attr in self.__class__.attributes:
-            d[attr] = getattr(self, attr)
+            if attr not in exclude:
+                d[attr] = getattr(self, attr)
 
         if include_extra_dict:
             d['extra'] = self.extra.copy()
@@ -260,6 +264,24 @@ class _WontMatch(Exception):
         # Otherwise the value could match a value in the column.
 
 
+_INEXACT_PATTERNS = {
+    'contains': '%(any)s%(value)s%(any)s',
+    'startswith': '%(value)s%(any)s',
+    'endswith': '%(any)s%(value)s',
+}
+
+
+def _like_escape(value):
+    """Escape the LIKE wildcards in a value, with backslash as escape."""
+    return (value.replace('\\', '\\\\')
+            .replace('%', '\\%').replace('_', '\\_'))
+
+
+def _glob_escape(value):
+    """Escape the GLOB wildcards in a value."""
+    return re.sub(r'([*?\[])', r'[\1]', value)
+
+
 def _filter(model, query, hints):
     """Apply filtering to a query.
 
@@ -285,30 +307,41 @@ def _filter(model, query, hints):
                         satisfy
 
         """
+        if filter_['comparator'] not in _INEXACT_PATTERNS:
+            # It's a filter we don't understand, so let the caller
+            # work out if they need to do something with it.
+            return query
+
         column_attr = getattr(model, filter_['name'])
+        _WontMatch.check(filter_['value'], column_attr)
+        pattern = _INEXACT_PATTERNS[filter_['comparator']]
 
-        # TODO(henry-nash): Sqlalchemy 0.7 defaults to case insensitivity
-        # so once we find a way of changing that (maybe on a call-by-call
-        # basis), we can add support for the case sensitive versions of
-        # the filters below.  For now, these case sensitive versions will
-        # be handled at the controller level.
+        # NOTE: comparing lower() of the column rather than using ILIKE lets
+        # PostgreSQL use the lower() indexes, and prefix searches become
+        # index range scans.
+        query_term = sql.func.lower(column_attr).like(
+            pattern % {'any': '%',
+                       'value': _like_escape(filter_['value'].lower())},
+            escape='\\')
 
         if filter_['case_sensitive']:
-            return query
-
-        if filter_['comparator'] == 'contains':
-            _WontMatch.check(filter_['value'], column_attr)
-            query_term = column_attr.ilike('%%%s%%' % filter_['value'])
-        elif filter_['comparator'] == 'startswith':
-            _WontMatch.check(filter_['value'], column_attr)
-            query_term = column_attr.ilike('%s%%' % filter_['value'])
-        elif filter_['comparator'] == 'endswith':
-            _WontMatch.check(filter_['value'], column_attr)
-            query_term = column_attr.ilike('%%%s' % filter_['value'])
-        else:
-            # It's a filter we don't understand, so let the caller
-            # work out if they need to do something with it.
-            return query
+            dialect = query.session.get_bind().dialect.name
+            like_value = pattern % {'any': '%',
+                                    'value': _like_escape(filter_['value'])}
+            if dialect == 'postgresql':
+                case_term = column_attr.like(like_value, escape='\\')
+            elif dialect == 'mysql':
+                case_term = column_attr.like(sql.func.binary(like_value),
+                                             escape='\\')
+            elif dialect == 'sqlite':
+                case_term = column_attr.op('GLOB')(
+                    pattern % {'any': '*',
+                               'value': _glob_escape(filter_['value'])})
+            else:
+                # We don't know how to compare case on this database, so
+                # narrow the query down and leave the rest to the caller.
+                return query.filter(query_term)
+            query_term = sql.and_(query_term, case_term)
 
         satisfied_filters.append(filter_)
         return query.filter(query_term)
@@ -358,6 +391,32 @@ def _filter(model, query, hints):
         return
 
 
+def _paginate(model, query, hints):
+    """Order a query by ID and start it after the marker, if any.
+
+    Ordering by the primary key keeps pages stable, and lets each page be
+    read with an indexed range scan instead of an offset.
+
+    :param model: the table model in question
+    :param query: query to paginate
+    :param hints: contains the marker and limit details. ``paginated`` is
+                  set if the query could be paginated.
+
+    :returns: updated query
+
+    """
+    if hints.marker is None and hints.limit is None:
+        return query
+    if not hasattr(model, 'id'):
+        # Without a single ID column there is nothing to page on, so leave it
+        # to the caller.
+        return query
+    if hints.marker is not None:
+        query = query.filter(model.id > hints.marker)
+    hints.paginated = True
+    return query.order_by(model.id)
+
+
 def _limit(query, hints):
     """Apply a limit to a query.
 
@@ -367,9 +426,6 @@ def _limit(query, hints):
     :returns: updated query
 
     """
-    # NOTE(henry-nash): If we were to implement pagination, then we
-    # we would expand this method to support pagination and limiting.
-
     # If we satisfied all the filters, set an upper limit if supplied
     if hints.limit:
         original_len = query.count()
@@ -381,7 +437,7 @@ def _limit(query, hints):
 
 
 def filter_limit_query(model, query, hints):
-    """Apply filtering and limit to a query.
+    """Apply filtering, pagination and limit to a query.
 
     :param model: table model
     :param query: query to apply filters to
@@ -404,6 +460,10 @@ def filter_limit_query(model, query, hints):
         # Nothing's going to match, so don't bother with the query.
         return []
 
+    # Starting after the marker doesn't change which entities the remaining
+    # filters would match, so pagination can be applied in any case.
+    query = _paginate(model, query, hints)
+
     # NOTE(henry-nash): Any unsatisfied filters will have been left in
     # the hints list for the controller to handle. We can only try and
     # limit here if all the filters are already satisfied since, if not,
@@ -0,0 +1,33 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+# The name columns that list APIs filter on with inexact comparators.
+_NAME_COLUMNS = [('local_user', 'name'),
+                 ('group', 'name'),
+                 ('project', 'name'),
+                 ('role', 'name')]
+
+
+def upgrade(migrate_engine):
+    # NOTE: only PostgreSQL both supports indexes on lower() and uses them
+    # for the LIKE prefix searches of case insensitive filters. The
+    # text_pattern_ops operator class makes LIKE usable whatever the
+    # database's collation is.
+    if migrate_engine.name != 'postgresql':
+        return
+
+    for table_name, column_name in _NAME_COLUMNS:
+        migrate_engine.execute(
+            'CREATE INDEX "ix_%(table)s_%(column)s_lower" ON "%(table)s" '
+            '(lower("%(column)s") text_pattern_ops)' %
+            {'table': table_name, 'column': column_name})
@@ -0,0 +1,69 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import sqlalchemy as sql
+
+
+def upgrade(migrate_engine):
+    meta = sql.MetaData()
+    meta.bind = migrate_engine
+
+    ldap_replica_user_table = sql.Table(
+        'ldap_replica_user',
+        meta,
+        sql.Column('source_id', sql.String(64), nullable=False),
+        sql.Column('id', sql.String(64), nullable=False),
+        sql.Column('name', sql.String(255), nullable=False),
+        sql.Column('enabled', sql.Boolean, nullable=True),
+        sql.Column('ref', sql.Text, nullable=False),
+        sql.PrimaryKeyConstraint('source_id', 'id'),
+        sql.Index('ix_ldap_replica_user_source_id_name', 'source_id', 'name'),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8')
+    ldap_replica_user_table.create(migrate_engine, checkfirst=True)
+
+    ldap_replica_group_table = sql.Table(
+        'ldap_replica_group',
+        meta,
+        sql.Column('source_id', sql.String(64), nullable=False),
+        sql.Column('id', sql.String(64), nullable=False),
+        sql.Column('name', sql.String(255), nullable=False),
+        sql.Column('ref', sql.Text, nullable=False),
+        sql.PrimaryKeyConstraint('source_id', 'id'),
+        sql.Index('ix_ldap_replica_group_source_id_name', 'source_id',
+                  'name'),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8')
+    ldap_replica_group_table.create(migrate_engine, checkfirst=True)
+
+    ldap_replica_membership_table = sql.Table(
+        'ldap_replica_membership',
+        meta,
+        sql.Column('source_id', sql.String(64), nullable=False),
+        sql.Column('user_id', sql.String(64), nullable=False),
+        sql.Column('group_id', sql.String(64), nullable=False),
+        sql.PrimaryKeyConstraint('source_id', 'user_id', 'group_id'),
+        sql.Index('ix_ldap_replica_membership_source_id_group_id',
+                  'source_id', 'group_id'),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8')
+    ldap_replica_membership_table.create(migrate_engine, checkfirst=True)
+
+    ldap_replica_state_table = sql.Table(
+        'ldap_replica_state',
+        meta,
+        sql.Column('source_id', sql.String(64), primary_key=True),
+        sql.Column('change_value', sql.String(64), nullable=True),
+        sql.Column('synced_at', sql.DateTime, nullable=False),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8')
+    ldap_replica_state_table.create(migrate_engine, checkfirst=True)
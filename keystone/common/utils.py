@@ -23,6 +23,7 @@ import hashlib
 import itertools
 import os
 import pwd
+import re
 import uuid
 
 from oslo_log import log
@@ -604,6 +605,106 @@ def remove_standard_port(url):
     return moves.urllib.parse.urlunparse(o)
 
 
+# Matches either an escaped percent sign or a "%(key)" mapping key, scanning
+# the template left to right in the same way the % operator does.
+_URL_TEMPLATE_TOKEN = re.compile(r'%(?:%|\(([^)]*)\))')
+
+# The number of distinct endpoint URLs kept compiled. Deployments have far
+# fewer endpoints than this; the bound only protects against unbounded growth
+# when URLs are edited many times over the life of a process.
+_URL_TEMPLATE_CACHE_SIZE = 1024
+_URL_TEMPLATES = {}
+
+_STATIC_URL_SUBSTITUTIONS = None
+
+
+class URLTemplate(object):
+    """A user-defined URL parsed once so it can be formatted repeatedly.
+
+    Parsing converts the ``$(key)s`` placeholders to ``%(key)s`` and records
+    which keys the URL refers to, so formatting only has to look up those keys
+    instead of filtering every substitution through the whitelist.
+
+    """
+
+    def __init__(self, url):
+        self.url = url
+        try:
+            self._template = url.replace('$(', '%(')
+        except AttributeError:
+            LOG.error(_LE('Malformed endpoint - %(url)r is not a string'),
+                      {"url": url})
+            raise exception.MalformedEndpoint(endpoint=url)
+        keys = []
+        for match in _URL_TEMPLATE_TOKEN.finditer(self._template):
+            key = match.group(1)
+            if key is not None and key not in keys:
+                keys.append(key)
+        # Keys are kept in the order they appear in so that a missing key is
+        # reported the same way the % operator would report it.
+        self.keys = tuple(keys)
+
+    def format(self, substitutions, silent_keyerror_failures=None):
+        """Format the URL with the given substitutions.
+
+        :param dict substitutions: the dictionary used for substitution
+        :param list silent_keyerror_failures: keys for which we should be
+            silent if there is a KeyError exception on substitution attempt
+        :returns: a formatted URL
+
+        """
+        allow_keyerror = silent_keyerror_failures or []
+        try:
+            values = {}
+            for key in self.keys:
+                if key not in WHITELISTED_PROPERTIES:
+                    raise KeyError
+                values[key] = substitutions[key]
+            result = self._template % values
+        except KeyError as e:
+            if not e.args or e.args[0] not in allow_keyerror:
+                LOG.error(_LE("Malformed endpoint %(url)s - unknown key "
+                              "%(keyerror)s"),
+                          {"url": self.url,
+                           "keyerror": e})
+                raise exception.MalformedEndpoint(endpoint=self.url)
+            else:
+                result = None
+        except TypeError as e:
+            LOG.error(_LE("Malformed endpoint '%(url)s'. The following type "
+                          "error occurred during string substitution: "
+                          "%(typeerror)s"),
+                      {"url": self.url,
+                       "typeerror": e})
+            raise exception.MalformedEndpoint(endpoint=self.url)
+        except ValueError as e:
+            LOG.error(_LE("Malformed endpoint %s - incomplete format "
+                          "(are you missing a type notifier ?)"), self.url)
+            raise exception.MalformedEndpoint(endpoint=self.url)
+        return result
+
+
+def compile_url(url):
+    """Return the parsed URLTemplate for a user-defined URL.
+
+    Templates are cached by URL, so each distinct endpoint URL is only parsed
+    once per process.
+
+    :param string url: the URL to be parsed
+    :rtype: URLTemplate
+    :raises keystone.exception.MalformedEndpoint: if the URL is not a string
+
+    """
+    if not isinstance(url, six.string_types):
+        return URLTemplate(url)
+    template = _URL_TEMPLATES.get(url)
+    if template is None:
+        if len(_URL_TEMPLATES) >= _URL_TEMPLATE_CACHE_SIZE:
+            _URL_TEMPLATES.clear()
+        template = _URL_TEMPLATES[url] = URLTemplate(url)
+    return template
+
+
 def format_url(url, substitutions, silent_keyerror_failures=None):
     """Format a user-defined URL with the given substitutions.
 
@@ -614,36 +715,46 @@ def format_url(url, substitutions, silent_keyerror_failures=None):
     :returns: a formatted URL
 
     """
-    substitutions = WhiteListedItemFilter(
-        WHITELISTED_PROPERTIES,
-        substitutions)
-    allow_keyerror = silent_keyerror_failures or []
-    try:
-        result = url.replace('$(', '%(') % substitutions
-    except AttributeError:
-        LOG.error(_LE('Malformed endpoint - %(url)r is not a string'),
-                  {"url": url})
-        raise exception.MalformedEndpoint(endpoint=url)
-    except KeyError as e:
-        if not e.args or e.args[0] not in allow_keyerror:
-            LOG.error(_LE("Malformed endpoint %(url)s - unknown key "
-                          "%(keyerror)s"),
-                      {"url": url,
-                       "keyerror": e})
-            raise exception.MalformedEndpoint(endpoint=url)
-        else:
-            result = None
-    except TypeError as e:
-        LOG.error(_LE("Malformed endpoint '%(url)s'. The following type error "
-                      "occurred during string substitution: %(typeerror)s"),
-                  {"url": url,
-                   "typeerror": e})
-        raise exception.MalformedEndpoint(endpoint=url)
-    except ValueError as e:
-        LOG.error(_LE("Malformed endpoint %s - incomplete format "
-                      "(are you missing a type notifier ?)"), url)
-        raise exception.MalformedEndpoint(endpoint=url)
-    return result
+    return compile_url(url).format(
+        substitutions, silent_keyerror_failures=silent_keyerror_failures)
+
+
+def reset_url_substitutions(*args, **kwargs):
+    """Forget the configuration values used to format endpoint URLs.
+
+    The catalog manager registers this as a configuration mutate hook so that
+    the values are read again after the configuration files are reloaded.
+
+    """
+    global _STATIC_URL_SUBSTITUTIONS
+    _STATIC_URL_SUBSTITUTIONS = None
+
+
+
+def get_url_substitutions(**kwargs):
+    """Return the substitutions used to format endpoint URLs.
+
+    The whitelisted configuration values are only read once per configuration
+    load. Request specific values, such as ``user_id`` and ``project_id``,
+    are passed as keyword arguments and added to a copy of them.
+
+    :returns: a new dict of substitutions
+
+    """
+    global _STATIC_URL_SUBSTITUTIONS
+    static = _STATIC_URL_SUBSTITUTIONS
+    if static is None:
+        static = {}
+        # Options in [eventlet_server] take precedence over the ones of the
+        # same name in [DEFAULT].
+        for group in (CONF, CONF.eventlet_server):
+            for key in WHITELISTED_PROPERTIES:
+                if key in group:
+                    static[key] = group[key]
+        _STATIC_URL_SUBSTITUTIONS = static
+    substitutions = dict(static)
+    substitutions.update(kwargs)
+    return substitutions
 
 
 def check_endpoint_url(url):
@@ -34,11 +34,40 @@ prohibited_implied_role = cfg.ListOpt(
 A list of role names which are prohibited from being an implied role.
 """))
 
+materialize_effective_assignments = cfg.BoolOpt(
+    'materialize_effective_assignments',
+    default=False,
+    help=utils.fmt("""
+If set to true, the effective roles of a user on a project or domain are
+stored by the assignment driver the first time they are computed, and are
+removed again when a change to role assignments, group membership, projects or
+implied roles could affect them. Computing the roles of a user for a token
+then becomes a single lookup, instead of a walk over direct, group, inherited
+and implied role assignments. Only the `sql` driver supports this. Stored roles
+do not expire, so do not enable this if group membership is changed directly
+in an identity backend such as LDAP, rather than through keystone. Use
+`keystone-manage effective_assignments` to rebuild or verify the stored
+assignments.
+"""))
+
+effective_assignment_build_timeout = cfg.IntOpt(
+    'effective_assignment_build_timeout',
+    default=60,
+    min=1,
+    help=utils.fmt("""
+The number of seconds after which the stored effective roles of a user on a
+project or domain that are still being computed are assumed to have failed,
+and are computed again. This has no effect unless `[assignment]
+materialize_effective_assignments` is enabled.
+"""))
+
 
 GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
     driver,
-    prohibited_implied_role
+    prohibited_implied_role,
+    materialize_effective_assignments,
+    effective_assignment_build_timeout,
 ]
 
 
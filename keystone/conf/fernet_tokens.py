@@ -53,11 +53,25 @@ highest numerical index), and one secondary key (every other index). Increasing
 this value means that additional secondary keys will be kept in the rotation.
 """))
 
+key_repository_check_interval = cfg.IntOpt(
+    'key_repository_check_interval',
+    default=10,
+    min=0,
+    help=utils.fmt("""
+Keystone caches the keys loaded from `[fernet_tokens] key_repository` in
+memory, and reloads them when the modification time of the repository
+directory changes (as it does when `keystone-manage fernet_rotate` is run or
+keys are distributed). This is the number of seconds between checks of the
+repository, during which issuing and validating tokens does not touch the
+filesystem. Set to 0 to check before every use of the keys.
+"""))
+
 
 GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
     key_repository,
     max_active_keys,
+    key_repository_check_interval,
 ]
 
 
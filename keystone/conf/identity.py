@@ -93,6 +93,17 @@ Time to cache identity data (in seconds). This has no effect unless global and
 identity caching are enabled.
 """))
 
+warm_group_membership_cache = cfg.BoolOpt(
+    'warm_group_membership_cache',
+    default=False,
+    help=utils.fmt("""
+Cache the members of every group of a domain that is not backed by SQL (such
+as LDAP) the first time the group memberships of one of its users are needed,
+rather than searching for the groups of each user in turn. The memberships are
+kept for `[identity] cache_time` seconds. This has no effect unless global and
+identity caching are enabled.
+"""))
+
 max_password_length = cfg.IntOpt(
     'max_password_length',
     default=4096,
@@ -102,6 +113,54 @@ Maximum allowed length for user passwords. Decrease this value to improve
 performance. Changing this value does not effect existing passwords.
 """))
 
+password_hash_workers = cfg.IntOpt(
+    'password_hash_workers',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Number of worker threads per keystone process used to hash and verify SQL user
+passwords. When set to 0 (the default), passwords are hashed on the thread
+serving the request. A pool bounds how many requests can be busy hashing at
+once, so that a burst of authentication requests cannot tie up every thread of
+a keystone process. The workers are Python threads; if keystone runs under a
+server that monkeypatches threading with eventlet, they are green threads and
+hashing still blocks the process while it runs.
+"""))
+
+password_hash_queue_size = cfg.IntOpt(
+    'password_hash_queue_size',
+    default=64,
+    min=1,
+    help=utils.fmt("""
+Maximum number of password hashing jobs allowed to wait for a worker thread.
+Requests arriving while the queue is full are rejected with an HTTP 503
+Service Unavailable error. This has no effect unless `[identity]
+password_hash_workers` is greater than 0.
+"""))
+
+verified_password_cache_time = cfg.IntOpt(
+    'verified_password_cache_time',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Time (in seconds) a keystone process remembers that a password matched a
+stored password hash, so that repeated authentication with the same
+credentials does not repeat the `[DEFAULT] crypt_strength` rounds of hashing.
+Only a keyed digest of the password and stored hash is kept, in memory, using
+a key generated when the process starts; changing a password invalidates the
+entry. Set to 0 (the default) to disable this cache.
+"""))
+
+verified_password_cache_size = cfg.IntOpt(
+    'verified_password_cache_size',
+    default=4096,
+    min=1,
+    help=utils.fmt("""
+Maximum number of entries kept per keystone process by the verified password
+cache. This has no effect unless `[identity] verified_password_cache_time` is
+greater than 0.
+"""))
+
 list_limit = cfg.IntOpt(
     'list_limit',
     help=utils.fmt("""
@@ -118,7 +177,12 @@ ALL_OPTS = [
     driver,
     caching,
     cache_time,
+    warm_group_membership_cache,
     max_password_length,
+    password_hash_workers,
+    password_hash_queue_size,
+    verified_password_cache_time,
+    verified_password_cache_size,
     list_limit,
 ]
 
@@ -109,6 +109,20 @@ from the LDAP server when listing objects. A value of zero (`0`) disables
 paging.
 """))
 
+search_pipeline_depth = cfg.IntOpt(
+    'search_pipeline_depth',
+    default=4,
+    min=1,
+    help=utils.fmt("""
+The maximum number of searches keystone sends to the LDAP server without
+waiting for their results, when it needs the results of several searches at
+once (for example to look up many users or groups by ID). Sending them together
+saves a round trip to the server per search. When `[ldap] use_pool` is
+enabled, each search in flight holds a connection of the pool, so no more
+searches are sent at once than the pool has connections left. A value of one
+(`1`) sends the searches one at a time.
+"""))
+
 alias_dereferencing = cfg.StrOpt(
     'alias_dereferencing',
     default='default',
@@ -311,6 +325,20 @@ to determine membership in the emulated enabled group. Enabling this option has
 no effect unless `[ldap] user_enabled_emulation` is also enabled.
 """))
 
+user_enabled_emulation_cache_time = cfg.IntOpt(
+    'user_enabled_emulation_cache_time',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+The time, in seconds, for which keystone keeps the members of the emulated
+enabled group in memory, to tell whether users are enabled without searching
+the group. Changes made to the group by other processes or outside of keystone
+may take this long to be seen. A value of zero (`0`) reads the members of the
+group again for each list of users, and searches the group for each user read
+on its own. Setting this option has no effect unless `[ldap]
+user_enabled_emulation` is also enabled.
+"""))
+
 user_additional_attribute_mapping = cfg.ListOpt(
     'user_additional_attribute_mapping',
     default=[],
@@ -553,6 +581,31 @@ removed from the connection pool. This option has no effect unless `[ldap]
 use_auth_pool` is also enabled.
 """))
 
+use_sql_replica = cfg.BoolOpt(
+    'use_sql_replica',
+    default=False,
+    help=utils.fmt("""
+Enable this option to serve reads of users, groups and group memberships from a
+copy of the directory kept in the SQL database, rather than by searching the
+LDAP server. The copy is refreshed by `keystone-manage identity_replica_sync`,
+which should be run periodically (for example from cron). Until it has been run
+once, reads are served by the LDAP server. Users and groups that are not in the
+copy yet are read from the LDAP server and added to it. Passwords are still
+checked by binding to the LDAP server. Changes made outside of keystone are
+seen once the copy is next refreshed.
+"""))
+
+sql_replica_change_attribute = cfg.StrOpt(
+    'sql_replica_change_attribute',
+    default='modifyTimestamp',
+    help=utils.fmt("""
+The LDAP attribute the server updates whenever an entry is changed. Each
+refresh of the SQL copy of the directory only reads the users and groups whose
+value is at least that of the last refresh. Use `uSNChanged` with Active
+Directory. This option has no effect unless `[ldap] use_sql_replica` is also
+enabled.
+"""))
+
 
 GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
@@ -565,6 +618,7 @@ ALL_OPTS = [
     allow_subtree_delete,
     query_scope,
     page_size,
+    search_pipeline_depth,
     alias_dereferencing,
     debug_level,
     chase_referrals,
@@ -588,6 +642,7 @@ ALL_OPTS = [
     user_enabled_emulation,
     user_enabled_emulation_dn,
     user_enabled_emulation_use_group_config,
+    user_enabled_emulation_cache_time,
     user_additional_attribute_mapping,
     group_tree_dn,
     group_filter,
@@ -615,6 +670,8 @@ ALL_OPTS = [
     use_auth_pool,
     auth_pool_size,
     auth_pool_connection_lifetime,
+    use_sql_replica,
+    sql_replica_change_attribute,
 ]
 
 
@@ -92,6 +92,20 @@ with a URL-unsafe domain name will fail, thereby forcing all domain names to be
 updated to be URL-safe.
 """))
 
+hierarchy_index_cache_time = cfg.IntOpt(
+    'hierarchy_index_cache_time',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Time in seconds to keep an in-process index of the project hierarchy of each
+domain. Subtree, parent and enabled-state checks of projects, including the
+ones made when expanding inherited role assignments and when cascading project
+updates and deletes, are then answered from the index instead of the database.
+Changes made through this keystone process update the index immediately, but
+changes made through other processes are only seen once it expires. A value of
+0 disables the index.
+"""))
+
 
 GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
@@ -103,6 +117,7 @@ ALL_OPTS = [
     admin_project_name,
     project_name_url_safe,
     domain_name_url_safe,
+    hierarchy_index_cache_time,
 ]
 
 
@@ -33,6 +33,33 @@ The number of seconds after a token has expired before a corresponding
 revocation event may be purged from the backend.
 """))
 
+sync_interval = cfg.IntOpt(
+    'sync_interval',
+    default=1,
+    min=0,
+    help=utils.fmt("""
+The number of seconds between polls of the backend for revocation events
+recorded since the last poll. Each keystone process keeps its own in-memory
+copy of the revocation events used to validate tokens, so this is the longest
+a token revoked by another process may still be accepted by this one. Events
+revoked by this process are seen immediately. Set to 0 to poll before every
+token validation.
+"""))
+
+sync_overlap = cfg.IntOpt(
+    'sync_overlap',
+    default=60,
+    min=1,
+    help=utils.fmt("""
+The number of seconds before the newest revocation event already seen from
+which each poll of the backend lists events again. The revocation time of an
+event is set by the keystone process that records it, before it is committed,
+so an event can become visible after a newer one has already been polled. This
+should be larger than the clock skew between keystone nodes plus the time it
+takes to record an event; events recorded later than that are not seen by
+processes that have already polled past them.
+"""))
+
 caching = cfg.BoolOpt(
     'caching',
     default=True,
@@ -56,6 +83,8 @@ GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
     driver,
     expiration_buffer,
+    sync_interval,
+    sync_overlap,
     caching,
     cache_time,
 ]
@@ -15,7 +15,6 @@
 
 from keystone.catalog.backends import sql
 from keystone.common import dependency
-from keystone.common import utils
 import keystone.conf
 
 
@@ -24,54 +23,24 @@ CONF = keystone.conf.CONF
 
 @dependency.requires('catalog_api')
 class EndpointFilterCatalog(sql.Catalog):
-    def get_v3_catalog(self, user_id, project_id):
-        substitutions = dict(CONF.items())
-        substitutions.update({
-            'tenant_id': project_id,
-            'project_id': project_id,
-            'user_id': user_id,
-        })
+    def format_v3_catalog(self, skeleton, user_id, project_id):
+        endpoint_ids = set(
+            self.catalog_api.list_endpoint_ids_for_project(project_id))
 
-        services = {}
-
-        dict_of_endpoint_refs = (self.catalog_api.
-                                 list_endpoints_for_project(project_id))
-
-        if (not dict_of_endpoint_refs and
+        if (not endpoint_ids and
                 CONF.endpoint_filter.return_all_endpoints_if_no_filter):
-            return super(EndpointFilterCatalog, self).get_v3_catalog(
-                user_id, project_id)
-
-        for endpoint_id, endpoint in dict_of_endpoint_refs.items():
-            if not endpoint['enabled']:
-                # Skip disabled endpoints.
-                continue
-            service_id = endpoint['service_id']
-            services.setdefault(
-                service_id,
-                self.get_service(service_id))
-            service = services[service_id]
-            del endpoint['service_id']
-            del endpoint['enabled']
-            del endpoint['legacy_endpoint_id']
-            # Include deprecated region for backwards compatibility
-            endpoint['region'] = endpoint['region_id']
-            endpoint['url'] = utils.format_url(
-                endpoint['url'], substitutions)
-            # populate filtered endpoints
-            if 'endpoints' in services[service_id]:
-                service['endpoints'].append(endpoint)
-            else:
-                service['endpoints'] = [endpoint]
-
-        # format catalog
-        catalog = []
-        for service_id, service in services.items():
-            formatted_service = {}
-            formatted_service['id'] = service['id']
-            formatted_service['type'] = service['type']
-            formatted_service['name'] = service['name']
-            formatted_service['endpoints'] = service['endpoints']
-            catalog.append(formatted_service)
-
-        return catalog
+            return super(EndpointFilterCatalog, self).format_v3_catalog(
+                skeleton, user_id, project_id)
+
+        # Project the catalog onto the endpoints associated with the project,
+        # directly or through an endpoint group, and leave out the services
+        # that are left without any.
+        filtered = []
+        for service in skeleton:
+            endpoints = [endpoint for endpoint in service['endpoints']
+                         if endpoint['id'] in endpoint_ids]
+            if endpoints:
+                filtered.append(dict(service, endpoints=endpoints))
+
+        return super(EndpointFilterCatalog, self).format_v3_catalog(
+            filtered, user_id, project_id)
@@ -489,6 +489,13 @@ class Gone(Error):
     title = 'Gone'
 
 
+class PasswordHashingBusy(Error):
+    message_format = _("The server is handling too many password "
+                       "verifications at the moment. Please retry later.")
+    code = 503
+    title = 'Service Unavailable'
+
+
 class ConfigFileNotFound(UnexpectedError):
     debug_message_format = _("The Keystone configuration file %(config_file)s "
                              "could not be found.")
@@ -67,6 +67,11 @@ class Manager(manager.Manager):
             raise exception.UnsupportedDriverVersion(
                 driver=CONF.federation.driver)
 
+        # The rule processors of the mappings evaluated, keyed by mapping ID.
+        # They hold the compiled rules, so the rules aren't compiled again for
+        # each assertion.
+        self._rule_processors = {}
+
     @MEMOIZE
     def get_enabled_service_providers(self):
         """List enabled service providers for Service Catalog.
@@ -108,10 +113,28 @@ class Manager(manager.Manager):
         self.get_enabled_service_providers.invalidate(self)
         return sp_ref
 
+    def update_mapping(self, mapping_id, mapping):
+        mapping_ref = self.driver.update_mapping(mapping_id, mapping)
+        self._rule_processors.pop(mapping_id, None)
+        return mapping_ref
+
+    def delete_mapping(self, mapping_id):
+        self.driver.delete_mapping(mapping_id)
+        self._rule_processors.pop(mapping_id, None)
+
+    def _get_rule_processor(self, mapping):
+        rule_processor = self._rule_processors.get(mapping['id'])
+        # NOTE: the rules are compared as well, since the mapping may have
+        # been updated by another process.
+        if rule_processor is None or rule_processor.rules != mapping['rules']:
+            rule_processor = utils.RuleProcessor(mapping['id'],
+                                                 mapping['rules'])
+            self._rule_processors[mapping['id']] = rule_processor
+        return rule_processor
+
     def evaluate(self, idp_id, protocol_id, assertion_data):
         mapping = self.get_mapping_from_idp_and_protocol(idp_id, protocol_id)
-        rules = mapping['rules']
-        rule_processor = utils.RuleProcessor(mapping['id'], rules)
+        rule_processor = self._get_rule_processor(mapping)
         mapped_properties = rule_processor.process(assertion_data)
         return mapped_properties, mapping['id']
 
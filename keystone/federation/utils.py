@@ -13,6 +13,7 @@
 """Utilities for Federation Extension."""
 
 import ast
+import collections
 import re
 
 import jsonschema
@@ -440,8 +441,39 @@ def get_assertion_params_from_env(request):
         yield (k, v)
 
 
+# A rule compiled by RuleProcessor. ``local`` is the local section as it is
+# in the rule, ``compiled_local`` has its values pre-parsed.
+_CompiledRule = collections.namedtuple(
+    '_CompiledRule', ['requirements', 'local', 'compiled_local'])
+
+# A remote requirement compiled by RuleProcessor. ``eval_type`` is
+# any_one_of, not_any_of or None, and the values to match are in ``values``
+# as a set, or in ``patterns`` as compiled regular expressions.
+_CompiledRequirement = collections.namedtuple(
+    '_CompiledRequirement',
+    ['type', 'eval_type', 'values', 'patterns', 'blacklist', 'whitelist'])
+
+# How the values of a local section are filled in with the direct maps.
+_LOCAL_DICT = 'dict'
+_LOCAL_LITERAL = 'literal'
+_LOCAL_FORMAT = 'format'
+
+
+def _value_set(values):
+    try:
+        return frozenset(values)
+    except TypeError:
+        # Values that can't be hashed are still looked up by equality.
+        return tuple(values)
+
+
 class RuleProcessor(object):
-    """A class to process assertions and mapping rules."""
+    """A class to process assertions and mapping rules.
+
+    The rules are compiled when the processor is created, so a processor
+    should be kept to process several assertions with the same rules.
+
+    """
 
     class _EvalType(object):
         """Mapping rule evaluation types."""
@@ -465,6 +497,59 @@ class RuleProcessor(object):
         """
         self.mapping_id = mapping_id
         self.rules = rules
+        self._compiled_rules = [self._compile_rule(rule) for rule in rules]
+
+    def _compile_rule(self, rule):
+        return _CompiledRule(
+            [self._compile_requirement(x) for x in rule['remote']],
+            rule['local'],
+            [self._compile_local(x) for x in rule['local']])
+
+    def _compile_requirement(self, requirement):
+        """Compile a remote requirement of a rule.
+
+        Regular expressions are compiled, and the values to look up are put
+        in sets.
+
+        """
+        eval_type = values = patterns = None
+        for eval_type in (self._EvalType.ANY_ONE_OF,
+                          self._EvalType.NOT_ANY_OF):
+            values = requirement.get(eval_type)
+            if values is not None:
+                if requirement.get('regex', False):
+                    patterns = [re.compile(value) for value in values]
+                    values = None
+                else:
+                    values = frozenset(values)
+                break
+        else:
+            eval_type = None
+
+        blacklist = requirement.get(self._EvalType.BLACKLIST)
+        whitelist = requirement.get(self._EvalType.WHITELIST)
+        return _CompiledRequirement(
+            requirement['type'], eval_type, values, patterns,
+            _value_set(blacklist) if blacklist is not None else None,
+            _value_set(whitelist) if whitelist is not None else None)
+
+    def _compile_local(self, local):
+        """Pre-parse the values of a local section of a rule.
+
+        Values without any ``{}`` placeholders are used as they are, rather
+        than being formatted with the direct maps.
+
+        """
+        compiled = []
+        for k, v in local.items():
+            if isinstance(v, dict):
+                compiled.append((k, _LOCAL_DICT, self._compile_local(v)))
+            elif (isinstance(v, six.string_types) and
+                  '{' not in v and '}' not in v):
+                compiled.append((k, _LOCAL_LITERAL, v))
+            else:
+                compiled.append((k, _LOCAL_FORMAT, v))
+        return compiled
 
     def process(self, assertion_data):
         """Transform assertion to a dictionary.
@@ -529,8 +614,8 @@ class RuleProcessor(object):
         identity_values = []
 
         LOG.debug('rules: %s', self.rules)
-        for rule in self.rules:
-            direct_maps = self._verify_all_requirements(rule['remote'],
+        for rule in self._compiled_rules:
+            direct_maps = self._verify_all_requirements(rule.requirements,
                                                         assertion)
 
             # If the compare comes back as None, then the rule did not apply
@@ -542,9 +627,9 @@ class RuleProcessor(object):
             # directly to the array of saved values. However, if there is
             # a direct mapping, then perform variable replacement.
             if not direct_maps:
-                identity_values += rule['local']
+                identity_values += rule.local
             else:
-                for local in rule['local']:
+                for local in rule.compiled_local:
                     new_local = self._update_local_mapping(local, direct_maps)
                     identity_values.append(new_local)
 
@@ -681,8 +766,9 @@ class RuleProcessor(object):
     def _update_local_mapping(self, local, direct_maps):
         """Replace any {0}, {1} ... values with data from the assertion.
 
-        :param local: local mapping reference that needs to be updated
-        :type local: dict
+        :param local: local mapping reference that needs to be updated, as
+                      compiled by ``_compile_local``
+        :type local: list
         :param direct_maps: identity values used to update local
         :type direct_maps: keystone.federation.utils.DirectMaps
 
@@ -707,9 +793,11 @@ class RuleProcessor(object):
         LOG.debug('direct_maps: %s', direct_maps)
         LOG.debug('local: %s', local)
         new = {}
-        for k, v in local.items():
-            if isinstance(v, dict):
+        for k, value_type, v in local:
+            if value_type == _LOCAL_DICT:
                 new_value = self._update_local_mapping(v, direct_maps)
+            elif value_type == _LOCAL_LITERAL:
+                new_value = v
             else:
                 try:
                     new_value = v.format(*direct_maps)
@@ -731,7 +819,8 @@ class RuleProcessor(object):
         to blacklist or whitelist rules and finally return the values in
         order, to be directly mapped.
 
-        :param requirements: list of remote requirements from rules
+        :param requirements: list of remote requirements from rules, as
+                             compiled by ``_compile_requirement``
         :type requirements: list
 
         Example requirements::
@@ -775,29 +864,14 @@ class RuleProcessor(object):
         direct_maps = DirectMaps()
 
         for requirement in requirements:
-            requirement_type = requirement['type']
-            direct_map_values = assertion.get(requirement_type)
-            regex = requirement.get('regex', False)
+            direct_map_values = assertion.get(requirement.type)
 
             if not direct_map_values:
                 return None
 
-            any_one_values = requirement.get(self._EvalType.ANY_ONE_OF)
-            if any_one_values is not None:
-                if self._evaluate_requirement(any_one_values,
-                                              direct_map_values,
-                                              self._EvalType.ANY_ONE_OF,
-                                              regex):
-                    continue
-                else:
-                    return None
-
-            not_any_values = requirement.get(self._EvalType.NOT_ANY_OF)
-            if not_any_values is not None:
-                if self._evaluate_requirement(not_any_values,
-                                              direct_map_values,
-                                              self._EvalType.NOT_ANY_OF,
-                                              regex):
+            if requirement.eval_type is not None:
+                if self._evaluate_requirement(requirement,
+                                              direct_map_values):
                     continue
                 else:
                     return None
@@ -805,17 +879,15 @@ class RuleProcessor(object):
             # If 'any_one_of' or 'not_any_of' are not found, then values are
             # within 'type'. Attempt to find that 'type' within the assertion,
             # and filter these values if 'whitelist' or 'blacklist' is set.
-            blacklisted_values = requirement.get(self._EvalType.BLACKLIST)
-            whitelisted_values = requirement.get(self._EvalType.WHITELIST)
 
             # If a blacklist or whitelist is used, we want to map to the
             # whole list instead of just its values separately.
-            if blacklisted_values is not None:
+            if requirement.blacklist is not None:
                 direct_map_values = [v for v in direct_map_values
-                                     if v not in blacklisted_values]
-            elif whitelisted_values is not None:
+                                     if v not in requirement.blacklist]
+            elif requirement.whitelist is not None:
                 direct_map_values = [v for v in direct_map_values
-                                     if v in whitelisted_values]
+                                     if v in requirement.whitelist]
 
             direct_maps.add(direct_map_values)
 
@@ -823,42 +895,38 @@ class RuleProcessor(object):
 
         return direct_maps
 
-    def _evaluate_values_by_regex(self, values, assertion_values):
-        for value in values:
+    def _evaluate_values_by_regex(self, patterns, assertion_values):
+        for pattern in patterns:
             for assertion_value in assertion_values:
-                if re.search(value, assertion_value):
+                if pattern.search(assertion_value):
                     return True
         return False
 
-    def _evaluate_requirement(self, values, assertion_values,
-                              eval_type, regex):
+    def _evaluate_requirement(self, requirement, assertion_values):
         """Evaluate the incoming requirement and assertion.
 
-        If the requirement type does not exist in the assertion data, then
-        return False. If regex is specified, then compare the values and
-        assertion values. Otherwise, grab the intersection of the values
-        and use that to compare against the evaluation type.
+        If regex is specified, then compare the patterns and assertion
+        values. Otherwise, look for any of the assertion values in the set of
+        values, and use that to compare against the evaluation type.
 
-        :param values: list of allowed values, defined in the requirement
-        :type values: list
+        :param requirement: the requirement, as compiled by
+                            ``_compile_requirement``
+        :type requirement: _CompiledRequirement
         :param assertion_values: The values from the assertion to evaluate
         :type assertion_values: list/string
-        :param eval_type: determine how to evaluate requirements
-        :type eval_type: string
-        :param regex: perform evaluation with regex
-        :type regex: boolean
 
         :returns: boolean, whether requirement is valid or not.
 
         """
-        if regex:
-            any_match = self._evaluate_values_by_regex(values,
+        if requirement.patterns is not None:
+            any_match = self._evaluate_values_by_regex(requirement.patterns,
                                                        assertion_values)
         else:
-            any_match = bool(set(values).intersection(set(assertion_values)))
-        if any_match and eval_type == self._EvalType.ANY_ONE_OF:
+            any_match = not requirement.values.isdisjoint(assertion_values)
+        if any_match and requirement.eval_type == self._EvalType.ANY_ONE_OF:
             return True
-        if not any_match and eval_type == self._EvalType.NOT_ANY_OF:
+        if (not any_match and
+                requirement.eval_type == self._EvalType.NOT_ANY_OF):
             return True
 
         return False
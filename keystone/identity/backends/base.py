@@ -16,6 +16,7 @@ import abc
 
 import six
 
+from keystone.common import driver_hints
 import keystone.conf
 from keystone import exception
 
@@ -230,6 +231,30 @@ class IdentityDriverV8(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def list_users_in_groups(self, group_ids):
+        """List the users in each of the given groups.
+
+        Drivers that can read the members of several groups at once should
+        override this; by default the members of each group are read in turn.
+
+        :param list group_ids: group IDs.
+
+        :returns: a dictionary of lists of users, keyed by group ID. Groups
+                  that don't exist are left out. See user schema in
+                  :class:`~.IdentityDriverV8`.
+        :rtype: dict
+
+        """
+        users = {}
+        for group_id in group_ids:
+            try:
+                users[group_id] = self.list_users_in_group(
+                    group_id, driver_hints.Hints())
+            except exception.GroupNotFound:  # nosec
+                # Missing groups are left out of the result.
+                pass
+        return users
+
     @abc.abstractmethod
     def get_user(self, user_id):
         """Get a user by ID.
@@ -244,6 +269,28 @@ class IdentityDriverV8(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def list_users_from_ids(self, user_ids):
+        """List the users with the given IDs.
+
+        Drivers that can read several users at once should override this; by
+        default each user is read in turn.
+
+        :param list user_ids: User IDs.
+
+        :returns: a list of users or an empty list. Users that don't exist are
+                  left out. See user schema in :class:`~.IdentityDriverV8`.
+        :rtype: list of dict
+
+        """
+        users = []
+        for user_id in user_ids:
+            try:
+                users.append(self.get_user(user_id))
+            except exception.UserNotFound:  # nosec
+                # Missing users are left out of the result.
+                pass
+        return users
+
     @abc.abstractmethod
     def update_user(self, user_id, user):
         """Update an existing user.
@@ -383,6 +430,29 @@ class IdentityDriverV8(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def list_groups_from_ids(self, group_ids):
+        """List the groups with the given IDs.
+
+        Drivers that can read several groups at once should override this; by
+        default each group is read in turn.
+
+        :param list group_ids: group IDs.
+
+        :returns: a list of group_refs or an empty list. Groups that don't
+                  exist are left out. See group schema in
+                  :class:`~.IdentityDriverV8`.
+        :rtype: list of dict
+
+        """
+        groups = []
+        for group_id in group_ids:
+            try:
+                groups.append(self.get_group(group_id))
+            except exception.GroupNotFound:  # nosec
+                # Missing groups are left out of the result.
+                pass
+        return groups
+
     @abc.abstractmethod
     def get_group_by_name(self, group_name, domain_id):
         """Get a group by name.
@@ -424,3 +494,21 @@ class IdentityDriverV8(object):
 
         """
         raise exception.NotImplemented()  # pragma: no cover
+
+    def sync_replica(self, full=False):
+        """Refresh the local replica of the users and groups of the backend.
+
+        Only drivers that serve reads from a replica implement this.
+
+        :param bool full: read all the users and groups again, rather than
+                          only the ones changed since the last refresh.
+
+        :returns: the number of users and groups read, keyed by ``users`` and
+                  ``groups``, and the number removed, keyed by ``deleted``.
+        :rtype: dict
+
+        :raises keystone.exception.NotImplemented: If the driver has no
+            replica.
+
+        """
+        raise exception.NotImplemented()  # pragma: no cover
@@ -14,11 +14,13 @@
 
 import abc
 import codecs
+import collections
 import functools
+import itertools
 import os.path
 import re
 import sys
-import weakref
+import time
 
 import ldap.controls
 import ldap.filter
@@ -310,6 +312,26 @@ def is_dn_equal(dn1, dn2):
     return True
 
 
+def dn_key(dn):
+    """Return a key for the DN which is equal for equal DNs.
+
+    The keys of two DNs are equal if and only if ``is_dn_equal`` is True for
+    them, so the keys can be used to look DNs up in sets and dicts.
+
+    Note that the key is built like ``is_rdn_equal`` compares RDNs so the
+    limitations of that function apply here.
+
+    :param dn: Either a string DN or a DN parsed by ldap.dn.str2dn.
+
+    """
+    if not isinstance(dn, list):
+        dn = ldap.dn.str2dn(utf8_encode(dn))
+
+    return tuple(frozenset((attr_type.lower(), prep_case_insensitive(val))
+                           for attr_type, val, dummy in rdn)
+                 for rdn in dn)
+
+
 def dn_startswith(descendant_dn, dn):
     """Return True if and only if the descendant_dn is under the dn.
 
@@ -485,6 +507,14 @@ class LDAPHandler(object):
     def delete_ext_s(self, dn, serverctrls=None, clientctrls=None):
         raise exception.NotImplemented()  # pragma: no cover
 
+    def max_connections(self):
+        """Return how many searches can be in flight at once.
+
+        None means no limit, as all searches share a single connection.
+
+        """
+        return None
+
 
 class PythonLDAPHandler(LDAPHandler):
     """LDAPHandler implementation which calls the python-ldap API.
@@ -627,9 +657,21 @@ def _common_ldap_initialization(url, use_tls=False, tls_cacertfile=None,
 
 
 class MsgId(list):
-    """Wrapper class to hold connection and msgid."""
+    """Wrapper class to hold connection and msgid.
+
+    ``clean_up()`` returns the connection to its pool once the result of the
+    operation has been read.
+
+    """
+
+    def __init__(self, conn_msgid, release=None):
+        super(MsgId, self).__init__(conn_msgid)
+        self._release = release
 
-    pass
+    def clean_up(self):
+        release, self._release = self._release, None
+        if release is not None:
+            release()
 
 
 def use_conn_pool(func):
@@ -684,6 +726,7 @@ class PooledLDAPHandler(LDAPHandler):
         self.page_size = None
         self.use_auth_pool = use_auth_pool
         self.conn_pool = None
+        self.pool_size = None
 
     def connect(self, url, page_size=0, alias_dereferencing=None,
                 use_tls=False, tls_cacertfile=None, tls_cacertdir=None,
@@ -700,6 +743,7 @@ class PooledLDAPHandler(LDAPHandler):
                                     debug_level=debug_level)
 
         self.page_size = page_size
+        self.pool_size = pool_size
 
         # Following two options are not added in common initialization as they
         # need to follow a sequence in PythonLDAPHandler code.
@@ -748,6 +792,14 @@ class PooledLDAPHandler(LDAPHandler):
     def _get_pool_connection(self):
         return self.conn_pool.connection(self.who, self.cred)
 
+    def max_connections(self):
+        """Return the configured size of the connection pool.
+
+        Each search in flight holds a connection of the pool.
+
+        """
+        return self.pool_size
+
     def simple_bind_s(self, who='', cred='',
                       serverctrls=None, clientctrls=None):
         # Not using use_conn_pool decorator here as this API takes cred as
@@ -785,7 +837,7 @@ class PooledLDAPHandler(LDAPHandler):
         connection is needed which originally provided the ``msgid``. So, this
         method wraps the existing connection and ``msgid`` in a new ``MsgId``
         instance. The connection associated with ``search_ext`` is released
-        once last hard reference to the ``MsgId`` instance is freed.
+        once the whole result has been read by ``result3()``.
 
         """
         conn_ctxt = self._get_pool_connection()
@@ -798,10 +850,9 @@ class PooledLDAPHandler(LDAPHandler):
         except Exception:
             conn_ctxt.__exit__(*sys.exc_info())
             raise
-        res = MsgId((conn, msgid))
-        weakref.ref(res, functools.partial(conn_ctxt.__exit__,
-                                           None, None, None))
-        return res
+        return MsgId((conn, msgid),
+                     release=functools.partial(conn_ctxt.__exit__,
+                                               None, None, None))
 
     def result3(self, msgid, all=1, timeout=None,
                 resp_ctrl_classes=None):
@@ -815,13 +866,17 @@ class PooledLDAPHandler(LDAPHandler):
         Input msgid is expected to be instance of class MsgId which has LDAP
         session/connection used to execute search_ext and message idenfier.
 
-        The connection associated with search_ext is released once last hard
-        reference to MsgId object is freed. This will happen when function
-        which requested msgId and used it in result3 exits.
+        The connection associated with search_ext is released once the whole
+        result has been read, so that several searches can be in flight on
+        connections of the pool at once.
 
         """
         conn, msg_id = msgid
-        return conn.result3(msg_id, all, timeout)
+        try:
+            return conn.result3(msg_id, all, timeout)
+        finally:
+            if all:
+                msgid.clean_up()
 
     @use_conn_pool
     def modify_s(self, conn, dn, modlist):
@@ -973,70 +1028,142 @@ class KeystoneLDAPHandler(LDAPHandler):
 
     def _paged_search_s(self, base, scope, filterstr, attrlist=None):
         res = []
-        use_old_paging_api = False
+        lc = self._page_control()
+        search = self._encode_search(base, scope, filterstr, attrlist)
+        # Endless loop request pages on ldap server until it has no data
+        while True:
+            msgid = self.conn.search_ext(*search, serverctrls=[lc])
+            # Request to the ldap server a page with 'page_size' entries
+            rtype, rdata, rmsgid, serverctrls = self.conn.result3(msgid)
+            # Receive the data
+            res.extend(rdata)
+            if not self._next_page(lc, serverctrls):
+                break
+        return res
+
+    def search_multi(self, searches, depth=1):
+        """Run several searches, sending up to ``depth`` of them at once.
+
+        Each search is a ``(base, scope, filterstr, attrlist)`` tuple. A
+        search is sent with ``search_ext`` without waiting for the results of
+        the searches sent before it, so that their round trips to the server
+        overlap. The results are returned in the order of the searches, each
+        as ``search_s`` would return it, except that a search whose base
+        doesn't exist has an empty result rather than raising
+        ``ldap.NO_SUCH_OBJECT``.
+
+        """
+        searches = list(searches)
+        for base, scope, filterstr, attrlist in searches:
+            LOG.debug('LDAP search: base=%s scope=%s filterstr=%s '
+                      'attrs=%s attrsonly=0',
+                      base, scope, filterstr, attrlist)
+        return [convert_ldap_result(ldap_result) for ldap_result
+                in self._pipelined_search(searches, depth)]
+
+    def _page_control(self):
         # The API for the simple paged results control changed between
         # python-ldap 2.3 and 2.4.  We need to detect the capabilities
         # of the python-ldap version we are using.
         if hasattr(ldap, 'LDAP_CONTROL_PAGE_OID'):
-            use_old_paging_api = True
-            lc = ldap.controls.SimplePagedResultsControl(
+            return ldap.controls.SimplePagedResultsControl(
                 controlType=ldap.LDAP_CONTROL_PAGE_OID,
                 criticality=True,
                 controlValue=(self.page_size, ''))
+        return ldap.controls.libldap.SimplePagedResultsControl(
+            criticality=True,
+            size=self.page_size,
+            cookie='')
+
+    def _next_page(self, lc, serverctrls):
+        """Point the page control at the next page, if there is one."""
+        if hasattr(ldap, 'LDAP_CONTROL_PAGE_OID'):
             page_ctrl_oid = ldap.LDAP_CONTROL_PAGE_OID
         else:
-            lc = ldap.controls.libldap.SimplePagedResultsControl(
-                criticality=True,
-                size=self.page_size,
-                cookie='')
             page_ctrl_oid = ldap.controls.SimplePagedResultsControl.controlType
+        pctrls = [c for c in serverctrls or []
+                  if c.controlType == page_ctrl_oid]
+        if not pctrls:
+            LOG.warning(_LW('LDAP Server does not support paging. '
+                            'Disable paging in keystone.conf to '
+                            'avoid this message.'))
+            self._disable_paging()
+            return False
+        # LDAP server supports pagination
+        if hasattr(ldap, 'LDAP_CONTROL_PAGE_OID'):
+            est, cookie = pctrls[0].controlValue
+            lc.controlValue = (self.page_size, cookie)
+        else:
+            cookie = lc.cookie = pctrls[0].cookie
+        return bool(cookie)
 
-        base_utf8 = utf8_encode(base)
-        filterstr_utf8 = utf8_encode(filterstr)
+    def _encode_search(self, base, scope, filterstr, attrlist):
         if attrlist is None:
             attrlist_utf8 = None
         else:
             attrlist = [attr for attr in attrlist if attr is not None]
             attrlist_utf8 = list(map(utf8_encode, attrlist))
-        msgid = self.conn.search_ext(base_utf8,
-                                     scope,
-                                     filterstr_utf8,
-                                     attrlist_utf8,
-                                     serverctrls=[lc])
-        # Endless loop request pages on ldap server until it has no data
-        while True:
-            # Request to the ldap server a page with 'page_size' entries
-            rtype, rdata, rmsgid, serverctrls = self.conn.result3(msgid)
-            # Receive the data
-            res.extend(rdata)
-            pctrls = [c for c in serverctrls
-                      if c.controlType == page_ctrl_oid]
-            if pctrls:
-                # LDAP server supports pagination
-                if use_old_paging_api:
-                    est, cookie = pctrls[0].controlValue
-                    lc.controlValue = (self.page_size, cookie)
-                else:
-                    cookie = lc.cookie = pctrls[0].cookie
-
-                if cookie:
-                    # There is more data still on the server
-                    # so we request another page
-                    msgid = self.conn.search_ext(base_utf8,
-                                                 scope,
-                                                 filterstr_utf8,
-                                                 attrlist_utf8,
-                                                 serverctrls=[lc])
-                else:
-                    # Exit condition no more data on server
-                    break
-            else:
-                LOG.warning(_LW('LDAP Server does not support paging. '
-                                'Disable paging in keystone.conf to '
-                                'avoid this message.'))
-                self._disable_paging()
-                break
-        return res
+        return (utf8_encode(base), scope, utf8_encode(filterstr),
+                attrlist_utf8)
+
+    def _pipelined_search(self, searches, depth):
+        encoded = [self._encode_search(*search) for search in searches]
+        results = [[] for _ in encoded]
+        pending = collections.deque(
+            (index, self._page_control() if self.page_size else None)
+            for index in range(len(encoded)))
+        in_flight = collections.deque()
+
+        # NOTE: with a connection pool each search in flight holds one of its
+        # connections, so don't send more searches at once than the pool has
+        # connections. If other requests hold some of them, the pool runs out
+        # and the searches in flight are read before sending more.
+        max_connections = self.conn.max_connections()
+        if max_connections is not None:
+            depth = max(min(depth, max_connections), 1)
+
+        def send(index, lc):
+            serverctrls = None if lc is None else [lc]
+            try:
+                msgid = self.conn.search_ext(*encoded[index],
+                                             serverctrls=serverctrls)
+            except ldappool.MaxConnectionReachedError:
+                if not in_flight:
+                    raise
+                # The pool ran out of connections meanwhile, so wait for the
+                # searches in flight before sending this one.
+                pending.appendleft((index, lc))
+                return False
+            in_flight.append((index, lc, msgid))
+            return True
+
+        try:
+            while pending or in_flight:
+                while pending and len(in_flight) < depth:
+                    if not send(*pending.popleft()):
+                        depth = len(in_flight)
+                        break
+                index, lc, msgid = in_flight.popleft()
+                try:
+                    rtype, rdata, rmsgid, serverctrls = self.conn.result3(
+                        msgid)
+                except ldap.NO_SUCH_OBJECT:
+                    continue
+                results[index].extend(rdata)
+                if lc is not None and self._next_page(lc, serverctrls):
+                    # There is more data still on the server, so request the
+                    # next page in place of this one.
+                    pending.appendleft((index, lc))
+        except Exception:
+            # Read the results of the searches still in flight, so that they
+            # don't linger on the connection.
+            for _index, _lc, msgid in in_flight:
+                try:
+                    self.conn.result3(msgid)
+                except ldap.LDAPError:  # nosec
+                    pass
+            raise
+        return results
 
     def result3(self, msgid=ldap.RES_ANY, all=1, timeout=None,
                 resp_ctrl_classes=None):
@@ -1129,6 +1256,8 @@ class BaseLdap(object):
     DEFAULT_FILTER = None
     DEFAULT_EXTRA_ATTR_MAPPING = []
     DUMB_MEMBER_DN = 'cn=dumb,dc=nonexistent'
+    # Number of IDs looked up by a single search in get_all_by_ids.
+    ID_FILTER_CHUNK_SIZE = 100
     NotFound = None
     notfound_arg = None
     options_name = None
@@ -1145,6 +1274,7 @@ class BaseLdap(object):
         self.LDAP_SCOPE = ldap_scope(conf.ldap.query_scope)
         self.alias_dereferencing = parse_deref(conf.ldap.alias_dereferencing)
         self.page_size = conf.ldap.page_size
+        self.search_pipeline_depth = conf.ldap.search_pipeline_depth
         self.use_tls = conf.ldap.use_tls
         self.tls_cacertfile = conf.ldap.tls_cacertfile
         self.tls_cacertdir = conf.ldap.tls_cacertdir
@@ -1439,6 +1569,11 @@ class BaseLdap(object):
             conn.add_s(self._id_to_dn(values['id']), attrs)
         return values
 
+    def _ldap_attrs(self):
+        return list(set(([self.id_attr] +
+                         list(self.attribute_mapping.values()) +
+                         list(self.extra_attr_mapping.keys()))))
+
     def _ldap_get(self, object_id, ldap_filter=None):
         query = (u'(&(%(id_attr)s=%(id)s)'
                  u'%(filter)s'
@@ -1450,13 +1585,10 @@ class BaseLdap(object):
                     'object_class': self.object_class})
         with self.get_connection() as conn:
             try:
-                attrs = list(set(([self.id_attr] +
-                                  list(self.attribute_mapping.values()) +
-                                  list(self.extra_attr_mapping.keys()))))
                 res = conn.search_s(self.tree_dn,
                                     self.LDAP_SCOPE,
                                     query,
-                                    attrs)
+                                    self._ldap_attrs())
             except ldap.NO_SUCH_OBJECT:
                 return None
         try:
@@ -1478,17 +1610,20 @@ class BaseLdap(object):
             except ldap.NO_SUCH_OBJECT:
                 return []
 
-    @driver_hints.truncated
-    def _ldap_get_all(self, hints, ldap_filter=None):
-        query = u'(&%s(objectClass=%s)(%s=*))' % (
+    def _ldap_get_all_query(self, ldap_filter=None):
+        return u'(&%s(objectClass=%s)(%s=*))' % (
             ldap_filter or self.ldap_filter or '',
             self.object_class,
             self.id_attr)
+
+    @driver_hints.truncated
+    def _ldap_get_all(self, hints, ldap_filter=None):
+        query = self._ldap_get_all_query(ldap_filter)
         sizelimit = 0
-        attrs = list(set(([self.id_attr] +
-                          list(self.attribute_mapping.values()) +
-                          list(self.extra_attr_mapping.keys()))))
-        if hints.limit:
+        attrs = self._ldap_attrs()
+        # NOTE: entries aren't ordered by ID here, so when the caller asked
+        # for a page the list is read whole for it to order and page through.
+        if hints.limit and not hints.paged:
             sizelimit = hints.limit['limit']
             return self._ldap_get_limited(self.tree_dn,
                                           self.LDAP_SCOPE,
@@ -1526,6 +1661,32 @@ class BaseLdap(object):
         else:
             return self._ldap_res_to_model(res)
 
+    def get_all_by_ids(self, object_ids, ldap_filter=None):
+        """Get the objects with the given IDs.
+
+        The IDs are looked up with OR filters, ``ID_FILTER_CHUNK_SIZE`` at a
+        time, rather than with one search each, and the searches are sent to
+        the server at once. IDs that don't match any object are left out.
+
+        """
+        object_ids = list(object_ids)
+        searches = []
+        for i in range(0, len(object_ids), self.ID_FILTER_CHUNK_SIZE):
+            chunk = object_ids[i:i + self.ID_FILTER_CHUNK_SIZE]
+            query = u'(|%s)' % ''.join(
+                u'(%s=%s)' % (self.id_attr,
+                              ldap.filter.escape_filter_chars(
+                                  six.text_type(object_id)))
+                for object_id in chunk)
+            searches.append((self.tree_dn,
+                             self.LDAP_SCOPE,
+                             self._ldap_get_all_query(
+                                 (ldap_filter or self.ldap_filter or '') +
+                                 query),
+                             self._ldap_attrs()))
+        return self._ldap_res_list_to_models(
+            itertools.chain.from_iterable(self._ldap_search_multi(searches)))
+
     def get_by_name(self, name, ldap_filter=None):
         query = (u'(%s=%s)' % (self.attribute_mapping['name'],
                                ldap.filter.escape_filter_chars(
@@ -1536,10 +1697,26 @@ class BaseLdap(object):
         except IndexError:
             raise self._not_found(name)
 
+    def _ldap_search_multi(self, searches):
+        """Run several searches, sending them to the server at once.
+
+        See ``KeystoneLDAPHandler.search_multi``. A search whose base doesn't
+        exist has an empty result.
+
+        """
+        if not searches:
+            return []
+        with self.get_connection() as conn:
+            return conn.search_multi(searches,
+                                     depth=self.search_pipeline_depth)
+
+    def _ldap_res_list_to_models(self, res_list):
+        return [self._ldap_res_to_model(x) for x in res_list]
+
     def get_all(self, ldap_filter=None, hints=None):
         hints = hints or driver_hints.Hints()
-        return [self._ldap_res_to_model(x)
-                for x in self._ldap_get_all(hints, ldap_filter)]
+        return self._ldap_res_list_to_models(
+            self._ldap_get_all(hints, ldap_filter))
 
     def update(self, object_id, values, old_obj=None):
         if old_obj is None:
@@ -1858,14 +2035,63 @@ class EnabledEmuMixIn(BaseLdap):
                            utf8_decode(naming_rdn[1]))
         self.enabled_emulation_naming_attr = naming_attr
 
-    def _get_enabled(self, object_id, conn):
-        dn = self._id_to_dn(object_id)
+        cache_time = '%s_enabled_emulation_cache_time' % self.options_name
+        self.enabled_emulation_cache_time = getattr(conf.ldap, cache_time)
+        # The keys of the member DNs of the enabled group, and the time until
+        # which they're used without reading the group again.
+        self._enabled_members = (None, 0)
+
+    def _enabled_search(self, dn):
         query = '(%s=%s)' % (self.member_attribute,
                              ldap.filter.escape_filter_chars(dn))
+        return (self.enabled_emulation_dn, ldap.SCOPE_BASE, query, DN_ONLY)
+
+    def _get_enabled_members(self):
+        """Get the keys of the member DNs of the enabled group.
+
+        The members are kept for ``$name_enabled_emulation_cache_time``
+        seconds, if it's set. Returns None if the server returned only part
+        of the members, as Active Directory does for large groups.
+
+        """
+        members, expires_at = self._enabled_members
+        if members is not None and time.time() < expires_at:
+            return members
+
+        with self.get_connection() as conn:
+            try:
+                res = conn.search_s(self.enabled_emulation_dn,
+                                    ldap.SCOPE_BASE,
+                                    attrlist=[self.member_attribute])
+            except ldap.NO_SUCH_OBJECT:
+                res = []
+        members = set()
+        for dummy, attrs in res:
+            for attr, values in attrs.items():
+                attr_type, sep, options = attr.partition(';')
+                if attr_type.lower() != self.member_attribute.lower():
+                    continue
+                if 'range=' in options.lower():
+                    LOG.debug('Only part of the members of %s were returned, '
+                              'searching it for each object instead.',
+                              self.enabled_emulation_dn)
+                    return None
+                members.update(dn_key(value) for value in values)
+
+        if self.enabled_emulation_cache_time:
+            self._enabled_members = (
+                members, time.time() + self.enabled_emulation_cache_time)
+        return members
+
+    def _invalidate_enabled_members(self):
+        self._enabled_members = (None, 0)
+
+    def _get_enabled(self, object_id, conn):
+        base, scope, query, attrlist = self._enabled_search(
+            self._id_to_dn(object_id))
         try:
-            enabled_value = conn.search_s(self.enabled_emulation_dn,
-                                          ldap.SCOPE_BASE,
-                                          query, attrlist=DN_ONLY)
+            enabled_value = conn.search_s(base, scope, query,
+                                          attrlist=attrlist)
         except ldap.NO_SUCH_OBJECT:
             return False
         else:
@@ -1887,6 +2113,7 @@ class EnabledEmuMixIn(BaseLdap):
                     if self.use_dumb_member:
                         attr_list[1][1].append(self.dumb_member)
                     conn.add_s(self.enabled_emulation_dn, attr_list)
+                self._invalidate_enabled_members()
 
     def _remove_enabled(self, object_id):
         modlist = [(ldap.MOD_DELETE,
@@ -1898,6 +2125,7 @@ class EnabledEmuMixIn(BaseLdap):
             except (ldap.NO_SUCH_OBJECT, ldap.NO_SUCH_ATTRIBUTE):  # nosec
                 # It's already gone, good.
                 pass
+        self._invalidate_enabled_members()
 
     def create(self, values):
         if self.enabled_emulation:
@@ -1916,23 +2144,38 @@ class EnabledEmuMixIn(BaseLdap):
             ref = super(EnabledEmuMixIn, self).get(object_id, ldap_filter)
             if ('enabled' not in self.attribute_ignore and
                     self.enabled_emulation):
-                ref['enabled'] = self._get_enabled(object_id, conn)
+                members = None
+                if self.enabled_emulation_cache_time:
+                    members = self._get_enabled_members()
+                if members is None:
+                    ref['enabled'] = self._get_enabled(object_id, conn)
+                else:
+                    ref['enabled'] = (
+                        dn_key(self._id_to_dn(object_id)) in members)
             return ref
 
-    def get_all(self, ldap_filter=None, hints=None):
-        hints = hints or driver_hints.Hints()
+    def _ldap_res_list_to_models(self, res_list):
         if 'enabled' not in self.attribute_ignore and self.enabled_emulation:
-            # had to copy BaseLdap.get_all here to ldap_filter by DN
-            obj_list = [self._ldap_res_to_model(x)
-                        for x in self._ldap_get_all(hints, ldap_filter)
+            res_list = [x for x in res_list
                         if x[0] != self.enabled_emulation_dn]
-            with self.get_connection() as conn:
-                for obj_ref in obj_list:
-                    obj_ref['enabled'] = self._get_enabled(
-                        obj_ref['id'], conn)
+            if not res_list:
+                return []
+            # The members of the enabled group are read once for the whole
+            # list, rather than searching the group for each object.
+            members = self._get_enabled_members()
+            if members is None:
+                enabled_values = [bool(x) for x in self._ldap_search_multi(
+                    [self._enabled_search(dn) for dn, attrs in res_list])]
+            else:
+                enabled_values = [dn_key(dn) in members
+                                  for dn, attrs in res_list]
+            obj_list = [self._ldap_res_to_model(x) for x in res_list]
+            for obj_ref, enabled_value in zip(obj_list, enabled_values):
+                obj_ref['enabled'] = enabled_value
             return obj_list
         else:
-            return super(EnabledEmuMixIn, self).get_all(ldap_filter, hints)
+            return super(EnabledEmuMixIn, self)._ldap_res_list_to_models(
+                res_list)
 
     def update(self, object_id, values, old_obj=None):
         if 'enabled' not in self.attribute_ignore and self.enabled_emulation:
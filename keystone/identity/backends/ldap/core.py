@@ -19,13 +19,14 @@ from oslo_log import log
 from oslo_log import versionutils
 import six
 
-from keystone.common import driver_hints
+from keystone.common import sql
 import keystone.conf
 from keystone import exception
 from keystone.i18n import _, _LW
 from keystone.identity.backends import base
 from keystone.identity.backends.ldap import common as common_ldap
 from keystone.identity.backends.ldap import models
+from keystone.identity.backends.ldap import replica
 
 
 CONF = keystone.conf.CONF
@@ -45,18 +46,42 @@ class Identity(base.IdentityDriverV8):
             self.conf = conf
         self.user = UserApi(self.conf)
         self.group = GroupApi(self.conf)
+        self.replica = None
+        if self.conf.ldap.use_sql_replica:
+            self.replica = replica.Replica(self.conf, self.user, self.group)
 
     def is_domain_aware(self):
         return False
 
+    def _replica(self):
+        """Return the SQL replica to read from, if it has been synced."""
+        if self.replica is not None and self.replica.is_synced():
+            return self.replica
+
+    def sync_replica(self, full=False):
+        if self.replica is None:
+            raise exception.NotImplemented()
+        return self.replica.sync(full=full)
+
+    def _replicate(self, put, ref):
+        """Add an entry read from LDAP to the replica."""
+        try:
+            put(ref)
+        except sql.DBDuplicateEntry:
+            # NOTE: concurrent reads of an entry missing from the replica race
+            # to add it, the entry added by another one will do.
+            pass
+
     def generates_uuids(self):
         return False
 
     # Identity interface
 
     def authenticate(self, user_id, password):
+        # NOTE: the user is read from LDAP rather than the replica, so that a
+        # user disabled since the replica was synced can't authenticate.
         try:
-            user_ref = self._get_user(user_id)
+            user_ref = self.user.get(user_id)
         except exception.UserNotFound:
             raise AssertionError(_('Invalid user / password'))
         if not user_id or not password:
@@ -75,18 +100,48 @@ class Identity(base.IdentityDriverV8):
         return self.user.filter_attributes(user_ref)
 
     def _get_user(self, user_id):
-        return self.user.get(user_id)
+        replica = self._replica()
+        if replica is None:
+            return self.user.get(user_id)
+        user_ref = replica.get_user(user_id)
+        if user_ref is None:
+            # The user may have been created since the replica was synced.
+            user_ref = self.user.get(user_id)
+            self._replicate(replica.put_user, user_ref)
+        return user_ref
 
     def get_user(self, user_id):
-        return self.user.get_filtered(user_id)
+        if self._replica() is None:
+            return self.user.get_filtered(user_id)
+        return self.user.filter_attributes(self._get_user(user_id))
+
+    def list_users_from_ids(self, user_ids):
+        replica = self._replica()
+        if replica is None:
+            users = self.user.get_all_by_ids(user_ids)
+        else:
+            users = replica.list_users_from_ids(user_ids)
+        return [self.user.filter_attributes(user) for user in users]
 
     def list_users(self, hints):
-        return self.user.get_all_filtered(hints)
+        replica = self._replica()
+        if replica is None:
+            return self.user.get_all_filtered(hints)
+        return [self.user.filter_attributes(user)
+                for user in replica.list_users(hints)]
 
     def get_user_by_name(self, user_name, domain_id):
         # domain_id will already have been handled in the Manager layer,
         # parameter left in so this matches the Driver specification
-        return self.user.filter_attributes(self.user.get_by_name(user_name))
+        replica = self._replica()
+        if replica is None:
+            return self.user.filter_attributes(
+                self.user.get_by_name(user_name))
+        user_ref = replica.get_user_by_name(user_name)
+        if user_ref is None:
+            user_ref = self.user.get_by_name(user_name)
+            self._replicate(replica.put_user, user_ref)
+        return self.user.filter_attributes(user_ref)
 
     # CRUD
     def create_user(self, user_id, user):
@@ -94,6 +149,9 @@ class Identity(base.IdentityDriverV8):
         versionutils.report_deprecated_feature(LOG, msg)
         self.user.check_allow_create()
         user_ref = self.user.create(user)
+        replica = self._replica()
+        if replica is not None:
+            replica.put_user(self.user.get(user_ref['id']))
         return self.user.filter_attributes(user_ref)
 
     def update_user(self, user_id, user):
@@ -114,7 +172,11 @@ class Identity(base.IdentityDriverV8):
             old_obj['enabled'] = not old_obj['enabled']
 
         self.user.update(user_id, user, old_obj)
-        return self.user.get_filtered(user_id)
+        user_ref = self.user.get(user_id)
+        replica = self._replica()
+        if replica is not None:
+            replica.put_user(user_ref)
+        return self.user.filter_attributes(user_ref)
 
     def delete_user(self, user_id):
         msg = _DEPRECATION_MSG % "delete_user"
@@ -137,32 +199,74 @@ class Identity(base.IdentityDriverV8):
         if hasattr(user, 'tenant_id'):
             self.project.remove_user(user.tenant_id, user_dn)
         self.user.delete(user_id)
+        replica = self._replica()
+        if replica is not None:
+            replica.delete_user(user_id)
 
     def create_group(self, group_id, group):
         msg = _DEPRECATION_MSG % "create_group"
         versionutils.report_deprecated_feature(LOG, msg)
         self.group.check_allow_create()
-        return common_ldap.filter_entity(self.group.create(group))
+        group_ref = self.group.create(group)
+        replica = self._replica()
+        if replica is not None:
+            replica.put_group(self.group.get(group_ref['id']))
+        return common_ldap.filter_entity(group_ref)
+
+    def _get_group(self, group_id):
+        replica = self._replica()
+        if replica is None:
+            return self.group.get(group_id)
+        group_ref = replica.get_group(group_id)
+        if group_ref is None:
+            # The group may have been created since the replica was synced.
+            group_ref = self.group.get(group_id)
+            self._replicate(replica.put_group, group_ref)
+        return group_ref
 
     def get_group(self, group_id):
-        return self.group.get_filtered(group_id)
+        if self._replica() is None:
+            return self.group.get_filtered(group_id)
+        return common_ldap.filter_entity(self._get_group(group_id))
+
+    def list_groups_from_ids(self, group_ids):
+        replica = self._replica()
+        if replica is None:
+            groups = self.group.get_all_by_ids(group_ids)
+        else:
+            groups = replica.list_groups_from_ids(group_ids)
+        return [common_ldap.filter_entity(group) for group in groups]
 
     def get_group_by_name(self, group_name, domain_id):
         # domain_id will already have been handled in the Manager layer,
         # parameter left in so this matches the Driver specification
-        return self.group.get_filtered_by_name(group_name)
+        replica = self._replica()
+        if replica is None:
+            return self.group.get_filtered_by_name(group_name)
+        group_ref = replica.get_group_by_name(group_name)
+        if group_ref is None:
+            group_ref = self.group.get_by_name(group_name)
+            self._replicate(replica.put_group, group_ref)
+        return common_ldap.filter_entity(group_ref)
 
     def update_group(self, group_id, group):
         msg = _DEPRECATION_MSG % "update_group"
         versionutils.report_deprecated_feature(LOG, msg)
         self.group.check_allow_update()
-        return common_ldap.filter_entity(self.group.update(group_id, group))
+        group_ref = self.group.update(group_id, group)
+        replica = self._replica()
+        if replica is not None:
+            replica.put_group(self.group.get(group_id))
+        return common_ldap.filter_entity(group_ref)
 
     def delete_group(self, group_id):
         msg = _DEPRECATION_MSG % "delete_group"
         versionutils.report_deprecated_feature(LOG, msg)
         self.group.check_allow_delete()
-        return self.group.delete(group_id)
+        self.group.delete(group_id)
+        replica = self._replica()
+        if replica is not None:
+            replica.delete_group(group_id)
 
     def add_user_to_group(self, user_id, group_id):
         msg = _DEPRECATION_MSG % "add_user_to_group"
@@ -170,6 +274,9 @@ class Identity(base.IdentityDriverV8):
         user_ref = self._get_user(user_id)
         user_dn = user_ref['dn']
         self.group.add_user(user_dn, group_id, user_id)
+        replica = self._replica()
+        if replica is not None:
+            replica.add_member(user_ref['id'], group_id)
 
     def remove_user_from_group(self, user_id, group_id):
         msg = _DEPRECATION_MSG % "remove_user_from_group"
@@ -177,9 +284,16 @@ class Identity(base.IdentityDriverV8):
         user_ref = self._get_user(user_id)
         user_dn = user_ref['dn']
         self.group.remove_user(user_dn, group_id, user_id)
+        replica = self._replica()
+        if replica is not None:
+            replica.remove_member(user_ref['id'], group_id)
 
     def list_groups_for_user(self, user_id, hints):
         user_ref = self._get_user(user_id)
+        replica = self._replica()
+        if replica is not None:
+            return [common_ldap.filter_entity(group) for group in
+                    replica.list_groups_for_user(user_ref['id'], hints)]
         if self.conf.ldap.group_members_are_ids:
             user_dn = user_ref['id']
         else:
@@ -187,34 +301,66 @@ class Identity(base.IdentityDriverV8):
         return self.group.list_user_groups_filtered(user_dn, hints)
 
     def list_groups(self, hints):
-        return self.group.get_all_filtered(hints)
+        replica = self._replica()
+        if replica is None:
+            return self.group.get_all_filtered(hints)
+        return [common_ldap.filter_entity(group)
+                for group in replica.list_groups(hints)]
 
     def list_users_in_group(self, group_id, hints):
-        users = []
+        replica = self._replica()
+        if replica is not None:
+            group_ref = self._get_group(group_id)
+            return [self.user.filter_attributes(user) for user in
+                    replica.list_users_in_group(group_ref['id'], hints)]
+        members = []
         for user_key in self.group.list_group_users(group_id):
             if self.conf.ldap.group_members_are_ids:
                 user_id = user_key
             else:
                 user_id = self.user._dn_to_id(user_key)
+            members.append((user_key, user_id))
 
-            try:
-                users.append(self.user.get_filtered(user_id))
-            except exception.UserNotFound:
+        # NOTE: the members are read with a few OR filter searches rather
+        # than one search each. LDAP matches the IDs case insensitively.
+        user_refs = dict(
+            (ref['id'].lower(), ref) for ref in
+            self.list_users_from_ids(set(user_id for _, user_id in members)))
+        users = []
+        for user_key, user_id in members:
+            user_ref = user_refs.get(user_id.lower())
+            if user_ref is None:
                 LOG.debug(("Group member '%(user_key)s' not found in"
                            " '%(group_id)s'. The user should be removed"
                            " from the group. The user will be ignored."),
                           dict(user_key=user_key, group_id=group_id))
+            else:
+                users.append(user_ref)
+        return users
+
+    def list_users_in_groups(self, group_ids):
+        replica = self._replica()
+        if replica is None:
+            return super(Identity, self).list_users_in_groups(group_ids)
+        users = replica.list_users_in_groups(group_ids)
+        for group_id, user_refs in users.items():
+            users[group_id] = [self.user.filter_attributes(user)
+                               for user in user_refs]
         return users
 
     def check_user_in_group(self, user_id, group_id):
-        user_refs = self.list_users_in_group(group_id, driver_hints.Hints())
-        for x in user_refs:
-            if x['id'] == user_id:
-                break
+        group_ref = self._get_group(group_id)
+        user_ref = self._get_user(user_id)
+        replica = self._replica()
+        if replica is not None:
+            is_member = replica.is_member(user_ref['id'], group_ref['id'])
         else:
-            # Try to fetch the user to see if it even exists.  This
-            # will raise a more accurate exception.
-            self.get_user(user_id)
+            if self.conf.ldap.group_members_are_ids:
+                member = user_ref['id']
+            else:
+                member = user_ref['dn']
+            is_member = self.group.has_member(group_ref['dn'], member)
+        if not is_member:
             raise exception.NotFound(_("User '%(user_id)s' not found in"
                                        " group '%(group_id)s'") %
                                      {'user_id': user_id,
@@ -413,6 +559,21 @@ class GroupApi(common_ldap.BaseLdap):
                 users.append(user_dn)
         return users
 
+    def has_member(self, group_dn, member):
+        """Return True if a value is a member of a group.
+
+        This is a single search of the group entry, rather than a read of all
+        the group's members.
+
+        """
+        try:
+            res = self._ldap_get_list(group_dn, ldap.SCOPE_BASE,
+                                      {self.member_attribute: member},
+                                      attrlist=common_ldap.DN_ONLY)
+        except ldap.NO_SUCH_OBJECT:
+            return False
+        return bool(res)
+
     def get_filtered(self, group_id):
         group = self.get(group_id)
         return common_ldap.filter_entity(group)
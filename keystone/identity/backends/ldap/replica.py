@@ -0,0 +1,441 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""A copy of the users and groups of an LDAP directory kept in SQL."""
+
+import datetime
+import hashlib
+
+import ldap.filter
+from oslo_log import log
+import six
+import sqlalchemy
+
+from keystone.common import driver_hints
+from keystone.common import sql
+from keystone.i18n import _LW
+from keystone.identity.backends.ldap import common as common_ldap
+from keystone.identity.backends import sql_model as model
+
+
+LOG = log.getLogger(__name__)
+
+# The options that select which entries are copied and how they're
+# identified. A change to any of them makes a new copy.
+_SOURCE_OPTIONS = ('url', 'suffix', 'query_scope',
+                   'user_tree_dn', 'user_filter', 'user_objectclass',
+                   'user_id_attribute',
+                   'group_tree_dn', 'group_filter', 'group_objectclass',
+                   'group_id_attribute', 'group_member_attribute',
+                   'group_members_are_ids')
+
+# The number of IDs deleted with each query.
+_DELETE_CHUNK_SIZE = 500
+
+
+def source_id(conf):
+    """Identify the directory that a configuration reads from."""
+    values = ['%s=%s' % (name, getattr(conf.ldap, name))
+              for name in _SOURCE_OPTIONS]
+    return hashlib.sha256(
+        common_ldap.utf8_encode('\n'.join(values))).hexdigest()
+
+
+def _change_key(value):
+    # USNs are numbers, timestamps are generalized times, which are in order
+    # when compared as strings.
+    if value.isdigit():
+        return (len(value), value)
+    return (0, value)
+
+
+def _attr_values(attrs, name):
+    # Attribute names may be returned in a different case.
+    for attr, values in attrs.items():
+        if attr.lower() == name.lower():
+            return values
+    return []
+
+
+class Replica(object):
+    """Serve reads of users, groups and memberships from SQL.
+
+    The rows are those of the directory that ``conf`` reads from, and are
+    refreshed by ``sync``. The refs kept are the ones the LDAP driver reads,
+    including the DN of each entry, so that users can still be authenticated
+    by binding as them.
+
+    """
+
+    def __init__(self, conf, user_api, group_api):
+        self.conf = conf
+        self.user = user_api
+        self.group = group_api
+        self.source_id = source_id(conf)
+        self.change_attribute = conf.ldap.sql_replica_change_attribute
+        self._synced = False
+
+    def is_synced(self):
+        """Return True once the directory has been copied at least once."""
+        if not self._synced:
+            with sql.session_for_read() as session:
+                state = session.query(model.LdapReplicaState).get(
+                    self.source_id)
+                self._synced = state is not None
+        return self._synced
+
+    def _query(self, session, model_class):
+        return session.query(model_class).filter(
+            model_class.source_id == self.source_id)
+
+    # Reads
+
+    def get_user(self, user_id):
+        with sql.session_for_read() as session:
+            ref = self._query(session, model.LdapReplicaUser).filter(
+                model.LdapReplicaUser.id == user_id).first()
+            return ref and ref.ref
+
+    def get_user_by_name(self, user_name):
+        with sql.session_for_read() as session:
+            ref = self._query(session, model.LdapReplicaUser).filter(
+                model.LdapReplicaUser.name == user_name).first()
+            return ref and ref.ref
+
+    @driver_hints.truncated
+    def list_users(self, hints):
+        with sql.session_for_read() as session:
+            query = self._query(session, model.LdapReplicaUser)
+            query = sql.filter_limit_query(model.LdapReplicaUser, query,
+                                           hints)
+            return [ref.ref for ref in query]
+
+    def list_users_from_ids(self, user_ids):
+        if not user_ids:
+            return []
+        with sql.session_for_read() as session:
+            query = self._query(session, model.LdapReplicaUser).filter(
+                model.LdapReplicaUser.id.in_(list(user_ids)))
+            return [ref.ref for ref in query]
+
+    def get_group(self, group_id):
+        with sql.session_for_read() as session:
+            ref = self._query(session, model.LdapReplicaGroup).filter(
+                model.LdapReplicaGroup.id == group_id).first()
+            return ref and ref.ref
+
+    def get_group_by_name(self, group_name):
+        with sql.session_for_read() as session:
+            ref = self._query(session, model.LdapReplicaGroup).filter(
+                model.LdapReplicaGroup.name == group_name).first()
+            return ref and ref.ref
+
+    @driver_hints.truncated
+    def list_groups(self, hints):
+        with sql.session_for_read() as session:
+            query = self._query(session, model.LdapReplicaGroup)
+            query = sql.filter_limit_query(model.LdapReplicaGroup, query,
+                                           hints)
+            return [ref.ref for ref in query]
+
+    def list_groups_from_ids(self, group_ids):
+        if not group_ids:
+            return []
+        with sql.session_for_read() as session:
+            query = self._query(session, model.LdapReplicaGroup).filter(
+                model.LdapReplicaGroup.id.in_(list(group_ids)))
+            return [ref.ref for ref in query]
+
+    def list_groups_for_user(self, user_id, hints):
+        with sql.session_for_read() as session:
+            query = self._query(session, model.LdapReplicaGroup).join(
+                model.LdapReplicaMembership, sqlalchemy.and_(
+                    model.LdapReplicaMembership.source_id ==
+                    model.LdapReplicaGroup.source_id,
+                    model.LdapReplicaMembership.group_id ==
+                    model.LdapReplicaGroup.id))
+            query = query.filter(
+                model.LdapReplicaMembership.user_id == user_id)
+            query = sql.filter_limit_query(model.LdapReplicaGroup, query,
+                                           hints)
+            return [ref.ref for ref in query]
+
+    def _query_members(self, session):
+        return self._query(session, model.LdapReplicaUser).join(
+            model.LdapReplicaMembership, sqlalchemy.and_(
+                model.LdapReplicaMembership.source_id ==
+                model.LdapReplicaUser.source_id,
+                model.LdapReplicaMembership.user_id ==
+                model.LdapReplicaUser.id))
+
+    def list_users_in_group(self, group_id, hints):
+        with sql.session_for_read() as session:
+            query = self._query_members(session).filter(
+                model.LdapReplicaMembership.group_id == group_id)
+            query = sql.filter_limit_query(model.LdapReplicaUser, query,
+                                           hints)
+            return [ref.ref for ref in query]
+
+    def list_users_in_groups(self, group_ids):
+        """List the users in each group that is in the copy."""
+        if not group_ids:
+            return {}
+        with sql.session_for_read() as session:
+            query = session.query(model.LdapReplicaGroup.id).filter(
+                model.LdapReplicaGroup.source_id == self.source_id,
+                model.LdapReplicaGroup.id.in_(list(group_ids)))
+            users = dict((group_id, []) for group_id, in query)
+            if not users:
+                return users
+            query = self._query_members(session).filter(
+                model.LdapReplicaMembership.group_id.in_(list(users)))
+            query = query.add_columns(model.LdapReplicaMembership.group_id)
+            for ref, group_id in query:
+                users[group_id].append(ref.ref)
+            return users
+
+    def is_member(self, user_id, group_id):
+        with sql.session_for_read() as session:
+            query = self._query(session, model.LdapReplicaMembership).filter(
+                model.LdapReplicaMembership.user_id == user_id,
+                model.LdapReplicaMembership.group_id == group_id)
+            return query.first() is not None
+
+    # Writes, for the changes made through keystone and the entries read
+    # from the directory because they weren't in the copy yet.
+
+    def _user_row(self, user_ref):
+        # The password is only there if the server returns it, it isn't
+        # needed to authenticate.
+        ref = dict((k, v) for k, v in user_ref.items() if k != 'password')
+        enabled = ref.get('enabled')
+        if not isinstance(enabled, bool):
+            # Only the values read as booleans can be queried.
+            enabled = None
+        return model.LdapReplicaUser(source_id=self.source_id,
+                                     id=ref['id'],
+                                     name=ref['name'],
+                                     enabled=enabled,
+                                     ref=ref)
+
+    def _group_row(self, group_ref):
+        return model.LdapReplicaGroup(source_id=self.source_id,
+                                      id=group_ref['id'],
+                                      name=group_ref['name'],
+                                      ref=dict(group_ref))
+
+    def put_user(self, user_ref):
+        with sql.session_for_write() as session:
+            session.merge(self._user_row(user_ref))
+
+    def put_group(self, group_ref):
+        with sql.session_for_write() as session:
+            session.merge(self._group_row(group_ref))
+
+    def delete_user(self, user_id):
+        with sql.session_for_write() as session:
+            self._delete_users(session, [user_id])
+
+    def delete_group(self, group_id):
+        with sql.session_for_write() as session:
+            self._delete_groups(session, [group_id])
+
+    def add_member(self, user_id, group_id):
+        with sql.session_for_write() as session:
+            session.merge(model.LdapReplicaMembership(
+                source_id=self.source_id, user_id=user_id,
+                group_id=group_id))
+
+    def remove_member(self, user_id, group_id):
+        with sql.session_for_write() as session:
+            self._query(session, model.LdapReplicaMembership).filter(
+                model.LdapReplicaMembership.user_id == user_id,
+                model.LdapReplicaMembership.group_id == group_id).delete(
+                    synchronize_session=False)
+
+    def _ids(self, session, model_class):
+        query = session.query(model_class.id).filter(
+            model_class.source_id == self.source_id)
+        return set(x for x, in query)
+
+    def _delete_users(self, session, user_ids):
+        for i in range(0, len(user_ids), _DELETE_CHUNK_SIZE):
+            chunk = user_ids[i:i + _DELETE_CHUNK_SIZE]
+            self._query(session, model.LdapReplicaMembership).filter(
+                model.LdapReplicaMembership.user_id.in_(chunk)).delete(
+                    synchronize_session=False)
+            self._query(session, model.LdapReplicaUser).filter(
+                model.LdapReplicaUser.id.in_(chunk)).delete(
+                    synchronize_session=False)
+
+    def _delete_groups(self, session, group_ids):
+        for i in range(0, len(group_ids), _DELETE_CHUNK_SIZE):
+            chunk = group_ids[i:i + _DELETE_CHUNK_SIZE]
+            self._query(session, model.LdapReplicaMembership).filter(
+                model.LdapReplicaMembership.group_id.in_(chunk)).delete(
+                    synchronize_session=False)
+            self._query(session, model.LdapReplicaGroup).filter(
+                model.LdapReplicaGroup.id.in_(chunk)).delete(
+                    synchronize_session=False)
+
+    # Refreshing the copy
+
+    def _search(self, api, ldap_filter, attrlist):
+        query = api._ldap_get_all_query((api.ldap_filter or '') +
+                                        (ldap_filter or ''))
+        with api.get_connection() as conn:
+            try:
+                return conn.search_s(api.tree_dn, api.LDAP_SCOPE, query,
+                                     attrlist)
+            except ldap.NO_SUCH_OBJECT:
+                return []
+
+    def _search_changed(self, api, since, extra_attrs=()):
+        """Read the entries changed since a value of the change attribute.
+
+        Entries changed at ``since`` are read again, as more of them may have
+        been changed after the last refresh with the same timestamp.
+
+        :returns: the entries, and the greatest value of the change attribute
+                  among them.
+
+        """
+        ldap_filter = None
+        if since is not None:
+            ldap_filter = u'(%s>=%s)' % (
+                self.change_attribute,
+                ldap.filter.escape_filter_chars(since))
+        res_list = self._search(
+            api, ldap_filter,
+            api._ldap_attrs() + [self.change_attribute] + list(extra_attrs))
+        change_values = []
+        for dn, attrs in res_list:
+            values = _attr_values(attrs, self.change_attribute)
+            if values:
+                change_values.append(six.text_type(values[0]))
+        last_change = max(change_values, key=_change_key) if (
+            change_values) else None
+        return res_list, last_change
+
+    def _list_ids(self, api):
+        """List the IDs of all the entries, to tell which were deleted."""
+        ids = []
+        for dn, attrs in self._search(api, None, [api.id_attr]):
+            values = _attr_values(attrs, api.id_attr)
+            if len(values) == 1:
+                ids.append(values[0])
+            else:
+                ids.append(api._dn_to_id(dn))
+        return ids
+
+    def _member_ids(self, attrs, user_ids_by_key):
+        member_ids = set()
+        for value in _attr_values(attrs, self.group.member_attribute):
+            if self.conf.ldap.group_members_are_ids:
+                member_id = value
+            elif self.group._is_dumb_member(value):
+                continue
+            else:
+                member_id = self.user._dn_to_id(value)
+            # LDAP matches IDs case insensitively, the members are kept with
+            # the ID of the user.
+            member_ids.add(user_ids_by_key.get(member_id.lower(), member_id))
+        return member_ids
+
+    def sync(self, full=False):
+        """Refresh the copy from the directory.
+
+        The users and groups changed since the last refresh are read again,
+        along with the members of the changed groups. The IDs of all the
+        users and groups are listed to remove the ones that were deleted.
+        Everything is read again the first time, or if ``full`` is set.
+
+        The enabled status of emulated users changes with the enabled group
+        rather than with the users, so then all the users are read again.
+
+        :returns: the number of users and groups read, and the number of them
+                  deleted.
+
+        """
+        with sql.session_for_read() as session:
+            state = session.query(model.LdapReplicaState).get(self.source_id)
+            since = None
+            if state is not None and not full:
+                since = state.change_value
+
+        user_since = since
+        if (self.user.enabled_emulation and
+                'enabled' not in self.user.attribute_ignore):
+            user_since = None
+        user_res, user_change = self._search_changed(self.user, user_since)
+        group_res, group_change = self._search_changed(
+            self.group, since, [self.group.member_attribute])
+        user_refs = self.user._ldap_res_list_to_models(user_res)
+        group_refs = self.group._ldap_res_list_to_models(group_res)
+        user_ids = self._list_ids(self.user)
+        group_ids = self._list_ids(self.group)
+
+        user_ids_by_key = dict((x.lower(), x) for x in user_ids)
+        members = dict(
+            (group_ref['id'], self._member_ids(attrs, user_ids_by_key))
+            for group_ref, (dn, attrs) in zip(group_refs, group_res))
+
+        change_values = [x for x in (user_change, group_change, since)
+                         if x is not None]
+        last_change = max(change_values, key=_change_key) if (
+            change_values) else None
+
+        with sql.session_for_write() as session:
+            if since is None:
+                for model_class in (model.LdapReplicaMembership,
+                                    model.LdapReplicaUser,
+                                    model.LdapReplicaGroup):
+                    self._query(session, model_class).delete(
+                        synchronize_session=False)
+                deleted_user_ids = deleted_group_ids = []
+            else:
+                deleted_user_ids = list(
+                    self._ids(session, model.LdapReplicaUser) -
+                    set(user_ids))
+                deleted_group_ids = list(
+                    self._ids(session, model.LdapReplicaGroup) -
+                    set(group_ids))
+                self._delete_users(session, deleted_user_ids)
+                self._delete_groups(session, deleted_group_ids)
+                if members:
+                    self._query(session, model.LdapReplicaMembership).filter(
+                        model.LdapReplicaMembership.group_id.in_(
+                            list(members))).delete(synchronize_session=False)
+
+            for user_ref in user_refs:
+                session.merge(self._user_row(user_ref))
+            for group_ref in group_refs:
+                session.merge(self._group_row(group_ref))
+            for group_id, member_ids in members.items():
+                for member_id in member_ids:
+                    session.add(model.LdapReplicaMembership(
+                        source_id=self.source_id, user_id=member_id,
+                        group_id=group_id))
+
+            session.merge(model.LdapReplicaState(
+                source_id=self.source_id, change_value=last_change,
+                synced_at=datetime.datetime.utcnow()))
+
+        if last_change is None:
+            LOG.warning(_LW(
+                'The LDAP server returned no %s attribute, all the users '
+                'and groups will be read again at each refresh.'),
+                self.change_attribute)
+        self._synced = True
+        return {'users': len(user_refs),
+                'groups': len(group_refs),
+                'deleted': len(deleted_user_ids) + len(deleted_group_ids)}
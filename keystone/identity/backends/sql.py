@@ -15,10 +15,11 @@
 import datetime
 
 import sqlalchemy
+from sqlalchemy import orm
 
 from keystone.common import driver_hints
+from keystone.common import password_hashing
 from keystone.common import sql
-from keystone.common import utils
 from keystone import exception
 from keystone.i18n import _
 from keystone.identity.backends import base
@@ -45,7 +46,7 @@ class Identity(base.IdentityDriverV8):
         https://blueprints.launchpad.net/keystone/+spec/sql-identiy-pam
 
         """
-        return utils.check_password(password, user_ref.password)
+        return password_hashing.check_password(password, user_ref.password)
 
     # Identity interface
     def authenticate(self, user_id, password):
@@ -64,34 +65,66 @@ class Identity(base.IdentityDriverV8):
 
     @sql.handle_conflicts(conflict_type='user')
     def create_user(self, user_id, user):
-        user = utils.hash_user_password(user)
+        user = password_hashing.hash_user_password(user)
         with sql.session_for_write() as session:
             user_ref = model.User.from_dict(user)
             user_ref.created_at = datetime.datetime.utcnow()
             session.add(user_ref)
             return base.filter_user(user_ref.to_dict())
 
+    def _query_users(self, session):
+        """Query users to read them, without their password history.
+
+        The local user is loaded from the join that filters use.
+
+        """
+        query = session.query(model.User).outerjoin(model.LocalUser)
+        return query.options(orm.contains_eager(model.User.local_user))
+
+    def _user_to_dict(self, user_ref):
+        return base.filter_user(user_ref.to_dict(include_password=False))
+
     @driver_hints.truncated
     def list_users(self, hints):
         with sql.session_for_read() as session:
-            query = session.query(model.User).outerjoin(model.LocalUser)
+            query = self._query_users(session)
             user_refs = sql.filter_limit_query(model.User, query, hints)
-            return [base.filter_user(x.to_dict()) for x in user_refs]
+            return [self._user_to_dict(x) for x in user_refs]
 
     def _get_user(self, session, user_id):
-        user_ref = session.query(model.User).get(user_id)
+        """Get a user to check or change, with their password history.
+
+        The password history is loaded up front, as it is read after the
+        session is closed when authenticating.
+
+        """
+        query = session.query(model.User).options(
+            orm.subqueryload(model.User.local_user).subqueryload(
+                model.LocalUser.passwords))
+        user_ref = query.get(user_id)
         if not user_ref:
             raise exception.UserNotFound(user_id=user_id)
         return user_ref
 
     def get_user(self, user_id):
         with sql.session_for_read() as session:
-            return base.filter_user(
-                self._get_user(session, user_id).to_dict())
+            query = self._query_users(session)
+            user_ref = query.filter(model.User.id == user_id).first()
+            if not user_ref:
+                raise exception.UserNotFound(user_id=user_id)
+            return self._user_to_dict(user_ref)
+
+    def list_users_from_ids(self, user_ids):
+        if not user_ids:
+            return []
+        with sql.session_for_read() as session:
+            query = self._query_users(session)
+            query = query.filter(model.User.id.in_(user_ids))
+            return [self._user_to_dict(x) for x in query]
 
     def get_user_by_name(self, user_name, domain_id):
         with sql.session_for_read() as session:
-            query = session.query(model.User).join(model.LocalUser)
+            query = self._query_users(session)
             query = query.filter(sqlalchemy.and_(
                 model.LocalUser.name == user_name,
                 model.LocalUser.domain_id == domain_id))
@@ -99,14 +132,16 @@ class Identity(base.IdentityDriverV8):
                 user_ref = query.one()
             except sql.NotFound:
                 raise exception.UserNotFound(user_id=user_name)
-            return base.filter_user(user_ref.to_dict())
+            return self._user_to_dict(user_ref)
 
     @sql.handle_conflicts(conflict_type='user')
     def update_user(self, user_id, user):
+        # NOTE: hash before opening the transaction, so that it is not held
+        # open while waiting for the hashing pool.
+        user = password_hashing.hash_user_password(user)
         with sql.session_for_write() as session:
             user_ref = self._get_user(session, user_id)
             old_user_dict = user_ref.to_dict()
-            user = utils.hash_user_password(user)
             for k in user:
                 old_user_dict[k] = user[k]
             new_user = model.User.from_dict(old_user_dict)
@@ -174,12 +209,30 @@ class Identity(base.IdentityDriverV8):
     def list_users_in_group(self, group_id, hints):
         with sql.session_for_read() as session:
             self.get_group(group_id)
-            query = session.query(model.User).outerjoin(model.LocalUser)
+            query = self._query_users(session)
             query = query.join(model.UserGroupMembership)
             query = query.filter(
                 model.UserGroupMembership.group_id == group_id)
             query = sql.filter_limit_query(model.User, query, hints)
-            return [base.filter_user(u.to_dict()) for u in query]
+            return [self._user_to_dict(u) for u in query]
+
+    def list_users_in_groups(self, group_ids):
+        if not group_ids:
+            return {}
+        with sql.session_for_read() as session:
+            query = session.query(model.Group.id)
+            query = query.filter(model.Group.id.in_(group_ids))
+            users = dict((group_id, []) for group_id, in query)
+            if not users:
+                return users
+            query = self._query_users(session)
+            query = query.join(model.UserGroupMembership)
+            query = query.filter(
+                model.UserGroupMembership.group_id.in_(list(users)))
+            query = query.add_columns(model.UserGroupMembership.group_id)
+            for user_ref, group_id in query:
+                users[group_id].append(self._user_to_dict(user_ref))
+            return users
 
     def delete_user(self, user_id):
         with sql.session_for_write() as session:
@@ -217,6 +270,14 @@ class Identity(base.IdentityDriverV8):
         with sql.session_for_read() as session:
             return self._get_group(session, group_id).to_dict()
 
+    def list_groups_from_ids(self, group_ids):
+        if not group_ids:
+            return []
+        with sql.session_for_read() as session:
+            query = session.query(model.Group)
+            query = query.filter(model.Group.id.in_(group_ids))
+            return [ref.to_dict() for ref in query]
+
     def get_group_by_name(self, group_name, domain_id):
         with sql.session_for_read() as session:
             query = session.query(model.Group)
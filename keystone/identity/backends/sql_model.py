@@ -156,8 +156,12 @@ class User(sql.ModelBase, sql.DictBase):
     def enabled(cls):
         return User._enabled
 
-    def to_dict(self, include_extra_dict=False):
-        d = super(User, self).to_dict(include_extra_dict=include_extra_dict)
+    def to_dict(self, include_extra_dict=False, include_password=True):
+        # NOTE: leaving the password out means the user's password history
+        # isn't loaded.
+        exclude = () if include_password else ('password',)
+        d = super(User, self).to_dict(include_extra_dict=include_extra_dict,
+                                      exclude=exclude)
         if 'default_project_id' in d and d['default_project_id'] is None:
             del d['default_project_id']
         return d
@@ -171,10 +175,12 @@ class LocalUser(sql.ModelBase, sql.DictBase):
                          ondelete='CASCADE'), unique=True)
     domain_id = sql.Column(sql.String(64), nullable=False)
     name = sql.Column(sql.String(255), nullable=False)
+    # NOTE: the password history is only loaded when the password is checked
+    # or changed.
     passwords = orm.relationship('Password',
                                  single_parent=True,
                                  cascade='all,delete-orphan',
-                                 lazy='subquery',
+                                 lazy='select',
                                  backref='local_user',
                                  order_by='Password.created_at')
     __table_args__ = (sql.UniqueConstraint('domain_id', 'name'), {})
@@ -248,3 +254,68 @@ class UserGroupMembership(sql.ModelBase, sql.DictBase):
     group_id = sql.Column(sql.String(64),
                           sql.ForeignKey('group.id'),
                           primary_key=True)
+
+
+class LdapReplicaUser(sql.ModelBase, sql.ModelDictMixin):
+    """A user of an LDAP directory, copied to SQL.
+
+    The user read from the directory is kept whole in `ref`, the other columns
+    are there to be queried.
+
+    """
+
+    __tablename__ = 'ldap_replica_user'
+    attributes = ['id', 'name', 'enabled']
+    source_id = sql.Column(sql.String(64), nullable=False)
+    id = sql.Column(sql.String(64), nullable=False)
+    name = sql.Column(sql.String(255), nullable=False)
+    enabled = sql.Column(sql.Boolean, nullable=True)
+    ref = sql.Column(sql.JsonBlob(), nullable=False)
+    __table_args__ = (
+        sql.PrimaryKeyConstraint('source_id', 'id'),
+        sql.Index('ix_ldap_replica_user_source_id_name', 'source_id', 'name'),
+    )
+
+
+class LdapReplicaGroup(sql.ModelBase, sql.ModelDictMixin):
+    """A group of an LDAP directory, copied to SQL."""
+
+    __tablename__ = 'ldap_replica_group'
+    attributes = ['id', 'name']
+    source_id = sql.Column(sql.String(64), nullable=False)
+    id = sql.Column(sql.String(64), nullable=False)
+    name = sql.Column(sql.String(255), nullable=False)
+    ref = sql.Column(sql.JsonBlob(), nullable=False)
+    __table_args__ = (
+        sql.PrimaryKeyConstraint('source_id', 'id'),
+        sql.Index('ix_ldap_replica_group_source_id_name', 'source_id',
+                  'name'),
+    )
+
+
+class LdapReplicaMembership(sql.ModelBase, sql.ModelDictMixin):
+    __tablename__ = 'ldap_replica_membership'
+    attributes = ['user_id', 'group_id']
+    source_id = sql.Column(sql.String(64), nullable=False)
+    user_id = sql.Column(sql.String(64), nullable=False)
+    group_id = sql.Column(sql.String(64), nullable=False)
+    __table_args__ = (
+        sql.PrimaryKeyConstraint('source_id', 'user_id', 'group_id'),
+        sql.Index('ix_ldap_replica_membership_source_id_group_id',
+                  'source_id', 'group_id'),
+    )
+
+
+class LdapReplicaState(sql.ModelBase, sql.ModelDictMixin):
+    """When an LDAP directory was last copied to SQL.
+
+    `change_value` is the greatest value of the change attribute seen, the
+    next refresh reads the entries changed since.
+
+    """
+
+    __tablename__ = 'ldap_replica_state'
+    attributes = ['source_id', 'change_value', 'synced_at']
+    source_id = sql.Column(sql.String(64), primary_key=True)
+    change_value = sql.Column(sql.String(64), nullable=True)
+    synced_at = sql.Column(sql.DateTime, nullable=False)
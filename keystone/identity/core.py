@@ -33,7 +33,7 @@ from keystone.common import manager
 from keystone.common.validation import validators
 import keystone.conf
 from keystone import exception
-from keystone.i18n import _, _LW
+from keystone.i18n import _, _LI, _LW
 from keystone.identity.backends import base as identity_interface
 from keystone.identity.mapping_backends import base as mapping_interface
 from keystone.identity.mapping_backends import mapping
@@ -51,6 +51,22 @@ ID_MAPPING_REGION = oslo_cache.create_region()
 MEMOIZE_ID_MAPPING = cache.get_memoization_decorator(group='identity',
                                                      region=ID_MAPPING_REGION)
 
+# The number of IDs a driver is asked for at once when reading several users
+# or groups.
+ID_LIST_CHUNK_SIZE = 500
+
+# This builds a discrete cache region dedicated to group memberships. It holds
+# both the IDs of the groups of each user and the IDs of the users in each
+# group, so that a membership change only invalidates the entries of the user
+# and group concerned.
+GROUP_MEMBERSHIP_REGION = oslo_cache.create_region()
+MEMOIZE_GROUP_MEMBERSHIP = cache.get_memoization_decorator(
+    group='identity',
+    region=GROUP_MEMBERSHIP_REGION)
+# Key of a value replaced whenever a group membership is changed, so that the
+# memberships of a domain read while it changed aren't left cached.
+GROUP_MEMBERSHIPS_CHANGED_KEY = 'group_memberships_changed'
+
 DOMAIN_CONF_FHEAD = 'keystone.'
 DOMAIN_CONF_FTAIL = '.conf'
 
@@ -681,10 +697,12 @@ class Manager(manager.Manager):
                     raise exception.DomainNotFound(domain_id=domain_id)
         return driver
 
-    def _get_domain_driver_and_entity_id(self, public_id):
+    def _get_domain_driver_and_entity_id(self, public_id, id_mappings=None):
         """Look up details using the public ID.
 
         :param public_id: the ID provided in the call
+        :param id_mappings: if given, the mappings already read for the
+                            public IDs, see :meth:`_get_id_mappings`
 
         :returns: domain_id, which can be None to indicate that the driver
                   in question supports multiple domains
@@ -702,7 +720,7 @@ class Manager(manager.Manager):
         # assume it needs mapping, so long as we are using domain specific
         # drivers.
         if conf.domain_specific_drivers_enabled:
-            local_id_ref = self.id_mapping_api.get_id_mapping(public_id)
+            local_id_ref = self._get_id_mapping(public_id, id_mappings)
             if local_id_ref:
                 return (
                     local_id_ref['domain_id'],
@@ -732,7 +750,7 @@ class Manager(manager.Manager):
         if not CONF.identity_mapping.backward_compatible_ids:
             # We are not running in backward compatibility mode, so we
             # must use a mapping.
-            local_id_ref = self.id_mapping_api.get_id_mapping(public_id)
+            local_id_ref = self._get_id_mapping(public_id, id_mappings)
             if local_id_ref:
                 return (
                     local_id_ref['domain_id'],
@@ -751,6 +769,57 @@ class Manager(manager.Manager):
         # which case we leave this to the caller to check.
         return (conf.default_domain_id, driver, public_id)
 
+    def _get_id_mapping(self, public_id, id_mappings=None):
+        if id_mappings is None:
+            return self.id_mapping_api.get_id_mapping(public_id)
+        return id_mappings.get(public_id)
+
+    def _get_id_mappings(self, public_ids):
+        """Read the mappings of several public IDs at once.
+
+        :returns: a dictionary of mappings keyed by public ID, suitable for
+                  :meth:`_get_domain_driver_and_entity_id`
+
+        """
+        if not (CONF.identity.domain_specific_drivers_enabled or
+                self._is_mapping_needed(self.driver)):
+            # Public IDs are never looked up in the mapping table.
+            return {}
+        return self.id_mapping_api.get_id_mappings(public_ids)
+
+    def _list_refs_from_ids(self, public_ids, entity_type):
+        """Read the users or groups with the given public IDs.
+
+        The mappings of the public IDs are read in one go, and the IDs are
+        grouped by the domain and driver that holds them, so that each driver
+        is asked for its entities ``ID_LIST_CHUNK_SIZE`` at a time.
+
+        """
+        public_ids = list(set(public_ids))
+        id_mappings = self._get_id_mappings(public_ids)
+        entity_ids_by_driver = {}
+        for public_id in public_ids:
+            try:
+                domain_id, driver, entity_id = (
+                    self._get_domain_driver_and_entity_id(
+                        public_id, id_mappings=id_mappings))
+            except (exception.PublicIDNotFound, exception.DomainNotFound):
+                continue
+            entity_ids_by_driver.setdefault(
+                (domain_id, driver), []).append(entity_id)
+
+        refs = []
+        for (domain_id, driver), entity_ids in entity_ids_by_driver.items():
+            for i in range(0, len(entity_ids), ID_LIST_CHUNK_SIZE):
+                chunk = entity_ids[i:i + ID_LIST_CHUNK_SIZE]
+                if entity_type == mapping.EntityType.USER:
+                    ref_list = driver.list_users_from_ids(chunk)
+                else:
+                    ref_list = driver.list_groups_from_ids(chunk)
+                refs.extend(self._set_domain_id_and_mapping(
+                    ref_list, domain_id, driver, entity_type))
+        return refs
+
     def _assert_user_and_group_in_same_backend(
             self, user_entity_id, user_driver, group_entity_id, group_driver):
         """Ensure that user and group IDs are backed by the same backend.
@@ -814,7 +883,9 @@ class Manager(manager.Manager):
             return
 
         list_limit = driver._get_list_limit()
-        if list_limit:
+        # A smaller limit may have been asked for already.
+        if list_limit and (hints.limit is None or
+                           hints.limit['limit'] > list_limit):
             hints.set_limit(list_limit)
 
     # The actual driver calls - these are pre/post processed here as
@@ -890,6 +961,37 @@ class Manager(manager.Manager):
         return self._set_domain_id_and_mapping(
             ref, domain_id, driver, mapping.EntityType.USER)
 
+    @domains_configured
+    def list_users_from_ids(self, user_ids):
+        """List the users with the given IDs.
+
+        Users are read from each backend with a single call to its driver.
+        IDs that don't belong to any user are ignored.
+
+        :param user_ids: list of user IDs
+
+        :returns: a list of user_refs
+
+        """
+        return self._list_refs_from_ids(user_ids, mapping.EntityType.USER)
+
+    @domains_configured
+    def get_users(self, user_ids):
+        """Get the users with the given IDs.
+
+        Users already cached by :meth:`get_user` are read from the cache in
+        one go, the rest with a single call to each backend's driver.
+
+        :param user_ids: list of user IDs
+
+        :returns: a list of user_refs, in the order of user_ids. IDs that
+                  don't belong to any user are left out.
+
+        """
+        return cache.get_memoized_multi(
+            MEMOIZE, Manager.get_user, self, user_ids,
+            self.list_users_from_ids)
+
     def assert_user_enabled(self, user_id, user=None):
         """Assert the user and the user's domain are enabled.
 
@@ -988,9 +1090,13 @@ class Manager(manager.Manager):
             self._get_domain_driver_and_entity_id(user_id))
         # Get user details to invalidate the cache.
         user_old = self.get_user(user_id)
+        group_ids = self.list_group_ids_for_user(user_id)
         driver.delete_user(entity_id)
         self.assignment_api.delete_user_assignments(user_id)
+        self.assignment_api.invalidate_effective_role_ids(user_ids=[user_id])
         self.get_user.invalidate(self, user_id)
+        self._invalidate_group_memberships(user_ids=[user_id],
+                                           group_ids=group_ids)
         self.get_user_by_name.invalidate(self, user_old['name'],
                                          user_old['domain_id'])
         self.credential_api.delete_credentials_for_user(user_id)
@@ -1035,6 +1141,20 @@ class Manager(manager.Manager):
         return self._set_domain_id_and_mapping(
             ref, domain_id, driver, mapping.EntityType.GROUP)
 
+    @domains_configured
+    def list_groups_from_ids(self, group_ids):
+        """List the groups with the given IDs.
+
+        Groups are read from each backend with a single call to its driver.
+        IDs that don't belong to any group are ignored.
+
+        :param group_ids: list of group IDs
+
+        :returns: a list of group_refs
+
+        """
+        return self._list_refs_from_ids(group_ids, mapping.EntityType.GROUP)
+
     @domains_configured
     @exception_translated('group')
     def get_group_by_name(self, group_name, domain_id):
@@ -1067,11 +1187,14 @@ class Manager(manager.Manager):
     def delete_group(self, group_id, initiator=None):
         domain_id, driver, entity_id = (
             self._get_domain_driver_and_entity_id(group_id))
-        user_ids = (u['id'] for u in self.list_users_in_group(group_id))
+        user_ids = self.list_user_ids_in_group(group_id)
         driver.delete_group(entity_id)
         self.get_group.invalidate(self, group_id)
+        self._invalidate_group_memberships(user_ids=user_ids,
+                                           group_ids=[group_id])
         self.id_mapping_api.delete_id_mapping(group_id)
         self.assignment_api.delete_group_assignments(group_id)
+        self.assignment_api.invalidate_effective_role_ids(user_ids=user_ids)
 
         notifications.Audit.deleted(self._GROUP, group_id, initiator)
 
@@ -1100,6 +1223,9 @@ class Manager(manager.Manager):
             user_entity_id, user_driver, group_entity_id, group_driver)
 
         group_driver.add_user_to_group(user_entity_id, group_entity_id)
+        self._invalidate_group_memberships(user_ids=[user_id],
+                                           group_ids=[group_id])
+        self.assignment_api.invalidate_effective_role_ids(user_ids=[user_id])
 
         # Invalidate user role assignments cache region, as it may now need to
         # include role assignments from the specified group to its users
@@ -1125,6 +1251,9 @@ class Manager(manager.Manager):
             user_entity_id, user_driver, group_entity_id, group_driver)
 
         group_driver.remove_user_from_group(user_entity_id, group_entity_id)
+        self._invalidate_group_memberships(user_ids=[user_id],
+                                           group_ids=[group_id])
+        self.assignment_api.invalidate_effective_role_ids(user_ids=[user_id])
         self.emit_invalidate_user_token_persistence(user_id)
 
         # Invalidate user role assignments cache region, as it may be caching
@@ -1133,6 +1262,17 @@ class Manager(manager.Manager):
         notifications.Audit.removed_from(self._GROUP, group_id, self._USER,
                                          user_id, initiator)
 
+    def _invalidate_group_memberships(self, user_ids=(), group_ids=()):
+        # NOTE: record the change before dropping the cached memberships, so
+        # that a domain being warmed meanwhile doesn't cache them again from
+        # a read that predates the change.
+        GROUP_MEMBERSHIP_REGION.set(GROUP_MEMBERSHIPS_CHANGED_KEY,
+                                    uuid.uuid4().hex)
+        for user_id in user_ids:
+            self.list_group_ids_for_user.invalidate(self, user_id)
+        for group_id in group_ids:
+            self.list_user_ids_in_group.invalidate(self, group_id)
+
     def emit_invalidate_user_token_persistence(self, user_id):
         """Emit a notification to the callback system to revoke user tokens.
 
@@ -1208,6 +1348,145 @@ class Manager(manager.Manager):
         return self._set_domain_id_and_mapping(
             ref_list, domain_id, driver, mapping.EntityType.USER)
 
+    @domains_configured
+    @exception_translated('user')
+    @MEMOIZE_GROUP_MEMBERSHIP
+    def list_group_ids_for_user(self, user_id):
+        """List the IDs of the groups a user is a member of.
+
+        The IDs are cached until a membership of the user is changed through
+        this manager. If `[identity] warm_group_membership_cache` is enabled
+        and the user is not held in SQL, the members of every group of the
+        user's domain are cached at once.
+
+        :raises keystone.exception.UserNotFound: If the user doesn't exist.
+
+        """
+        domain_id, driver, _entity_id = (
+            self._get_domain_driver_and_entity_id(user_id))
+        if self._warms_group_memberships(driver):
+            group_ids_for_user = self._warm_group_memberships(domain_id)
+            # NOTE: users in no group are left out of the warmed memberships,
+            # they are read from the driver so that a user that doesn't exist
+            # is still reported.
+            if user_id in group_ids_for_user:
+                return group_ids_for_user[user_id]
+        return [x['id'] for x in self.list_groups_for_user(user_id)]
+
+    @domains_configured
+    @exception_translated('group')
+    @MEMOIZE_GROUP_MEMBERSHIP
+    def list_user_ids_in_group(self, group_id):
+        """List the IDs of the users in a group.
+
+        The IDs are cached until a membership of the group is changed through
+        this manager.
+
+        :raises keystone.exception.GroupNotFound: If the group doesn't exist.
+
+        """
+        return [x['id'] for x in self.list_users_in_group(group_id)]
+
+    @domains_configured
+    def list_user_ids_in_groups(self, group_ids):
+        """List the IDs of the users in each of several groups.
+
+        Memberships cached by :meth:`list_user_ids_in_group` are read from
+        the cache in one call, and those that are not are read with a single
+        call to the driver of each backend.
+
+        :param group_ids: list of group IDs
+
+        :returns: a dictionary of lists of user IDs, keyed by group ID.
+                  Groups that don't exist are left out.
+
+        """
+        return cache.get_memoized_values(
+            MEMOIZE_GROUP_MEMBERSHIP, Manager.list_user_ids_in_group, self,
+            group_ids, self._list_user_ids_in_groups,
+            region=GROUP_MEMBERSHIP_REGION)
+
+    def _list_user_ids_in_groups(self, group_ids):
+        public_ids_by_driver = {}
+        for public_id in set(group_ids):
+            try:
+                domain_id, driver, entity_id = (
+                    self._get_domain_driver_and_entity_id(public_id))
+            except (exception.PublicIDNotFound, exception.DomainNotFound):
+                continue
+            public_ids_by_driver.setdefault(
+                (domain_id, driver), {})[entity_id] = public_id
+
+        user_ids = {}
+        for (domain_id, driver), public_ids in public_ids_by_driver.items():
+            users = driver.list_users_in_groups(list(public_ids))
+            for entity_id, ref_list in users.items():
+                # NOTE: the backend may match IDs case insensitively, only
+                # keep the groups asked for.
+                if entity_id not in public_ids:
+                    continue
+                ref_list = self._set_domain_id_and_mapping(
+                    ref_list, domain_id, driver, mapping.EntityType.USER)
+                user_ids[public_ids[entity_id]] = [x['id'] for x in ref_list]
+        return user_ids
+
+    def _warms_group_memberships(self, driver):
+        return (CONF.identity.warm_group_membership_cache and
+                not driver.is_sql and
+                CONF.cache.enabled and CONF.identity.caching)
+
+    def _warm_group_memberships(self, domain_id):
+        """Cache the members of every group of a domain.
+
+        This is done at most once every `[identity] cache_time` seconds. If
+        a membership is changed through this manager while they are read,
+        the memberships cached are dropped again and are read one at a time.
+
+        :returns: the IDs of the groups of each user in a group, keyed by
+                  user ID. This is empty if the domain's memberships were
+                  already cached, or were changed while being read.
+
+        """
+        group_ids_for_user = {}
+
+        def warm():
+            changed = GROUP_MEMBERSHIP_REGION.get(
+                GROUP_MEMBERSHIPS_CHANGED_KEY)
+            group_ids = [x['id'] for x in
+                         self.list_groups(domain_scope=domain_id)]
+            user_ids_in_group = self._list_user_ids_in_groups(group_ids)
+            for group_id, user_ids in user_ids_in_group.items():
+                for user_id in user_ids:
+                    group_ids_for_user.setdefault(user_id, []).append(
+                        group_id)
+            cache.set_memoized_values(
+                MEMOIZE_GROUP_MEMBERSHIP, Manager.list_user_ids_in_group,
+                self, user_ids_in_group, region=GROUP_MEMBERSHIP_REGION)
+            cache.set_memoized_values(
+                MEMOIZE_GROUP_MEMBERSHIP, Manager.list_group_ids_for_user,
+                self, group_ids_for_user, region=GROUP_MEMBERSHIP_REGION)
+            if (GROUP_MEMBERSHIP_REGION.get(GROUP_MEMBERSHIPS_CHANGED_KEY) !=
+                    changed):
+                cache.delete_memoized_values(
+                    Manager.list_user_ids_in_group, self,
+                    list(user_ids_in_group), region=GROUP_MEMBERSHIP_REGION)
+                cache.delete_memoized_values(
+                    Manager.list_group_ids_for_user, self,
+                    list(group_ids_for_user), region=GROUP_MEMBERSHIP_REGION)
+                group_ids_for_user.clear()
+                LOG.debug('Group memberships of domain %s changed while '
+                          'being cached, dropped them.', domain_id)
+                return True
+            LOG.debug('Cached the members of %(groups)d groups of domain '
+                      '%(domain_id)s.',
+                      {'groups': len(group_ids), 'domain_id': domain_id})
+            return True
+
+        GROUP_MEMBERSHIP_REGION.get_or_create(
+            'group_memberships_warmed:%s' % domain_id, warm,
+            expiration_time=MEMOIZE_GROUP_MEMBERSHIP.get_expiration_time())
+        return group_ids_for_user
+
     @domains_configured
     @exception_translated('group')
     def check_user_in_group(self, user_id, group_id):
@@ -1240,6 +1519,37 @@ class Manager(manager.Manager):
         update_dict = {'password': new_password}
         self.update_user(user_id, update_dict)
 
+    @domains_configured
+    def sync_identity_replicas(self, domain_id=None, full=False):
+        """Refresh the replicas that identity backends serve reads from.
+
+        :param domain_id: only refresh the replica of this domain's backend.
+        :param full: read all the users and groups again, rather than only the
+                     ones changed since the last refresh.
+
+        :returns: what each backend's ``sync_replica`` returned, keyed by
+                  domain ID. Backends without a replica are left out.
+
+        """
+        if domain_id is not None:
+            drivers = {domain_id: self._select_identity_driver(domain_id)}
+        else:
+            drivers = dict((domain_id, config['driver']) for domain_id, config
+                           in self.domain_configs.items())
+            drivers.setdefault(CONF.identity.default_domain_id, self.driver)
+
+        counts = {}
+        for domain_id, driver in drivers.items():
+            try:
+                counts[domain_id] = driver.sync_replica(full=full)
+            except exception.NotImplemented:  # nosec
+                # The backend has no replica to refresh.
+                continue
+            LOG.info(_LI('Synced the identity replica of domain '
+                         '%(domain_id)s: %(counts)s'),
+                     {'domain_id': domain_id, 'counts': counts[domain_id]})
+        return counts
+
     @MEMOIZE
     def _shadow_nonlocal_user(self, user):
         try:
@@ -1313,6 +1623,21 @@ class MappingManager(manager.Manager):
     def get_id_mapping(self, public_id):
         return self.driver.get_id_mapping(public_id)
 
+    def get_id_mappings(self, public_ids):
+        """Get the mappings of several public IDs.
+
+        Mappings already cached by :meth:`get_id_mapping` are read from the
+        cache in one go, the rest with a single call to the driver.
+
+        :returns: a dictionary of mappings keyed by public ID. Public IDs
+                  without a mapping are left out.
+
+        """
+        return cache.get_memoized_values(
+            MEMOIZE_ID_MAPPING, MappingManager.get_id_mapping, self,
+            public_ids, self.driver.get_id_mappings,
+            region=ID_MAPPING_REGION)
+
     def create_id_mapping(self, local_entity, public_id=None):
         public_id = self.driver.create_id_mapping(local_entity, public_id)
         if MEMOIZE_ID_MAPPING.should_cache(public_id):
@@ -45,6 +45,25 @@ class MappingDriverV8(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def get_id_mappings(self, public_ids):
+        """Return the local mappings of several public IDs.
+
+        Drivers that can read several mappings at once should override this;
+        by default each mapping is read in turn.
+
+        :param list public_ids: The public IDs for the mappings required.
+        :returns dict: The mappings, as returned by :meth:`get_id_mapping`,
+                       keyed by public ID. Public IDs without a mapping are
+                       left out.
+
+        """
+        mappings = {}
+        for public_id in public_ids:
+            mapping = self.get_id_mapping(public_id)
+            if mapping:
+                mappings[public_id] = mapping
+        return mappings
+
     @abc.abstractmethod
     def create_id_mapping(self, local_entity, public_id=None):
         """Create and store a mapping to a public_id.
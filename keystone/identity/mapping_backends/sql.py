@@ -38,6 +38,9 @@ class IDMapping(sql.ModelBase, sql.ModelDictMixin):
 @dependency.requires('id_generator_api')
 class Mapping(base.MappingDriverV8):
 
+    # The number of public IDs read with each query.
+    ID_CHUNK_SIZE = 500
+
     def get_public_id(self, local_entity):
         # NOTE(henry-nash): Since the Public ID is regeneratable, rather
         # than search for the entry using the local entity values, we
@@ -63,6 +66,18 @@ class Mapping(base.MappingDriverV8):
             if mapping_ref:
                 return mapping_ref.to_dict()
 
+    def get_id_mappings(self, public_ids):
+        public_ids = list(public_ids)
+        mappings = {}
+        with sql.session_for_read() as session:
+            for i in range(0, len(public_ids), self.ID_CHUNK_SIZE):
+                query = session.query(IDMapping).filter(
+                    IDMapping.public_id.in_(
+                        public_ids[i:i + self.ID_CHUNK_SIZE]))
+                for mapping_ref in query:
+                    mappings[mapping_ref.public_id] = mapping_ref.to_dict()
+        return mappings
+
     def create_id_mapping(self, local_entity, public_id=None):
         entity = local_entity.copy()
         try:
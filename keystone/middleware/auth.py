@@ -49,7 +49,7 @@ class AuthContextMiddleware(auth_token.BaseAuthProtocol):
             return {}
 
         try:
-            return self.token_provider_api.validate_token(token)
+            return self.token_provider_api.validate_token_context(token)
         except exception.TokenNotFound:
             raise auth_token.InvalidToken(_('Could not find token'))
 
@@ -92,7 +92,8 @@ class AuthContextMiddleware(auth_token.BaseAuthProtocol):
                 user_id=user_ref['id'],
                 method_names=[CONF.tokenless_auth.protocol],
                 domain_id=domain_id,
-                project_id=project_id)
+                project_id=project_id,
+                include_catalog=False)
 
             auth_context = {'user_id': user_ref['id']}
             auth_context['is_delegated_auth'] = False
@@ -10,8 +10,13 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-from oslo_serialization import msgpackutils
+import datetime
+import heapq
+import itertools
+import struct
+
 from oslo_utils import timeutils
+import six
 from six.moves import map
 
 from keystone.common import cache
@@ -60,6 +65,23 @@ ALTERNATIVES = {
 
 REVOKE_KEYS = _NAMES + _EVENT_ARGS
 
+# Event attributes used to bucket events in a RevokeIndex, most selective
+# first, mapped to the token values each one is compared against by
+# `matches`. An event is filed under the first of these it has a value for.
+_INDEX_KEYS = [
+    ('audit_id', ['audit_id']),
+    ('audit_chain_id', ['audit_chain_id']),
+    ('access_token_id', ['access_token_id']),
+    ('consumer_id', ['consumer_id']),
+    ('trust_id', ['trust_id']),
+    ('user_id', ALTERNATIVES['user_id']),
+    ('project_id', ['project_id']),
+    ('domain_scope_id', ALTERNATIVES['domain_scope_id']),
+    ('domain_id', ALTERNATIVES['domain_id']),
+    ('role_id', ['roles']),
+    ('expires_at', ['expires_at']),
+]
+
 
 def blank_token_data(issued_at):
     token_data = dict()
@@ -73,6 +95,8 @@ def blank_token_data(issued_at):
 
 
 class RevokeEvent(object):
+    __slots__ = REVOKE_KEYS + ['domain_scope_id']
+
     def __init__(self, **kwargs):
         for k in REVOKE_KEYS:
             v = kwargs.get(k)
@@ -105,8 +129,8 @@ class RevokeEvent(object):
                 'audit_id',
                 'audit_chain_id',
                 ]
-        event = {key: self.__dict__[key] for key in keys
-                 if self.__dict__[key] is not None}
+        event = {key: getattr(self, key) for key in keys
+                 if getattr(self, key) is not None}
         if self.trust_id is not None:
             event['OS-TRUST:trust_id'] = self.trust_id
         if self.consumer_id is not None:
@@ -126,20 +150,219 @@ class RevokeEvent(object):
     def key_for_name(self, name):
         return "%s=%s" % (name, getattr(self, name) or '*')
 
+    def __reduce__(self):
+        return unpack_event, (pack_event(self),)
+
+    def __setstate__(self, state):
+        # NOTE: events cached before RevokeEvent used __slots__ were pickled
+        # with their __dict__ as state.
+        for k, v in state.items():
+            setattr(self, k, v)
+
+
+# The dense binary encoding of a RevokeEvent used to cache events: a format
+# version byte and a bitmask of the fields that are set, followed by the value
+# of each of those fields in _PACKED_FIELDS order. IDs are a 16 bit length and
+# their UTF-8 bytes, datetimes are 64 bit microseconds since the epoch. New
+# fields may only be appended to _PACKED_FIELDS.
+_PACKED_VERSION = 1
+_PACKED_HEADER = struct.Struct('!BH')
+_PACKED_LENGTH = struct.Struct('!H')
+_PACKED_DATETIME = struct.Struct('!q')
+_PACKED_FIELDS = REVOKE_KEYS
+_PACKED_DATETIMES = frozenset(['expires_at', 'issued_before', 'revoked_at'])
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def pack_event(event):
+    """Encode a RevokeEvent, omitting the fields that are not set."""
+    values = {name: getattr(event, name) for name in REVOKE_KEYS}
+    # Pack the arguments the event was built from, so that unpacking it
+    # derives the same domain_scope_id and issued_before.
+    if event.domain_scope_id is not None:
+        values['domain_id'] = event.domain_scope_id
+    if event.issued_before == event.revoked_at:
+        values['issued_before'] = None
+
+    mask = 0
+    chunks = []
+    for i, name in enumerate(_PACKED_FIELDS):
+        value = values[name]
+        if value is None:
+            continue
+        mask |= 1 << i
+        if name in _PACKED_DATETIMES:
+            delta = value - _EPOCH
+            chunks.append(_PACKED_DATETIME.pack(
+                (delta.days * 86400 + delta.seconds) * 1000000 +
+                delta.microseconds))
+        else:
+            if isinstance(value, six.text_type):
+                value = value.encode('utf-8')
+            chunks.append(_PACKED_LENGTH.pack(len(value)))
+            chunks.append(value)
+    return _PACKED_HEADER.pack(_PACKED_VERSION, mask) + b''.join(chunks)
+
+
+def unpack_event(data):
+    """Decode a RevokeEvent encoded by `pack_event`."""
+    version, mask = _PACKED_HEADER.unpack_from(data)
+    if version != _PACKED_VERSION:
+        raise ValueError('Unsupported revocation event encoding version '
+                         '%d' % version)
+    offset = _PACKED_HEADER.size
+    kwargs = {}
+    for i, name in enumerate(_PACKED_FIELDS):
+        if not mask & (1 << i):
+            continue
+        if name in _PACKED_DATETIMES:
+            value, = _PACKED_DATETIME.unpack_from(data, offset)
+            offset += _PACKED_DATETIME.size
+            kwargs[name] = _EPOCH + datetime.timedelta(microseconds=value)
+        else:
+            length, = _PACKED_LENGTH.unpack_from(data, offset)
+            offset += _PACKED_LENGTH.size
+            kwargs[name] = data[offset:offset + length].decode('utf-8')
+            offset += length
+    return RevokeEvent(**kwargs)
+
 
 def attr_keys(event):
     return list(map(event.key_for_name, _EVENT_NAMES))
 
 
+class RevokeIndex(object):
+    """An in-memory index of revocation events.
+
+    Events are bucketed by the value of their most selective non-null
+    attribute (see `_INDEX_KEYS`). Checking a token only runs `matches`
+    against the events filed under one of the token's own values, instead of
+    against every known event, and gives exactly the same answer.
+
+    Tokens can be checked while events are added or removed by another
+    thread: events are appended to their bucket, and a bucket an event is
+    removed from is replaced rather than changed.
+
+    """
+
+    def __init__(self, events=None):
+        self._buckets = {name: {} for name, _token_keys in _INDEX_KEYS}
+        # Events without any indexed attribute have to be checked against
+        # every token.
+        self._unindexed = []
+        self._keys = set()
+        # A heap of (revoked_at, seq, event) used to prune old events.
+        self._by_revoked_at = []
+        self._seq = itertools.count()
+        for event in events or []:
+            self.add_event(event)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, event):
+        return self._event_key(event) in self._keys
+
+    def __iter__(self):
+        for bucket in self._buckets.values():
+            for events in bucket.values():
+                for event in events:
+                    yield event
+        for event in self._unindexed:
+            yield event
+
+    @staticmethod
+    def _event_key(event):
+        return tuple(getattr(event, name) for name in REVOKE_KEYS)
+
+    def _bucket_for(self, event):
+        for name, _token_keys in _INDEX_KEYS:
+            value = getattr(event, name)
+            if value is not None:
+                return self._buckets[name].setdefault(value, [])
+        return self._unindexed
+
+    def add_event(self, event):
+        """Add an event to the index.
+
+        :returns: False if an identical event is already indexed
+
+        """
+        key = self._event_key(event)
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        self._bucket_for(event).append(event)
+        heapq.heappush(self._by_revoked_at,
+                       (event.revoked_at, next(self._seq), event))
+        return True
+
+    def remove_event(self, event):
+        """Remove an event, or an identical one, from the index."""
+        key = self._event_key(event)
+        if key not in self._keys:
+            return
+        self._keys.remove(key)
+        bucket = [target for target in self._bucket_for(event)
+                  if self._event_key(target) != key]
+        for name, _token_keys in _INDEX_KEYS:
+            value = getattr(event, name)
+            if value is not None:
+                if bucket:
+                    self._buckets[name][value] = bucket
+                else:
+                    del self._buckets[name][value]
+                return
+        self._unindexed = bucket
+
+    def prune(self, cutoff):
+        """Remove the events revoked before `cutoff`.
+
+        :returns: the number of events removed
+
+        """
+        pruned = 0
+        while (self._by_revoked_at and
+               self._by_revoked_at[0][0] < cutoff):
+            event = heapq.heappop(self._by_revoked_at)[2]
+            if self._event_key(event) in self._keys:
+                self.remove_event(event)
+                pruned += 1
+        return pruned
+
+    def candidates(self, token_values):
+        """Yield the events that could possibly match the token."""
+        for name, token_keys in _INDEX_KEYS:
+            bucket = self._buckets[name]
+            if not bucket:
+                continue
+            if name == 'role_id':
+                values = set(token_values.get('roles') or [])
+            else:
+                values = set(token_values.get(k) for k in token_keys)
+            for value in values:
+                if value is None:
+                    continue
+                for event in bucket.get(value, ()):
+                    yield event
+        for event in self._unindexed:
+            yield event
+
+    def is_revoked(self, token_values):
+        return any(matches(e, token_values)
+                   for e in self.candidates(token_values))
+
+
 def is_revoked(events, token_data):
     """Check if a token matches a revocation event.
 
     Compare a token against every revocation event. If the token matches an
     event in the `events` list, the token is revoked. If the token is compared
     against every item in the list without a match, it is not considered
-    revoked from the `revoke_api`.
+    revoked from the `revoke_api`. If `events` is a `RevokeIndex`, only the
+    events indexed under the token's values are compared.
 
-    :param events: a list of RevokeEvent instances
+    :param events: a list of RevokeEvent instances, or a RevokeIndex
     :param token_data: map based on a flattened view of the token. The required
                        fields are `expires_at`,`user_id`, `project_id`,
                        `identity_domain_id`, `assignment_domain_id`,
@@ -150,6 +373,8 @@ def is_revoked(events, token_data):
               match any revocation events, meaning the token is considered
               valid by the revocation API.
     """
+    if isinstance(events, RevokeIndex):
+        return events.is_revoked(token_data)
     return any([matches(e, token_data) for e in events])
 
 
@@ -341,12 +566,10 @@ class _RevokeEventHandler(object):
         self._registry = registry
 
     def serialize(self, obj):
-        return msgpackutils.dumps(obj.__dict__, registry=self._registry)
+        return pack_event(obj)
 
     def deserialize(self, data):
-        revoke_event_data = msgpackutils.loads(data, registry=self._registry)
-        revoke_event = RevokeEvent(**revoke_event_data)
-        return revoke_event
+        return unpack_event(data)
 
 
 cache.register_model_handler(_RevokeEventHandler)
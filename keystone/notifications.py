@@ -77,6 +77,12 @@ INVALIDATE_USER_TOKEN_PERSISTENCE = 'invalidate_user_tokens'
 INVALIDATE_USER_PROJECT_TOKEN_PERSISTENCE = 'invalidate_user_project_tokens'
 INVALIDATE_USER_OAUTH_CONSUMER_TOKENS = 'invalidate_user_consumer_tokens'
 
+# Internal notifications sent whenever the computed role assignments or the
+# computed service catalog may have changed, so anything derived from them can
+# be invalidated.
+INVALIDATE_COMPUTED_ASSIGNMENTS = 'invalidate_computed_assignments'
+INVALIDATE_COMPUTED_CATALOG = 'invalidate_computed_catalog'
+
 
 class Audit(object):
     """Namespace for audit notification functions.
@@ -78,10 +78,12 @@ class Resource(base.ResourceDriverV9):
             if (f['name'] == 'domain_id' and f['value'] is None):
                 f['value'] = base.NULL_DOMAIN_ID
         with sql.session_for_read() as session:
+            # Leave out the hidden root in the query, so that it doesn't take
+            # up a place in a limited or paginated list.
             query = session.query(Project)
+            query = query.filter(Project.id != base.NULL_DOMAIN_ID)
             project_refs = sql.filter_limit_query(Project, query, hints)
-            return [project_ref.to_dict() for project_ref in project_refs
-                    if not self._is_hidden_ref(project_ref)]
+            return [project_ref.to_dict() for project_ref in project_refs]
 
     def list_projects_from_ids(self, ids):
         if not ids:
@@ -124,51 +126,151 @@ class Resource(base.ResourceDriverV9):
         project_refs = query.all()
         return [project_ref.to_dict() for project_ref in project_refs]
 
+    def _supports_recursive_cte(self, session):
+        """Whether the database can run a recursive common table expression.
+
+        These are available from SQLite 3.8.3, MySQL 8.0 and MariaDB 10.2,
+        and in every supported PostgreSQL release.
+
+        """
+        dialect = session.bind.dialect
+        version = dialect.server_version_info or ()
+        if dialect.name == 'postgresql':
+            return True
+        elif dialect.name == 'sqlite':
+            return version >= (3, 8, 3)
+        elif dialect.name == 'mysql':
+            if 'MariaDB' in version:
+                return version >= (10, 2)
+            return version >= (8, 0)
+        return False
+
+    def _log_circular_reference(self, project_id):
+        msg = _LE('Circular reference or a repeated '
+                  'entry found in projects hierarchy - '
+                  '%(project_id)s.')
+        LOG.error(msg, {'project_id': project_id})
+
+    def _query_with_cte(self, session, query):
+        # NOTE: the sqlite3 module of Python before 3.6 only expects rows from
+        # statements that start with SELECT, so an empty result of a WITH
+        # statement comes back as if it had not returned rows at all.
+        result = session.execute(query.statement)
+        if not result.returns_rows:
+            return []
+        return list(query.instances(result))
+
     def list_projects_in_subtree(self, project_id):
         with sql.session_for_read() as session:
-            children = self._get_children(session, [project_id])
-            subtree = []
-            examined = set([project_id])
+            if not self._supports_recursive_cte(session):
+                return self._list_projects_in_subtree_by_level(
+                    session, project_id)
+
+            # NOTE: UNION rather than UNION ALL, so that a circular reference
+            # ends the recursion instead of repeating it forever.
+            subtree = session.query(Project.id).filter(
+                Project.parent_id == project_id).cte(
+                    name='subtree', recursive=True)
+            subtree = subtree.union(session.query(Project.id).filter(
+                Project.parent_id == subtree.c.id))
+            query = session.query(Project).join(
+                subtree, Project.id == subtree.c.id)
+
+            children_by_parent = {}
+            for project_ref in self._query_with_cte(session, query):
+                if project_ref.id == project_id:
+                    # Each project has one parent, so the only way back to
+                    # the root of the subtree is a circular reference.
+                    self._log_circular_reference(project_ref.id)
+                    return
+                children_by_parent.setdefault(project_ref.parent_id,
+                                              []).append(project_ref)
+
+            # Return the projects level by level, as the loop below does.
+            result = []
+            children = children_by_parent.get(project_id, [])
             while children:
-                children_ids = set()
-                for ref in children:
-                    if ref['id'] in examined:
-                        msg = _LE('Circular reference or a repeated '
-                                  'entry found in projects hierarchy - '
-                                  '%(project_id)s.')
-                        LOG.error(msg, {'project_id': ref['id']})
-                        return
-                    children_ids.add(ref['id'])
-
-                examined.update(children_ids)
-                subtree += children
-                children = self._get_children(session, children_ids)
-            return subtree
+                result += [ref.to_dict() for ref in children]
+                children = [child for ref in children
+                            for child in children_by_parent.get(ref.id, [])]
+            return result
+
+    def _list_projects_in_subtree_by_level(self, session, project_id):
+        children = self._get_children(session, [project_id])
+        subtree = []
+        examined = set([project_id])
+        while children:
+            children_ids = set()
+            for ref in children:
+                if ref['id'] in examined:
+                    self._log_circular_reference(ref['id'])
+                    return
+                children_ids.add(ref['id'])
+
+            examined.update(children_ids)
+            subtree += children
+            children = self._get_children(session, children_ids)
+        return subtree
 
     def list_project_parents(self, project_id):
         with sql.session_for_read() as session:
-            project = self._get_project(session, project_id).to_dict()
+            if not self._supports_recursive_cte(session):
+                return self._list_project_parents_by_level(session,
+                                                           project_id)
+
+            # NOTE: UNION rather than UNION ALL, so that a circular reference
+            # ends the recursion instead of repeating it forever.
+            ancestors = session.query(Project.id, Project.parent_id).filter(
+                Project.id == project_id).cte(
+                    name='ancestors', recursive=True)
+            ancestors = ancestors.union(
+                session.query(Project.id, Project.parent_id).filter(
+                    Project.id == ancestors.c.parent_id))
+            query = session.query(Project).join(
+                ancestors, Project.id == ancestors.c.id)
+            refs = {project_ref.id: project_ref
+                    for project_ref in self._query_with_cte(session, query)}
+
+            def _get_project(project_id):
+                project_ref = refs.get(project_id)
+                if project_ref is None or self._is_hidden_ref(project_ref):
+                    raise exception.ProjectNotFound(project_id=project_id)
+                return project_ref
+
+            project = _get_project(project_id)
             parents = []
             examined = set()
-            while project.get('parent_id') is not None:
-                if project['id'] in examined:
-                    msg = _LE('Circular reference or a repeated '
-                              'entry found in projects hierarchy - '
-                              '%(project_id)s.')
-                    LOG.error(msg, {'project_id': project['id']})
+            while project.parent_id is not None:
+                if project.id in examined:
+                    self._log_circular_reference(project.id)
                     return
 
-                examined.add(project['id'])
-                parent_project = self._get_project(
-                    session, project['parent_id']).to_dict()
-                parents.append(parent_project)
-                project = parent_project
+                examined.add(project.id)
+                project = _get_project(project.parent_id)
+                parents.append(project.to_dict())
             return parents
 
+    def _list_project_parents_by_level(self, session, project_id):
+        project = self._get_project(session, project_id).to_dict()
+        parents = []
+        examined = set()
+        while project.get('parent_id') is not None:
+            if project['id'] in examined:
+                self._log_circular_reference(project['id'])
+                return
+
+            examined.add(project['id'])
+            parent_project = self._get_project(
+                session, project['parent_id']).to_dict()
+            parents.append(parent_project)
+            project = parent_project
+        return parents
+
     def is_leaf_project(self, project_id):
         with sql.session_for_read() as session:
-            project_refs = self._get_children(session, [project_id])
-            return not project_refs
+            query = session.query(Project.id)
+            query = query.filter(Project.parent_id == project_id)
+            return query.first() is None
 
     # CRUD
     @sql.handle_conflicts(conflict_type='project')
@@ -29,6 +29,7 @@ from keystone.i18n import _, _LE, _LW
 from keystone import notifications
 from keystone.resource.backends import base
 from keystone.resource.config_backends import base as config_base
+from keystone.resource import hierarchy
 from keystone.token import provider as token_provider
 
 CONF = keystone.conf.CONF
@@ -36,6 +37,7 @@ LOG = log.getLogger(__name__)
 MEMOIZE = cache.get_memoization_decorator(group='resource')
 
 
+@notifications.listener
 @dependency.provider('resource_api')
 @dependency.requires('assignment_api', 'credential_api', 'domain_config_api',
                      'identity_api', 'revoke_api')
@@ -70,12 +72,88 @@ class Manager(manager.Manager):
         elif not isinstance(self.driver, base.ResourceDriverV9):
             raise exception.UnsupportedDriverVersion(driver=resource_driver)
 
+        self._hierarchy_index = hierarchy.HierarchyIndex(
+            self._list_projects_of_domain)
+        self.event_callbacks = {
+            notifications.ACTIONS.created: {
+                self._PROJECT: [self._project_changed_callback],
+                self._DOMAIN: [self._project_changed_callback],
+            },
+            notifications.ACTIONS.updated: {
+                self._PROJECT: [self._project_changed_callback],
+                self._DOMAIN: [self._project_changed_callback],
+            },
+            notifications.ACTIONS.deleted: {
+                self._PROJECT: [self._project_deleted_callback],
+                self._DOMAIN: [self._project_deleted_callback],
+            },
+        }
+
+    # Project hierarchy index
+
+    def _list_projects_of_domain(self, domain_id):
+        # NOTE: the hierarchy follows parent_id rather than domain_id, which
+        # only differ for projects whose domain_id was updated.
+        subtree = self.driver.list_projects_in_subtree(domain_id) or []
+        return [self.driver.get_project(domain_id)] + subtree
+
+    def _project_changed_callback(self, service, resource_type, operation,
+                                  payload):
+        if not CONF.resource.hierarchy_index_cache_time:
+            return
+        project_id = payload['resource_info']
+        try:
+            project = self.driver.get_project(project_id)
+        except exception.ProjectNotFound:
+            self._hierarchy_index.project_deleted(project_id)
+        else:
+            self._hierarchy_index.project_changed(project)
+
+    def _project_deleted_callback(self, service, resource_type, operation,
+                                  payload):
+        if not CONF.resource.hierarchy_index_cache_time:
+            return
+        self._hierarchy_index.project_deleted(payload['resource_info'])
+
+    def _list_project_parents(self, project):
+        """List the parents of a project, nearest first.
+
+        With `[resource] hierarchy_index_cache_time` set, the parents come
+        from the hierarchy index and only have the attributes listed in
+        :data:`keystone.resource.hierarchy.ATTRIBUTES`.
+
+        """
+        cache_time = CONF.resource.hierarchy_index_cache_time
+        if cache_time:
+            parents = self._hierarchy_index.list_parents(
+                hierarchy.domain_id_of(project), project['id'], cache_time)
+            if parents is not None:
+                return parents
+        return self.driver.list_project_parents(project['id'])
+
+    def _list_projects_in_subtree(self, project):
+        """List the projects below a project, level by level.
+
+        With `[resource] hierarchy_index_cache_time` set, the projects come
+        from the hierarchy index and only have the attributes listed in
+        :data:`keystone.resource.hierarchy.ATTRIBUTES`.
+
+        """
+        cache_time = CONF.resource.hierarchy_index_cache_time
+        if cache_time:
+            subtree = self._hierarchy_index.list_subtree(
+                hierarchy.domain_id_of(project), project['id'], cache_time)
+            if subtree is not None:
+                return subtree
+        return self.driver.list_projects_in_subtree(project['id'])
+
     def _get_hierarchy_depth(self, parents_list):
         return len(parents_list) + 1
 
     def _assert_max_hierarchy_depth(self, project_id, parents_list=None):
         if parents_list is None:
-            parents_list = self.list_project_parents(project_id)
+            parents_list = self._list_project_parents(
+                self.get_project(project_id))
         # NOTE(henry-nash): In upgrading to a scenario where domains are
         # represented as projects acting as domains, we will effectively
         # increase the depth of any existing project hierarchy by one. To avoid
@@ -155,8 +233,8 @@ class Manager(manager.Manager):
             self._assert_regular_project_constraints(project_ref)
             # The whole hierarchy (upwards) must be enabled
             parent_id = project_ref['parent_id']
-            parents_list = self.list_project_parents(parent_id)
             parent_ref = self.get_project(parent_id)
+            parents_list = self._list_project_parents(parent_ref)
             parents_list.append(parent_ref)
             for ref in parents_list:
                 if not ref.get('enabled', True):
@@ -277,17 +355,17 @@ class Manager(manager.Manager):
         if not project.get('enabled', True):
             raise AssertionError(_('Project is disabled: %s') % project_id)
 
-    def _assert_all_parents_are_enabled(self, project_id):
-        parents_list = self.list_project_parents(project_id)
-        for project in parents_list:
-            if not project.get('enabled', True):
+    def _assert_all_parents_are_enabled(self, project):
+        parents_list = self._list_project_parents(project)
+        for parent in parents_list:
+            if not parent.get('enabled', True):
                 raise exception.ForbiddenNotSecurity(
                     _('Cannot enable project %s since it has disabled '
-                      'parents') % project_id)
+                      'parents') % project['id'])
 
-    def _check_whole_subtree_is_disabled(self, project_id, subtree_list=None):
+    def _check_whole_subtree_is_disabled(self, project, subtree_list=None):
         if not subtree_list:
-            subtree_list = self.list_projects_in_subtree(project_id)
+            subtree_list = self._list_projects_in_subtree(project)
         subtree_enabled = [ref.get('enabled', True) for ref in subtree_list]
         return (not any(subtree_enabled))
 
@@ -348,8 +426,7 @@ class Manager(manager.Manager):
                 raise exception.ValidationError(
                     message=_('Update of domain_id is only allowed for '
                               'root projects.'))
-            subtree_list = self.list_projects_in_subtree(project_id)
-            if subtree_list:
+            if not self.is_leaf_project(project_id):
                 raise exception.ValidationError(
                     message=_('Cannot update domain_id of a project that '
                               'has children.'))
@@ -362,7 +439,7 @@ class Manager(manager.Manager):
         original_project_enabled = original_project.get('enabled', True)
         project_enabled = project.get('enabled', True)
         if not original_project_enabled and project_enabled:
-            self._assert_all_parents_are_enabled(project_id)
+            self._assert_all_parents_are_enabled(original_project)
         if original_project_enabled and not project_enabled:
             # NOTE(htruta): In order to disable a regular project, all its
             # children must already be disabled. However, to keep
@@ -371,7 +448,7 @@ class Manager(manager.Manager):
             # state of its children. Disabling a project acting as domain
             # effectively disables its children.
             if (not original_project.get('is_domain') and not cascade and not
-                    self._check_whole_subtree_is_disabled(project_id)):
+                    self._check_whole_subtree_is_disabled(original_project)):
                 raise exception.ForbiddenNotSecurity(
                     _('Cannot disable project %(project_id)s since its '
                       'subtree contains enabled projects.')
@@ -382,7 +459,8 @@ class Manager(manager.Manager):
         if cascade:
             self._only_allow_enabled_to_update_cascade(project,
                                                        original_project)
-            self._update_project_enabled_cascade(project_id, project_enabled)
+            self._update_project_enabled_cascade(original_project,
+                                                 project_enabled)
 
         try:
             project['is_domain'] = (project.get('is_domain') or
@@ -402,6 +480,7 @@ class Manager(manager.Manager):
                 # If the project's domain_id has been updated, invalidate user
                 # role assignments cache region, as it may be caching inherited
                 # assignments from the old domain to the specified project
+                self.assignment_api.invalidate_effective_role_ids()
                 assignment.COMPUTED_ASSIGNMENTS_REGION.invalidate()
         finally:
             # attempt to send audit event even if the cache invalidation raises
@@ -434,8 +513,8 @@ class Manager(manager.Manager):
                         message=_('Cascade update is only allowed for '
                                   'enabled attribute.'))
 
-    def _update_project_enabled_cascade(self, project_id, enabled):
-        subtree = self.list_projects_in_subtree(project_id)
+    def _update_project_enabled_cascade(self, project, enabled):
+        subtree = self._list_projects_in_subtree(project)
         # Update enabled only if different from original value
         subtree_to_update = [child for child in subtree
                              if child['enabled'] != enabled]
@@ -449,7 +528,11 @@ class Manager(manager.Manager):
                 notifications.Audit.disabled(self._PROJECT, child['id'],
                                              public=False)
 
-            self.driver.update_project(child['id'], child)
+            ref = self.driver.update_project(child['id'], child)
+            # NOTE: no updated notification is sent for the children, so
+            # bring the hierarchy index up to date here.
+            if CONF.resource.hierarchy_index_cache_time:
+                self._hierarchy_index.project_changed(ref)
 
     def update_project(self, project_id, project, initiator=None,
                        cascade=False):
@@ -477,6 +560,8 @@ class Manager(manager.Manager):
             self.get_project_by_name.invalidate(self, project['name'],
                                                 project['domain_id'])
             self.assignment_api.delete_project_assignments(project_id)
+            self.assignment_api.invalidate_effective_role_ids(
+                target_ids=[project_id])
             # Invalidate user role assignments cache region, as it may
             # be caching role assignments where the target is
             # the specified project
@@ -521,10 +606,10 @@ class Manager(manager.Manager):
         if cascade:
             # Getting reversed project's subtrees list, i.e. from the leaves
             # to the root, so we do not break parent_id FK.
-            subtree_list = self.list_projects_in_subtree(project_id)
+            subtree_list = self._list_projects_in_subtree(project)
             subtree_list.reverse()
             if not self._check_whole_subtree_is_disabled(
-                    project_id, subtree_list=subtree_list):
+                    project, subtree_list=subtree_list):
                 raise exception.ForbiddenNotSecurity(
                     _('Cannot delete project %(project_id)s since its subtree '
                       'contains enabled projects.')
@@ -557,7 +642,7 @@ class Manager(manager.Manager):
             msg = _('Project field is required and cannot be empty.')
             raise exception.ValidationError(message=msg)
         # Check if project_id exists
-        self.get_project(project_id)
+        return self.get_project(project_id)
 
     def list_project_parents(self, project_id, user_id=None):
         self._assert_valid_project_id(project_id)
@@ -606,7 +691,8 @@ class Manager(manager.Manager):
             }
 
         """
-        parents_list = self.list_project_parents(project['id'])
+        parents_list = self._list_project_parents(
+            self._assert_valid_project_id(project['id']))
         parents_as_ids = self._build_parents_as_ids_dict(
             project, {proj['id']: proj for proj in parents_list})
         return parents_as_ids
@@ -620,6 +706,16 @@ class Manager(manager.Manager):
             subtree = self._filter_projects_list(subtree, user_id)
         return subtree
 
+    def list_project_parent_ids(self, project_id):
+        """List the IDs of the parents of a project, nearest first."""
+        project = self._assert_valid_project_id(project_id)
+        return [x['id'] for x in self._list_project_parents(project)]
+
+    def list_project_ids_in_subtree(self, project_id):
+        """List the IDs of the projects below a project."""
+        project = self._assert_valid_project_id(project_id)
+        return [x['id'] for x in self._list_projects_in_subtree(project)]
+
     def _build_subtree_as_ids_dict(self, project_id, subtree_by_parent):
         # NOTE(rodrigods): we perform a depth first search to construct the
         # dictionaries representing each level of the subtree hierarchy. In
@@ -674,7 +770,8 @@ class Manager(manager.Manager):
                         projects_by_parent[parent_id] = [proj]
             return projects_by_parent
 
-        subtree_list = self.list_projects_in_subtree(project_id)
+        subtree_list = self._list_projects_in_subtree(
+            self._assert_valid_project_id(project_id))
         subtree_as_ids = self._build_subtree_as_ids_dict(
             project_id, _projects_indexed_by_parent(subtree_list))
         return subtree_as_ids
@@ -698,6 +795,22 @@ class Manager(manager.Manager):
 
         return domains
 
+    def get_domains(self, domain_ids):
+        """Get the domains with the given IDs.
+
+        Domains already cached by :meth:`get_domain` are read from the cache
+        in one go, the rest with a single driver call.
+
+        :param domain_ids: list of ids
+
+        :returns: a list of domain_refs, in the order of domain_ids. IDs that
+                  don't belong to any domain are left out.
+
+        """
+        return cache.get_memoized_multi(
+            MEMOIZE, Manager.get_domain, self, domain_ids,
+            self.list_domains_from_ids)
+
     @MEMOIZE
     def get_domain(self, domain_id):
         try:
@@ -872,6 +985,22 @@ class Manager(manager.Manager):
     def get_project(self, project_id):
         return self.driver.get_project(project_id)
 
+    def get_projects(self, project_ids):
+        """Get the projects with the given IDs.
+
+        Projects already cached by :meth:`get_project` are read from the
+        cache in one go, the rest with a single driver call.
+
+        :param project_ids: list of ids
+
+        :returns: a list of project_refs, in the order of project_ids. IDs
+                  that don't belong to any project are left out.
+
+        """
+        return cache.get_memoized_multi(
+            MEMOIZE, Manager.get_project, self, project_ids,
+            self.list_projects_from_ids)
+
     @MEMOIZE
     def get_project_by_name(self, project_name, domain_id):
         return self.driver.get_project_by_name(project_name, domain_id)
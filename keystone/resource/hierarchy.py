@@ -0,0 +1,190 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""An in-process index of the project hierarchy of each domain."""
+
+import datetime
+import threading
+
+from oslo_utils import timeutils
+
+
+# The project attributes kept in the index, enough to walk the hierarchy and
+# to check or cascade the enabled state of a subtree.
+ATTRIBUTES = ('id', 'name', 'domain_id', 'parent_id', 'enabled', 'is_domain')
+
+
+def domain_id_of(project):
+    """Return the ID of the domain whose hierarchy should hold the project.
+
+    This is where lookups start. A project that was moved to another domain
+    keeps its parent, so it stays in the hierarchy of its former domain and
+    is not found there; lookups for it fall back to the driver.
+
+    """
+    return project['id'] if project.get('is_domain') else project['domain_id']
+
+
+class DomainHierarchy(object):
+    """The projects of one domain, indexed by their parent.
+
+    Lookups return None when they find a project missing from the index or a
+    circular reference, so that callers can fall back to the driver.
+
+    """
+
+    def __init__(self, domain_id, projects, expires_at):
+        self.domain_id = domain_id
+        self.expires_at = expires_at
+        self._projects = {}
+        self._children = {}
+        for project in projects:
+            self.add(project)
+
+    def __contains__(self, project_id):
+        return project_id in self._projects
+
+    def add(self, project):
+        """Add a project to the index, or refresh the one already there."""
+        ref = {attr: project.get(attr) for attr in ATTRIBUTES}
+        old_ref = self._projects.get(ref['id'])
+        self._projects[ref['id']] = ref
+        if old_ref is not None and old_ref['parent_id'] == ref['parent_id']:
+            return
+        if old_ref is not None:
+            self._children[old_ref['parent_id']].remove(ref['id'])
+        self._children.setdefault(ref['parent_id'], []).append(ref['id'])
+
+    def remove(self, project_id):
+        ref = self._projects.pop(project_id, None)
+        if ref is not None:
+            self._children[ref['parent_id']].remove(project_id)
+
+    def list_parents(self, project_id):
+        """Return the parents of a project, nearest first."""
+        ref = self._projects.get(project_id)
+        if ref is None:
+            return None
+        parents = []
+        examined = set()
+        while ref['parent_id'] is not None:
+            if ref['id'] in examined:
+                return None
+            examined.add(ref['id'])
+            ref = self._projects.get(ref['parent_id'])
+            if ref is None:
+                return None
+            parents.append(ref.copy())
+        return parents
+
+    def list_subtree(self, project_id):
+        """Return the projects below a project, level by level."""
+        if project_id not in self._projects:
+            return None
+        subtree = []
+        examined = set([project_id])
+        level = [project_id]
+        while level:
+            level = [child_id for parent_id in level
+                     for child_id in self._children.get(parent_id, [])]
+            for child_id in level:
+                if child_id in examined:
+                    return None
+                examined.add(child_id)
+            subtree += [self._projects[child_id].copy()
+                        for child_id in level]
+        return subtree
+
+
+class HierarchyIndex(object):
+    """The hierarchies of the domains used by this process.
+
+    The hierarchy of a domain is loaded the first time it is needed and kept
+    for `cache_time` seconds. Project changes made by this process are
+    applied to it as they happen; changes made by other processes are only
+    seen once it expires.
+
+    :param list_projects: callable returning a domain's project followed by
+        all the projects below it.
+
+    """
+
+    def __init__(self, list_projects):
+        self._list_projects = list_projects
+        self._domains = {}
+        self._lock = threading.RLock()
+        self._changes = 0
+
+    def _find(self, project_id):
+        for hierarchy in self._domains.values():
+            if project_id in hierarchy:
+                return hierarchy
+
+    def _get(self, domain_id, cache_time):
+        with self._lock:
+            hierarchy = self._domains.get(domain_id)
+            if (hierarchy is not None and
+                    hierarchy.expires_at > timeutils.utcnow()):
+                return hierarchy
+            changes = self._changes
+
+        # Load without holding the lock, so that other domains remain
+        # readable in the meantime.
+        expires_at = timeutils.utcnow() + datetime.timedelta(
+            seconds=cache_time)
+        hierarchy = DomainHierarchy(domain_id,
+                                    self._list_projects(domain_id),
+                                    expires_at)
+        with self._lock:
+            # NOTE: a change applied while loading may be missing from what
+            # was read, so only keep the hierarchy if there was none.
+            if changes == self._changes:
+                self._domains[domain_id] = hierarchy
+        return hierarchy
+
+    def list_parents(self, domain_id, project_id, cache_time):
+        hierarchy = self._get(domain_id, cache_time)
+        with self._lock:
+            return hierarchy.list_parents(project_id)
+
+    def list_subtree(self, domain_id, project_id, cache_time):
+        hierarchy = self._get(domain_id, cache_time)
+        with self._lock:
+            return hierarchy.list_subtree(project_id)
+
+    def project_changed(self, project):
+        """Apply a created or updated project to the loaded hierarchies."""
+        with self._lock:
+            self._changes += 1
+            old_hierarchy = self._find(project['id'])
+            if project.get('is_domain'):
+                hierarchy = self._domains.get(project['id'])
+            else:
+                hierarchy = self._find(project['parent_id'])
+            if old_hierarchy is not None and old_hierarchy is not hierarchy:
+                old_hierarchy.remove(project['id'])
+            if hierarchy is not None:
+                hierarchy.add(project)
+
+    def project_deleted(self, project_id):
+        with self._lock:
+            self._changes += 1
+            # A deleted domain takes its hierarchy with it.
+            self._domains.pop(project_id, None)
+            hierarchy = self._find(project_id)
+            if hierarchy is not None:
+                hierarchy.remove(project_id)
+
+    def clear(self):
+        with self._lock:
+            self._changes += 1
+            self._domains.clear()
@@ -12,8 +12,13 @@
 
 """Main entry point into the Revoke service."""
 
+import datetime
+import threading
+
 import oslo_cache
+from oslo_log import log
 from oslo_log import versionutils
+from oslo_utils import timeutils
 
 from keystone.common import cache
 from keystone.common import dependency
@@ -28,6 +33,7 @@ from keystone.revoke.backends import base
 
 
 CONF = keystone.conf.CONF
+LOG = log.getLogger(__name__)
 
 
 EXTENSION_DATA = {
@@ -57,6 +63,98 @@ MEMOIZE = cache.get_memoization_decorator(
     region=REVOKE_REGION)
 
 
+class RevokeEventStore(object):
+    """A per-process copy of the revocation events, kept in an index.
+
+    The store remembers the newest `revoked_at` it has seen and, at most once
+    every `[revoke] sync_interval` seconds, asks the driver only for events
+    revoked after it, less `[revoke] sync_overlap` seconds. Events are dropped
+    locally once they are older than the backend's own pruning cutoff, so
+    validating a token never requires reading the whole revocation event
+    table after the initial load.
+
+    Tokens are checked against the index without holding the lock, which
+    `RevokeIndex` allows; the lock only serializes syncs. The counters the
+    store keeps are logged after each sync that changed the index.
+
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self._index = revoke_model.RevokeIndex()
+        self._lock = threading.Lock()
+        self._watermark = None
+        self._next_sync = None
+        self._last_sync = None
+        self._syncs = 0
+        self._events_fetched = 0
+        self._events_pruned = 0
+
+    def expire(self):
+        """Force a sync the next time the index is used."""
+        self._next_sync = None
+
+    def _fetch(self):
+        last_fetch = self._watermark
+        if last_fetch is not None:
+            # revoked_at is set by the process recording the event before it
+            # is committed, so an event may only become visible after newer
+            # ones have been fetched. List the most recent events again;
+            # events already in the index are skipped.
+            last_fetch -= datetime.timedelta(
+                seconds=CONF.revoke.sync_overlap)
+        events = self.driver.list_events(last_fetch=last_fetch)
+        for event in events:
+            if self._watermark is None or event.revoked_at > self._watermark:
+                self._watermark = event.revoked_at
+        return [event for event in events if event not in self._index]
+
+    def sync(self):
+        """Fetch the events revoked since the last sync, if one is due.
+
+        :returns: the up to date RevokeIndex, which must not be modified
+                  by the caller
+
+        """
+        with self._lock:
+            now = timeutils.utcnow()
+            if self._next_sync is not None and now < self._next_sync:
+                return self._index
+            fetched = 0
+            for event in self._fetch():
+                if self._index.add_event(event):
+                    fetched += 1
+            pruned = self._index.prune(base.revoked_before_cutoff_time())
+            self._events_fetched += fetched
+            self._events_pruned += pruned
+            self._syncs += 1
+            self._last_sync = now
+            self._next_sync = now + datetime.timedelta(
+                seconds=CONF.revoke.sync_interval)
+            if fetched or pruned:
+                LOG.debug('Synced revocation events: %(fetched)d new, '
+                          '%(pruned)d pruned, stats: %(stats)s',
+                          {'fetched': fetched, 'pruned': pruned,
+                           'stats': self.stats()})
+            return self._index
+
+    def stats(self):
+        """Return counters describing the state of the store."""
+        sync_lag = None
+        if self._last_sync is not None:
+            sync_lag = timeutils.delta_seconds(self._last_sync,
+                                               timeutils.utcnow())
+        return {
+            'events': len(self._index),
+            'syncs': self._syncs,
+            'events_fetched': self._events_fetched,
+            'events_pruned': self._events_pruned,
+            'last_sync': self._last_sync,
+            'sync_lag': sync_lag,
+            'watermark': self._watermark,
+        }
+
+
 @dependency.provider('revoke_api')
 class Manager(manager.Manager):
     """Default pivot point for the Revoke backend.
@@ -74,6 +172,7 @@ class Manager(manager.Manager):
         super(Manager, self).__init__(CONF.revoke.driver)
         self._register_listeners()
         self.model = revoke_model
+        self._event_store = RevokeEventStore(self.driver)
 
     @MEMOIZE
     def _list_events(self, last_fetch):
@@ -82,6 +181,10 @@ class Manager(manager.Manager):
     def list_events(self, last_fetch=None):
         return self._list_events(last_fetch)
 
+    def get_sync_stats(self):
+        """Return the sync counters of this process's revocation events."""
+        return self._event_store.stats()
+
     def _user_callback(self, service, resource_type, operation,
                        payload):
         self.revoke_by_user(payload['resource_info'])
@@ -204,12 +307,13 @@ class Manager(manager.Manager):
         :raises keystone.exception.TokenNotFound: If the token is invalid.
 
         """
-        if revoke_model.is_revoked(self.list_events(), token_values):
+        if revoke_model.is_revoked(self._event_store.sync(), token_values):
             raise exception.TokenNotFound(_('Failed to validate token'))
 
     def revoke(self, event):
         self.driver.revoke(event)
         REVOKE_REGION.invalidate()
+        self._event_store.expire()
 
 
 @versionutils.deprecated(
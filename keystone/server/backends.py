@@ -34,6 +34,7 @@ def load_backends():
     cache.apply_invalidation_patch(
         region=catalog.COMPUTED_CATALOG_REGION,
         region_name=catalog.COMPUTED_CATALOG_REGION.name)
+    cache.configure_cache(region=catalog.CATALOG_SKELETON_REGION)
     cache.configure_cache(region=assignment.COMPUTED_ASSIGNMENTS_REGION)
     cache.apply_invalidation_patch(
         region=assignment.COMPUTED_ASSIGNMENTS_REGION,
@@ -42,9 +43,17 @@ def load_backends():
     cache.apply_invalidation_patch(region=revoke.REVOKE_REGION,
                                    region_name=revoke.REVOKE_REGION.name)
     cache.configure_cache(region=token.provider.TOKENS_REGION)
+    cache.configure_cache(region=token.provider.TOKEN_SCOPE_REGION)
+    cache.apply_invalidation_patch(
+        region=token.provider.TOKEN_SCOPE_REGION,
+        region_name=token.provider.TOKEN_SCOPE_REGION.name)
     cache.configure_cache(region=identity.ID_MAPPING_REGION)
     cache.apply_invalidation_patch(region=identity.ID_MAPPING_REGION,
                                    region_name=identity.ID_MAPPING_REGION.name)
+    cache.configure_cache(region=identity.GROUP_MEMBERSHIP_REGION)
+    cache.apply_invalidation_patch(
+        region=identity.GROUP_MEMBERSHIP_REGION,
+        region_name=identity.GROUP_MEMBERSHIP_REGION.name)
 
     # Ensure that the identity driver is created before the assignment manager
     # and that the assignment driver is created before the resource manager.
@@ -2245,6 +2245,40 @@ class AssignmentTests(AssignmentTestHelperMixin):
         self.assertEqual(new_role['name'],
                          first_asgmt_dmn['role_name'])
 
+    def test_list_role_assignment_names_are_read_in_bulk(self):
+        new_role = unit.new_role_ref()
+        new_role = self.role_api.create_role(new_role['id'], new_role)
+        new_domain = self._get_domain_fixture()
+        new_project = unit.new_project_ref(domain_id=new_domain['id'])
+        self.resource_api.create_project(new_project['id'], new_project)
+        new_users = []
+        for _ in range(3):
+            new_user = unit.new_user_ref(domain_id=new_domain['id'])
+            new_user = self.identity_api.create_user(new_user)
+            self.assignment_api.create_grant(user_id=new_user['id'],
+                                             project_id=new_project['id'],
+                                             role_id=new_role['id'])
+            new_users.append(new_user)
+
+        with mock.patch.object(self.identity_api, 'get_user') as get_user, \
+                mock.patch.object(self.resource_api,
+                                  'get_project') as get_project:
+            assignments = self.assignment_api.list_role_assignments(
+                project_id=new_project['id'], include_names=True)
+        self.assertFalse(get_user.called)
+        self.assertFalse(get_project.called)
+
+        self.assertItemsEqual(
+            [(user['id'], user['name']) for user in new_users],
+            [(a['user_id'], a['user_name']) for a in assignments])
+        for assignment in assignments:
+            self.assertEqual(new_project['name'], assignment['project_name'])
+            self.assertEqual(new_domain['name'],
+                             assignment['project_domain_name'])
+            self.assertEqual(new_domain['name'],
+                             assignment['user_domain_name'])
+            self.assertEqual(new_role['name'], assignment['role_name'])
+
     def test_list_role_assignment_does_not_contain_names(self):
         """Test names are not included with list role assignments.
 
@@ -3753,3 +3787,21 @@ class ImpliedRoleTests(AssignmentTestHelperMixin):
             ]
         }
         self.execute_assignment_plan(test_plan)
+
+    @unit.skip_if_cache_disabled('role')
+    def test_role_assignments_read_implied_role_closure_once(self):
+        get_closure = self.role_api.get_implied_role_closure
+        with mock.patch.object(self.role_api, 'get_implied_role_closure',
+                               wraps=get_closure) as closure:
+            self.test_role_assignments_domain_specific_with_implied_roles()
+        # The effective listing of the plan both expands implied roles and
+        # strips domain roles from a single read of the closure.
+        self.assertEqual(1, closure.call_count)
+
+    def test_role_assignments_implied_roles_without_role_cache(self):
+        self.config_fixture.config(group='role', caching=False)
+        with mock.patch.object(self.role_api,
+                               'get_implied_role_closure') as closure:
+            self.test_circular_inferences()
+            self.test_role_assignments_domain_specific_with_implied_roles()
+        self.assertFalse(closure.called)
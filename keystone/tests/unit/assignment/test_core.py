@@ -80,6 +80,96 @@ class RoleTests(object):
         expected_role_ids = set(role['id'] for role in default_fixtures.ROLES)
         self.assertEqual(expected_role_ids, role_ids)
 
+    def test_get_roles(self):
+        role1 = unit.new_role_ref()
+        role2 = unit.new_role_ref()
+        self.role_api.create_role(role1['id'], role1)
+        self.role_api.create_role(role2['id'], role2)
+        roles = self.role_api.get_roles(
+            [role2['id'], uuid.uuid4().hex, role1['id'], role2['id']])
+        self.assertEqual([role2['id'], role1['id']],
+                         [role['id'] for role in roles])
+        self.assertEqual([], self.role_api.get_roles([]))
+
+    @unit.skip_if_cache_disabled('role')
+    def test_cache_layer_get_roles(self):
+        role1 = unit.new_role_ref()
+        role2 = unit.new_role_ref()
+        self.role_api.create_role(role1['id'], role1)
+        self.role_api.create_role(role2['id'], role2)
+        # Cache role1 only, then update both bypassing the role api manager
+        role1_ref = self.role_api.get_role(role1['id'])
+        self.role_api.get_role.invalidate(self.role_api, role2['id'])
+        for role in (role1, role2):
+            self.role_api.driver.update_role(role['id'],
+                                             {'name': uuid.uuid4().hex})
+        role2_ref = self.role_api.driver.get_role(role2['id'])
+        # role1 comes from the cache, role2 from the driver
+        self.assertEqual([role1_ref, role2_ref],
+                         self.role_api.get_roles([role1['id'], role2['id']]))
+        # and role2 is now cached too
+        self.role_api.driver.update_role(role2['id'],
+                                         {'name': uuid.uuid4().hex})
+        self.assertEqual(role2_ref, self.role_api.get_role(role2['id']))
+
+    def test_get_implied_role_closure(self):
+        domain = unit.new_domain_ref()
+        self.resource_api.create_domain(domain['id'], domain)
+        roles = []
+        for _ in range(4):
+            role = unit.new_role_ref()
+            roles.append(self.role_api.create_role(role['id'], role))
+        domain_role = unit.new_role_ref(domain_id=domain['id'])
+        self.role_api.create_role(domain_role['id'], domain_role)
+        # role 0 implies role 1, which implies roles 2 and 3, and role 2
+        # implies role 0 again.
+        for prior, implied in ((0, 1), (1, 2), (1, 3), (2, 0)):
+            self.role_api.create_implied_role(roles[prior]['id'],
+                                              roles[implied]['id'])
+
+        closure = self.role_api.get_implied_role_closure()
+        self.assertEqual(
+            sorted([[roles[0]['id'], roles[1]['id']],
+                    [roles[1]['id'], roles[2]['id']],
+                    [roles[1]['id'], roles[3]['id']],
+                    [roles[2]['id'], roles[0]['id']]]),
+            sorted(closure['implied'][roles[0]['id']]))
+        self.assertNotIn(roles[3]['id'], closure['implied'])
+        self.assertIsNone(closure['domain_ids'][roles[0]['id']])
+        self.assertEqual(domain['id'],
+                         closure['domain_ids'][domain_role['id']])
+
+    @unit.skip_if_cache_disabled('role')
+    def test_cache_layer_implied_role_closure(self):
+        prior_role = unit.new_role_ref()
+        self.role_api.create_role(prior_role['id'], prior_role)
+        implied_role = unit.new_role_ref()
+        self.role_api.create_role(implied_role['id'], implied_role)
+        self.role_api.create_implied_role(prior_role['id'],
+                                          implied_role['id'])
+        # cache the closure, then delete the rule bypassing the role api
+        closure = self.role_api.get_implied_role_closure()
+        self.role_api.driver.delete_implied_role(prior_role['id'],
+                                                 implied_role['id'])
+        self.assertEqual(closure, self.role_api.get_implied_role_closure())
+        self.role_api.get_implied_role_closure.invalidate(self.role_api)
+        closure = self.role_api.get_implied_role_closure()
+        self.assertNotIn(prior_role['id'], closure['implied'])
+
+        # Changes through the role api invalidate the closure
+        self.role_api.create_implied_role(prior_role['id'],
+                                          implied_role['id'])
+        closure = self.role_api.get_implied_role_closure()
+        self.assertEqual([[prior_role['id'], implied_role['id']]],
+                         closure['implied'][prior_role['id']])
+        self.role_api.delete_implied_role(prior_role['id'],
+                                          implied_role['id'])
+        closure = self.role_api.get_implied_role_closure()
+        self.assertNotIn(prior_role['id'], closure['implied'])
+        self.role_api.delete_role(implied_role['id'])
+        closure = self.role_api.get_implied_role_closure()
+        self.assertNotIn(implied_role['id'], closure['domain_ids'])
+
     @unit.skip_if_cache_disabled('role')
     def test_cache_layer_role_crud(self):
         role = unit.new_role_ref()
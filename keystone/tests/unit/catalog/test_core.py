@@ -12,11 +12,18 @@
 
 import uuid
 
+import mock
+
+from keystone import catalog
 from keystone.common import utils
+import keystone.conf
 from keystone import exception
 from keystone.tests import unit
 
 
+CONF = keystone.conf.CONF
+
+
 class FormatUrlTests(unit.BaseTestCase):
 
     def test_successful_formatting(self):
@@ -98,3 +105,50 @@ class FormatUrlTests(unit.BaseTestCase):
                   'user_id': 'B'}
         self.assertIsNone(utils.format_url(url_template, values,
                           silent_keyerror_failures=['project_id']))
+
+    def test_compiled_url_is_reused(self):
+        url_template = 'http://$(public_bind_host)s/$(tenant_id)s'
+        compiled = utils.compile_url(url_template)
+        self.assertIs(compiled, utils.compile_url(url_template))
+        self.assertEqual(('public_bind_host', 'tenant_id'), compiled.keys)
+
+    def test_compiled_url_formats_with_different_substitutions(self):
+        compiled = utils.compile_url('http://$(public_bind_host)s/'
+                                     '$(project_id)s/%%20')
+        for project_id in (uuid.uuid4().hex, uuid.uuid4().hex):
+            values = {'public_bind_host': 'server', 'project_id': project_id,
+                      'admin_token': 'C'}
+            self.assertEqual('http://server/%s/%%20' % project_id,
+                             compiled.format(values))
+
+
+class URLSubstitutionsTests(unit.TestCase):
+
+    def test_static_values_come_from_config(self):
+        self.config_fixture.config(public_endpoint='http://public:5000/')
+        self.config_fixture.config(group='eventlet_server', admin_port=35357)
+        substitutions = utils.get_url_substitutions(user_id='B')
+        self.assertEqual('http://public:5000/',
+                         substitutions['public_endpoint'])
+        self.assertEqual(35357, substitutions['admin_port'])
+        self.assertEqual('B', substitutions['user_id'])
+        self.assertNotIn('admin_token', substitutions)
+
+    def test_request_values_do_not_leak(self):
+        utils.get_url_substitutions(project_id='A')
+        self.assertNotIn('project_id', utils.get_url_substitutions())
+
+    def test_static_values_are_read_again_after_reset(self):
+        self.config_fixture.config(public_endpoint='http://one/')
+        utils.get_url_substitutions()
+        self.config_fixture.config(public_endpoint='http://two/')
+        self.assertEqual('http://one/',
+                         utils.get_url_substitutions()['public_endpoint'])
+        utils.reset_url_substitutions()
+        self.assertEqual('http://two/',
+                         utils.get_url_substitutions()['public_endpoint'])
+
+    def test_catalog_manager_registers_reset_as_mutate_hook(self):
+        with mock.patch.object(CONF, 'register_mutate_hook') as register:
+            catalog.Manager()
+        register.assert_called_once_with(utils.reset_url_substitutions)
@@ -0,0 +1,147 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import datetime
+import threading
+import uuid
+
+import mock
+from oslo_config import fixture as config_fixture
+from oslo_utils import timeutils
+
+from keystone.common import password_hashing
+from keystone.common import utils as common_utils
+import keystone.conf
+from keystone import exception
+from keystone.tests import unit
+
+
+CONF = keystone.conf.CONF
+
+
+class HashingPoolTestCase(unit.BaseTestCase):
+
+    def test_run_on_calling_thread_without_workers(self):
+        pool = password_hashing.HashingPool(0, 1)
+        self.assertEqual(threading.current_thread(),
+                         pool.submit(threading.current_thread))
+        self.assertEqual(1, pool.stats()['jobs'])
+
+    def test_run_on_worker(self):
+        pool = password_hashing.HashingPool(2, 4)
+        self.assertNotEqual(threading.current_thread(),
+                            pool.submit(threading.current_thread))
+        stats = pool.stats()
+        self.assertEqual(1, stats['jobs'])
+        self.assertEqual(0, stats['rejected'])
+
+    def test_stop_ends_workers(self):
+        pool = password_hashing.HashingPool(2, 4)
+        pool.submit(int, '1')
+        workers = list(pool._threads)
+        self.assertEqual(2, len(workers))
+        pool.stop()
+        for worker in workers:
+            worker.join(5)
+            self.assertFalse(worker.is_alive())
+
+    def test_exceptions_are_raised_to_the_caller(self):
+        pool = password_hashing.HashingPool(1, 1)
+        self.assertRaises(ValueError, pool.submit, int, 'not a number')
+
+    def test_full_queue_rejects_jobs(self):
+        pool = password_hashing.HashingPool(1, 1)
+        release = threading.Event()
+        running = threading.Event()
+
+        def block():
+            running.set()
+            release.wait()
+
+        # Occupy the only worker, then fill the queue behind it.
+        submitters = [threading.Thread(target=pool.submit, args=(block,))]
+        submitters[0].start()
+        running.wait()
+        submitters.append(threading.Thread(target=pool.submit,
+                                           args=(block,)))
+        submitters[1].start()
+        while not pool.stats()['queue_depth']:
+            release.wait(0.01)
+
+        self.assertRaises(exception.PasswordHashingBusy, pool.submit, block)
+
+        release.set()
+        for submitter in submitters:
+            submitter.join()
+        stats = pool.stats()
+        self.assertEqual(2, stats['jobs'])
+        self.assertEqual(1, stats['rejected'])
+        self.assertEqual(1, stats['max_queue_depth'])
+
+
+class CheckPasswordTestCase(unit.BaseTestCase):
+
+    def setUp(self):
+        super(CheckPasswordTestCase, self).setUp()
+        self.config_fixture = self.useFixture(config_fixture.Config(CONF))
+        self.password = uuid.uuid4().hex
+        self.hashed = common_utils.hash_password(self.password)
+
+    def _check_password(self, password):
+        with mock.patch.object(common_utils, 'check_password',
+                               wraps=common_utils.check_password) as check:
+            return password_hashing.check_password(password, self.hashed), (
+                check.call_count)
+
+    def test_pool_replaced_when_workers_change(self):
+        self.config_fixture.config(group='identity', password_hash_workers=2)
+        pool = password_hashing._get_pool()
+        self.assertIs(pool, password_hashing._get_pool())
+        with mock.patch.object(pool, 'stop') as stop:
+            self.config_fixture.config(group='identity',
+                                       password_hash_workers=3)
+            self.assertEqual(3, password_hashing._get_pool().workers)
+            stop.assert_called_once_with()
+
+    def test_hash_with_workers(self):
+        self.config_fixture.config(group='identity', password_hash_workers=2)
+        hashed = password_hashing.hash_password(self.password)
+        self.assertTrue(common_utils.check_password(self.password, hashed))
+
+    def test_verified_password_is_not_hashed_again(self):
+        self.config_fixture.config(group='identity',
+                                   verified_password_cache_time=60)
+        self.assertEqual((True, 1), self._check_password(self.password))
+        self.assertEqual((True, 0), self._check_password(self.password))
+        self.assertEqual((False, 1), self._check_password(uuid.uuid4().hex))
+
+    def test_wrong_password_is_not_cached(self):
+        self.config_fixture.config(group='identity',
+                                   verified_password_cache_time=60)
+        wrong = uuid.uuid4().hex
+        self.assertEqual((False, 1), self._check_password(wrong))
+        self.assertEqual((False, 1), self._check_password(wrong))
+
+    def test_verified_password_expires(self):
+        self.config_fixture.config(group='identity',
+                                   verified_password_cache_time=60)
+        now = timeutils.utcnow()
+        with mock.patch.object(timeutils, 'utcnow', return_value=now):
+            self.assertEqual((True, 1), self._check_password(self.password))
+        later = now + datetime.timedelta(seconds=61)
+        with mock.patch.object(timeutils, 'utcnow', return_value=later):
+            self.assertEqual((True, 1), self._check_password(self.password))
+
+    def test_cache_disabled_by_default(self):
+        self.assertEqual((True, 1), self._check_password(self.password))
+        self.assertEqual((True, 1), self._check_password(self.password))
+        self.assertIsNone(password_hashing._get_cache())
@@ -12,6 +12,7 @@
 
 import uuid
 
+import mock
 from oslo_config import fixture as config_fixture
 from oslo_serialization import jsonutils
 import webob
@@ -111,6 +112,26 @@ class MappingRuleEngineTests(unit.BaseTestCase):
         self.assertEqual(user_name, name)
         self.assertIn(mapping_fixtures.TESTER_GROUP_ID, group_ids)
 
+    def test_rule_engine_compiles_rules_once(self):
+        """Should compile the regular expressions of the rules only once.
+
+        The same RuleProcessor processes TESTER_ASSERTION several times with
+        MAPPING_TESTER_REGEX, and gets the same result each time.
+
+        """
+        mapping = mapping_fixtures.MAPPING_TESTER_REGEX
+        assertion = mapping_fixtures.TESTER_ASSERTION
+        rp = mapping_utils.RuleProcessor(FAKE_MAPPING_ID, mapping['rules'])
+        with mock.patch.object(mapping_utils.re, 'compile',
+                               side_effect=AssertionError), \
+                mock.patch.object(mapping_utils.re, 'search',
+                                  side_effect=AssertionError):
+            values = [rp.process(assertion) for _ in range(3)]
+        self.assertEqual(values[0], values[1])
+        self.assertEqual(values[0], values[2])
+        self.assertIn(mapping_fixtures.TESTER_GROUP_ID,
+                      values[0]['group_ids'])
+
     def test_rule_engine_any_one_of_many_rules(self):
         """Should return group CONTRACTOR_GROUP_ID.
 
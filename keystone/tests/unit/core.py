@@ -45,6 +45,7 @@ from keystone.common import context
 from keystone.common import dependency
 from keystone.common import request
 from keystone.common import sql
+from keystone.common import utils
 import keystone.conf
 from keystone import exception
 from keystone.identity.backends.ldap import common as ks_ldap
@@ -702,6 +703,11 @@ class TestCase(BaseTestCase):
 
         self.addCleanup(setattr, controllers, '_VERSIONS', [])
 
+        # The configuration values used in endpoint URLs are read once, make
+        # sure the ones from this test don't leak into the next.
+        utils.reset_url_substitutions()
+        self.addCleanup(utils.reset_url_substitutions)
+
     def config(self, config_files):
         sql.initialize()
         CONF(args=[], project='keystone', default_config_files=config_files)
@@ -22,9 +22,10 @@ library to work with keystone.
 
 """
 
-import random
+import itertools
 import re
 import shelve
+import time
 
 import ldap
 from oslo_log import log
@@ -205,6 +206,11 @@ def _subs(value):
 
 server_fail = False
 
+# The time, in seconds, the fake server takes to answer a search. A search
+# sent with search_ext is answered that long after it was sent, however many
+# other searches were sent after it, as a real server would answer them.
+search_latency = 0
+
 
 class FakeShelve(dict):
 
@@ -214,6 +220,13 @@ class FakeShelve(dict):
 
 FakeShelves = {}
 PendingRequests = {}
+_msgids = itertools.count()
+
+
+def _wait_for_answer(sent_at):
+    delay = sent_at + search_latency - time.time()
+    if delay > 0:
+        time.sleep(delay)
 
 
 class FakeLdap(common.LDAPHandler):
@@ -450,6 +463,11 @@ class FakeLdap(common.LDAPHandler):
 
     def search_s(self, base, scope,
                  filterstr='(objectClass=*)', attrlist=None, attrsonly=0):
+        _wait_for_answer(time.time())
+        return self._search_s(base, scope, filterstr, attrlist, attrsonly)
+
+    def _search_s(self, base, scope,
+                  filterstr='(objectClass=*)', attrlist=None, attrsonly=0):
         """Search for all matching objects under base using the query.
 
         Args:
@@ -554,16 +572,16 @@ class FakeLdap(common.LDAPHandler):
             raise exception.NotImplemented()
 
         # only passing a single server control is supported by this fake ldap
-        if len(serverctrls) > 1:
+        if serverctrls and len(serverctrls) > 1:
             raise exception.NotImplemented()
 
         # search_ext is async and returns an identifier used for
         # retrieving the results via result3(). This will be emulated by
-        # storing the request in a variable with random integer key and
+        # storing the request in a variable with a unique integer key and
         # performing the real lookup in result3()
-        msgid = random.randint(0, 1000)
+        msgid = next(_msgids)
         PendingRequests[msgid] = (base, scope, filterstr, attrlist, attrsonly,
-                                  serverctrls)
+                                  serverctrls, time.time())
         return msgid
 
     def result3(self, msgid=ldap.RES_ANY, all=1, timeout=None,
@@ -577,16 +595,17 @@ class FakeLdap(common.LDAPHandler):
         if all != 1 or timeout is not None or resp_ctrl_classes is not None:
             raise exception.NotImplemented()
 
-        params = PendingRequests[msgid]
+        params = PendingRequests.pop(msgid)
+        _wait_for_answer(params[6])
         # search_s accepts a subset of parameters of search_ext,
         # that's why we use only the first 5.
-        results = self.search_s(*params[:5])
+        results = self._search_s(*params[:5])
 
         # extract limit from serverctrl
         serverctrls = params[5]
-        ctrl = serverctrls[0]
+        ctrl = serverctrls[0] if serverctrls else None
 
-        if ctrl.size:
+        if ctrl is not None and ctrl.size:
             rdata = results[:ctrl.size]
         else:
             rdata = results
@@ -121,6 +121,46 @@ class IdentityTests(object):
         self.user_foo.pop('password')
         self.assertDictEqual(self.user_foo, user_ref)
 
+    def test_list_users_from_ids(self):
+        user = unit.new_user_ref(domain_id=CONF.identity.default_domain_id)
+        user = self.identity_api.create_user(user)
+        users = self.identity_api.list_users_from_ids(
+            [self.user_foo['id'], user['id'], uuid.uuid4().hex])
+        self.assertItemsEqual(
+            [self.identity_api.get_user(self.user_foo['id']),
+             self.identity_api.get_user(user['id'])], users)
+        self.assertEqual([], self.identity_api.list_users_from_ids([]))
+
+    def test_get_users(self):
+        user = unit.new_user_ref(domain_id=CONF.identity.default_domain_id)
+        user = self.identity_api.create_user(user)
+        users = self.identity_api.get_users(
+            [user['id'], uuid.uuid4().hex, self.user_foo['id']])
+        self.assertEqual([self.identity_api.get_user(user['id']),
+                          self.identity_api.get_user(self.user_foo['id'])],
+                         users)
+        self.assertEqual([], self.identity_api.get_users([]))
+
+    @unit.skip_if_cache_disabled('identity')
+    def test_cache_layer_get_users(self):
+        user = unit.new_user_ref(domain_id=CONF.identity.default_domain_id)
+        user = self.identity_api.create_user(user)
+        # cache the result.
+        ref = self.identity_api.get_user(user['id'])
+        # delete bypassing identity api
+        domain_id, driver, entity_id = (
+            self.identity_api._get_domain_driver_and_entity_id(ref['id']))
+        driver.delete_user(entity_id)
+
+        with mock.patch.object(driver, 'list_users_from_ids',
+                               return_value=[]) as list_users_from_ids:
+            self.assertEqual([ref],
+                             self.identity_api.get_users([ref['id']]))
+        self.assertFalse(list_users_from_ids.called)
+
+        self.identity_api.get_user.invalidate(self.identity_api, ref['id'])
+        self.assertEqual([], self.identity_api.get_users([ref['id']]))
+
     @unit.skip_if_cache_disabled('identity')
     def test_cache_layer_get_user(self):
         user = unit.new_user_ref(domain_id=CONF.identity.default_domain_id)
@@ -499,6 +539,18 @@ class IdentityTests(object):
         self.assertIn(group1['id'], group_ids)
         self.assertIn(group2['id'], group_ids)
 
+    def test_list_groups_from_ids(self):
+        group1 = unit.new_group_ref(domain_id=CONF.identity.default_domain_id)
+        group2 = unit.new_group_ref(domain_id=CONF.identity.default_domain_id)
+        group1 = self.identity_api.create_group(group1)
+        group2 = self.identity_api.create_group(group2)
+        groups = self.identity_api.list_groups_from_ids(
+            [group1['id'], group2['id'], uuid.uuid4().hex])
+        self.assertItemsEqual([self.identity_api.get_group(group1['id']),
+                               self.identity_api.get_group(group2['id'])],
+                              groups)
+        self.assertEqual([], self.identity_api.list_groups_from_ids([]))
+
     def test_create_user_doesnt_modify_passed_in_dict(self):
         new_user = unit.new_user_ref(domain_id=CONF.identity.default_domain_id)
         original_user = new_user.copy()
@@ -690,6 +742,60 @@ class IdentityTests(object):
                           self.identity_api.list_users_in_group,
                           uuid.uuid4().hex)
 
+    def test_list_user_ids_in_groups(self):
+        domain = self._get_domain_fixture()
+        groups = []
+        for _ in range(2):
+            group = unit.new_group_ref(domain_id=domain['id'])
+            groups.append(self.identity_api.create_group(group))
+        user = unit.new_user_ref(domain_id=domain['id'])
+        user = self.identity_api.create_user(user)
+        self.identity_api.add_user_to_group(user['id'], groups[0]['id'])
+
+        user_ids = self.identity_api.list_user_ids_in_groups(
+            [groups[0]['id'], groups[1]['id'], uuid.uuid4().hex])
+        self.assertEqual({groups[0]['id']: [user['id']],
+                          groups[1]['id']: []}, user_ids)
+        self.assertEqual({}, self.identity_api.list_user_ids_in_groups([]))
+
+    @unit.skip_if_cache_disabled('identity')
+    def test_cache_layer_group_memberships(self):
+        domain = self._get_domain_fixture()
+        group = unit.new_group_ref(domain_id=domain['id'])
+        group = self.identity_api.create_group(group)
+        user = unit.new_user_ref(domain_id=domain['id'])
+        user = self.identity_api.create_user(user)
+        self.identity_api.add_user_to_group(user['id'], group['id'])
+        # cache the memberships.
+        self.assertEqual([group['id']],
+                         self.identity_api.list_group_ids_for_user(user['id']))
+        self.assertEqual([user['id']],
+                         self.identity_api.list_user_ids_in_group(group['id']))
+        # remove the membership bypassing identity api
+        domain_id, driver, group_entity_id = (
+            self.identity_api._get_domain_driver_and_entity_id(group['id']))
+        domain_id, driver, user_entity_id = (
+            self.identity_api._get_domain_driver_and_entity_id(user['id']))
+        driver.remove_user_from_group(user_entity_id, group_entity_id)
+
+        self.assertEqual([group['id']],
+                         self.identity_api.list_group_ids_for_user(user['id']))
+        with mock.patch.object(driver, 'list_users_in_groups',
+                               return_value={}) as list_users_in_groups:
+            self.assertEqual(
+                {group['id']: [user['id']]},
+                self.identity_api.list_user_ids_in_groups([group['id']]))
+        self.assertFalse(list_users_in_groups.called)
+
+        # Membership changes through the identity api invalidate both the
+        # user's and the group's memberships.
+        self.identity_api.add_user_to_group(user['id'], group['id'])
+        self.identity_api.remove_user_from_group(user['id'], group['id'])
+        self.assertEqual([],
+                         self.identity_api.list_group_ids_for_user(user['id']))
+        self.assertEqual([],
+                         self.identity_api.list_user_ids_in_group(group['id']))
+
     def test_list_groups_for_user(self):
         domain = self._get_domain_fixture()
         test_groups = []
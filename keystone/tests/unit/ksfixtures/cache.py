@@ -15,11 +15,14 @@ import fixtures
 
 from keystone import catalog
 from keystone.common import cache
+from keystone import identity
 from keystone import revoke
+from keystone.token import provider
 
 
 CACHE_REGIONS = (cache.CACHE_REGION, catalog.COMPUTED_CATALOG_REGION,
-                 revoke.REVOKE_REGION)
+                 catalog.CATALOG_SKELETON_REGION, revoke.REVOKE_REGION,
+                 provider.TOKEN_SCOPE_REGION, identity.GROUP_MEMBERSHIP_REGION)
 
 
 class Cache(fixtures.Fixture):
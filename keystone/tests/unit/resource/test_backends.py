@@ -36,6 +36,13 @@ class ResourceTests(object):
         tenant_ref = self.resource_api.get_project(self.tenant_bar['id'])
         self.assertDictEqual(self.tenant_bar, tenant_ref)
 
+    def test_get_projects(self):
+        projects = self.resource_api.get_projects(
+            [self.tenant_baz['id'], uuid.uuid4().hex, self.tenant_bar['id']])
+        self.assertEqual([self.tenant_baz['id'], self.tenant_bar['id']],
+                         [project['id'] for project in projects])
+        self.assertEqual([], self.resource_api.get_projects([]))
+
     def test_get_project_returns_not_found(self):
         self.assertRaises(exception.ProjectNotFound,
                           self.resource_api.get_project,
@@ -1447,6 +1454,16 @@ class ResourceTests(object):
                           self.resource_api.get_domain_by_name,
                           domain_name)
 
+    def test_get_domains(self):
+        domain = unit.new_domain_ref()
+        self.resource_api.create_domain(domain['id'], domain)
+        domains = self.resource_api.get_domains(
+            [domain['id'], uuid.uuid4().hex,
+             CONF.identity.default_domain_id])
+        self.assertEqual([domain['id'], CONF.identity.default_domain_id],
+                         [ref['id'] for ref in domains])
+        self.assertEqual([], self.resource_api.get_domains([]))
+
     @unit.skip_if_cache_disabled('resource')
     def test_cache_layer_domain_crud(self):
         domain = unit.new_domain_ref()
@@ -1525,6 +1542,33 @@ class ResourceTests(object):
                           project_name,
                           domain['id'])
 
+    @unit.skip_if_cache_disabled('resource')
+    def test_cache_layer_get_projects(self):
+        project1 = unit.new_project_ref(
+            domain_id=CONF.identity.default_domain_id)
+        project2 = unit.new_project_ref(
+            domain_id=CONF.identity.default_domain_id)
+        self.resource_api.create_project(project1['id'], project1)
+        self.resource_api.create_project(project2['id'], project2)
+        # Cache project1 only, then update both bypassing the resource api
+        # manager
+        project1_ref = self.resource_api.get_project(project1['id'])
+        self.resource_api.get_project.invalidate(self.resource_api,
+                                                 project2['id'])
+        for project in (project1, project2):
+            self.resource_api.driver.update_project(
+                project['id'], {'name': uuid.uuid4().hex})
+        project2_ref = self.resource_api.driver.get_project(project2['id'])
+        # project1 comes from the cache, project2 from the driver
+        self.assertEqual(
+            [project1_ref, project2_ref],
+            self.resource_api.get_projects([project1['id'], project2['id']]))
+        # and project2 is now cached too
+        self.resource_api.driver.update_project(project2['id'],
+                                                {'name': uuid.uuid4().hex})
+        self.assertEqual(project2_ref,
+                         self.resource_api.get_project(project2['id']))
+
     @unit.skip_if_cache_disabled('resource')
     @unit.skip_if_no_multiple_domains_support
     def test_cache_layer_project_crud(self):
@@ -115,6 +115,108 @@ class TestResourceManagerNoFixtures(unit.SQLDriverOverrides, unit.TestCase):
                           project['id'], {'name': project1['name']})
 
 
+class TestProjectHierarchyIndex(unit.SQLDriverOverrides, unit.TestCase):
+
+    def config_overrides(self):
+        super(TestProjectHierarchyIndex, self).config_overrides()
+        self.config_fixture.config(group='resource',
+                                   hierarchy_index_cache_time=600)
+
+    def setUp(self):
+        super(TestProjectHierarchyIndex, self).setUp()
+        self.useFixture(database.Database(self.sql_driver_version_overrides))
+        self.load_backends()
+        self.resource_api.ensure_default_domain_exists()
+        self.domain_id = CONF.identity.default_domain_id
+
+        # root -> child -> grandchild
+        self.root = self._create_project(self.domain_id)
+        self.child = self._create_project(self.root['id'])
+        self.grandchild = self._create_project(self.child['id'])
+
+    def _create_project(self, parent_id, domain_id=None):
+        project = unit.new_project_ref(domain_id=domain_id or self.domain_id,
+                                       parent_id=parent_id)
+        return self.resource_api.create_project(project['id'], project)
+
+    def _assert_lookups_match_driver(self, project_id):
+        driver = self.resource_api.driver
+        self.assertEqual(
+            [p['id'] for p in driver.list_project_parents(project_id)],
+            self.resource_api.list_project_parent_ids(project_id))
+        self.assertEqual(
+            [p['id'] for p in driver.list_projects_in_subtree(project_id)],
+            self.resource_api.list_project_ids_in_subtree(project_id))
+
+    def test_lookups_match_driver(self):
+        for project in (self.root, self.child, self.grandchild):
+            self._assert_lookups_match_driver(project['id'])
+        self._assert_lookups_match_driver(self.domain_id)
+
+    def test_lookups_use_the_index(self):
+        # Load the index of the domain.
+        self.resource_api.list_project_parent_ids(self.root['id'])
+
+        driver = self.resource_api.driver
+        with mock.patch.object(driver, 'list_project_parents') as parents, \
+                mock.patch.object(driver,
+                                  'list_projects_in_subtree') as subtree:
+            self.assertEqual(
+                [self.child['id'], self.root['id'], self.domain_id],
+                self.resource_api.list_project_parent_ids(
+                    self.grandchild['id']))
+            self.assertEqual(
+                {self.child['id']: {self.grandchild['id']: None}},
+                self.resource_api.get_projects_in_subtree_as_ids(
+                    self.root['id']))
+        self.assertFalse(parents.called)
+        self.assertFalse(subtree.called)
+
+    def test_index_follows_project_changes(self):
+        self.resource_api.list_project_parent_ids(self.root['id'])
+
+        sibling = self._create_project(self.root['id'])
+        self._assert_lookups_match_driver(self.root['id'])
+
+        self.resource_api.update_project(self.root['id'], {'enabled': False},
+                                         cascade=True)
+        self.assertRaises(exception.ValidationError,
+                          self._create_project, self.grandchild['id'])
+        self.assertRaises(exception.ForbiddenNotSecurity,
+                          self.resource_api.update_project,
+                          self.child['id'], {'enabled': True})
+
+        self.resource_api.delete_project(self.child['id'], cascade=True)
+        self.assertEqual([sibling['id']],
+                         self.resource_api.list_project_ids_in_subtree(
+                             self.root['id']))
+
+    def test_project_moved_to_another_domain(self):
+        self.config_fixture.config(domain_id_immutable=False)
+        domain = unit.new_domain_ref()
+        self.resource_api.create_domain(domain['id'], domain)
+        project = self._create_project(self.domain_id)
+        self.resource_api.list_project_parent_ids(project['id'])
+
+        self.resource_api.update_project(project['id'],
+                                         {'domain_id': domain['id']})
+        # The project keeps its parent, so the index agrees with the driver
+        # whichever domain the project is looked up from.
+        self._assert_lookups_match_driver(project['id'])
+        self._assert_lookups_match_driver(self.domain_id)
+        self._assert_lookups_match_driver(domain['id'])
+
+    def test_project_changes_ignored_while_index_is_disabled(self):
+        self.config_fixture.config(group='resource',
+                                   hierarchy_index_cache_time=0)
+        with mock.patch.object(self.resource_api.driver,
+                               'get_project') as get_project:
+            self.resource_api._project_changed_callback(
+                'identity', 'project', 'updated',
+                {'resource_info': self.child['id']})
+        self.assertFalse(get_project.called)
+
+
 class DomainConfigDriverTests(object):
 
     def _domain_config_crud(self, sensitive):
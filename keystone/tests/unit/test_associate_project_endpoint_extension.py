@@ -427,6 +427,33 @@ class EndpointFilterTokenRequestTestCase(EndpointFilterTestCase):
             ep_filter_assoc=1)
         self.assertEqual(project['id'], r.result['token']['project']['id'])
 
+    @unit.skip_if_cache_disabled('catalog')
+    def test_endpoints_filtering_catalog_are_cached(self):
+        url = ('/OS-EP-FILTER/projects/%(project_id)s'
+               '/endpoints/%(endpoint_id)s' % {
+                   'project_id': self.project['id'],
+                   'endpoint_id': self.endpoint_id})
+        self.put(url)
+
+        driver = self.catalog_api.driver
+        with mock.patch.object(
+                driver, 'list_endpoints_for_project',
+                wraps=driver.list_endpoints_for_project) as list_endpoints:
+            catalog = self.catalog_api.get_v3_catalog(self.user['id'],
+                                                      self.project['id'])
+            self.assertEqual(
+                catalog, self.catalog_api.get_v3_catalog(self.user['id'],
+                                                         self.project['id']))
+            self.assertEqual(1, list_endpoints.call_count)
+
+            # Changing an association reads the endpoints again.
+            self.delete(url)
+            self.catalog_api.get_v3_catalog(self.user['id'],
+                                            self.project['id'])
+            self.assertEqual(2, list_endpoints.call_count)
+        self.assertEqual([self.endpoint_id],
+                         [e['id'] for s in catalog for e in s['endpoints']])
+
     def test_default_scoped_token_using_endpoint_filter(self):
         """Verify endpoints from default scoped token filtered."""
         # add one endpoint to default project
@@ -118,6 +118,25 @@ class SqlIDMapping(test_backend_sql.SqlTests):
         self.assertThat(mapping_sql.list_id_mappings(),
                         matchers.HasLength(initial_mappings))
 
+    def test_get_id_mappings(self):
+        local_entity1 = {'domain_id': self.domainA['id'],
+                         'local_id': uuid.uuid4().hex,
+                         'entity_type': mapping.EntityType.USER}
+        local_entity2 = {'domain_id': self.domainB['id'],
+                         'local_id': uuid.uuid4().hex,
+                         'entity_type': mapping.EntityType.GROUP}
+        public_id1 = self.id_mapping_api.create_id_mapping(local_entity1)
+        public_id2 = self.id_mapping_api.create_id_mapping(local_entity2)
+
+        id_mappings = self.id_mapping_api.get_id_mappings(
+            [public_id1, public_id2, uuid.uuid4().hex])
+        self.assertEqual({public_id1, public_id2}, set(id_mappings))
+        self.assertEqual(local_entity1['local_id'],
+                         id_mappings[public_id1]['local_id'])
+        self.assertEqual(local_entity2['domain_id'],
+                         id_mappings[public_id2]['domain_id'])
+        self.assertEqual({}, self.id_mapping_api.get_id_mappings([]))
+
     def test_id_mapping_handles_unicode(self):
         initial_mappings = len(mapping_sql.list_id_mappings())
         local_id = u'fäké1'
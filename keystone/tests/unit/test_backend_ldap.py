@@ -28,6 +28,7 @@ from testtools import matchers
 
 from keystone.common import cache
 from keystone.common import driver_hints
+from keystone.common import sql
 import keystone.conf
 from keystone import exception
 from keystone import identity
@@ -1157,6 +1158,145 @@ class LDAPIdentity(BaseLDAPIdentity, unit.TestCase):
             name=u'Default')
         self.assertEqual([default_domain], domains)
 
+    def test_list_users_in_group_searches_members_at_once(self):
+        domain_id = CONF.identity.default_domain_id
+        group = unit.new_group_ref(domain_id=domain_id)
+        group = self.identity_api.create_group(group)
+        user_ids = []
+        for _ in range(3):
+            user = unit.new_user_ref(domain_id=domain_id)
+            user = self.identity_api.create_user(user)
+            self.identity_api.add_user_to_group(user['id'], group['id'])
+            user_ids.append(user['id'])
+
+        driver = self.identity_api._select_identity_driver(domain_id)
+        self.useFixture(fixtures.MockPatchObject(
+            driver.user, 'ID_FILTER_CHUNK_SIZE', 2))
+        get_filtered = self.useFixture(fixtures.MockPatchObject(
+            driver.user, 'get_filtered')).mock
+        search_multi = self.useFixture(fixtures.MockPatchObject(
+            driver.user, '_ldap_search_multi',
+            side_effect=driver.user._ldap_search_multi)).mock
+
+        user_refs = self.identity_api.list_users_in_group(group['id'])
+        self.assertEqual(sorted(user_ids), sorted(x['id'] for x in user_refs))
+        self.assertFalse(get_filtered.called)
+        # The 3 members are read 2 at a time, with searches sent at once.
+        self.assertEqual(1, search_multi.call_count)
+        self.assertEqual(2, len(search_multi.call_args[0][0]))
+
+    def test_search_multi_sends_searches_before_reading_results(self):
+        user_api = self.identity_api.driver.user
+        user_ids = [self.user_foo['id'], self.user_two['id'],
+                    self.user_badguy['id']]
+        searches = [(user_api.tree_dn,
+                     user_api.LDAP_SCOPE,
+                     user_api._ldap_get_all_query(
+                         '(%s=%s)' % (user_api.id_attr, user_id)),
+                     user_api._ldap_attrs())
+                    for user_id in user_ids]
+
+        with user_api.get_connection() as conn:
+            calls = mock.Mock()
+            calls.attach_mock(self.useFixture(fixtures.MockPatchObject(
+                conn.conn, 'search_ext', wraps=conn.conn.search_ext)).mock,
+                'search_ext')
+            calls.attach_mock(self.useFixture(fixtures.MockPatchObject(
+                conn.conn, 'result3', wraps=conn.conn.result3)).mock,
+                'result3')
+            results = conn.search_multi(searches, depth=2)
+
+        self.assertEqual(user_ids,
+                         [user_api._dn_to_id(res[0][0]) for res in results])
+        # No more than 2 searches are in flight at once.
+        self.assertEqual(['search_ext', 'search_ext', 'result3',
+                          'search_ext', 'result3', 'result3'],
+                         [name for name, args, kwargs in calls.mock_calls])
+
+    def test_check_user_in_group_does_not_list_members(self):
+        domain_id = CONF.identity.default_domain_id
+        group = unit.new_group_ref(domain_id=domain_id)
+        group = self.identity_api.create_group(group)
+        member = unit.new_user_ref(domain_id=domain_id)
+        member = self.identity_api.create_user(member)
+        self.identity_api.add_user_to_group(member['id'], group['id'])
+        user = unit.new_user_ref(domain_id=domain_id)
+        user = self.identity_api.create_user(user)
+
+        driver = self.identity_api._select_identity_driver(domain_id)
+        list_group_users = self.useFixture(fixtures.MockPatchObject(
+            driver.group, 'list_group_users')).mock
+
+        self.identity_api.check_user_in_group(member['id'], group['id'])
+        self.assertRaises(exception.NotFound,
+                          self.identity_api.check_user_in_group,
+                          user['id'], group['id'])
+        self.assertFalse(list_group_users.called)
+
+    @unit.skip_if_cache_disabled('identity')
+    def test_warm_group_membership_cache(self):
+        self.config_fixture.config(group='identity',
+                                   warm_group_membership_cache=True)
+        domain_id = CONF.identity.default_domain_id
+        groups = []
+        for _ in range(2):
+            group = unit.new_group_ref(domain_id=domain_id)
+            groups.append(self.identity_api.create_group(group))
+        users = []
+        for _ in range(2):
+            user = unit.new_user_ref(domain_id=domain_id)
+            users.append(self.identity_api.create_user(user))
+        self.identity_api.add_user_to_group(users[0]['id'], groups[0]['id'])
+        self.identity_api.add_user_to_group(users[0]['id'], groups[1]['id'])
+        self.identity_api.add_user_to_group(users[1]['id'], groups[0]['id'])
+
+        # The memberships of every group are cached by the first call.
+        driver = self.identity_api._select_identity_driver(domain_id)
+        self.assertEqual(
+            sorted([groups[0]['id'], groups[1]['id']]),
+            sorted(self.identity_api.list_group_ids_for_user(
+                users[0]['id'])))
+        list_groups_for_user = self.useFixture(fixtures.MockPatchObject(
+            driver, 'list_groups_for_user')).mock
+        list_users_in_group = self.useFixture(fixtures.MockPatchObject(
+            driver, 'list_users_in_group')).mock
+        self.assertEqual(
+            [groups[0]['id']],
+            self.identity_api.list_group_ids_for_user(users[1]['id']))
+        self.assertEqual(
+            [users[0]['id']],
+            self.identity_api.list_user_ids_in_group(groups[1]['id']))
+        self.assertFalse(list_groups_for_user.called)
+        self.assertFalse(list_users_in_group.called)
+
+    @unit.skip_if_cache_disabled('identity')
+    def test_warm_group_membership_cache_during_membership_change(self):
+        self.config_fixture.config(group='identity',
+                                   warm_group_membership_cache=True)
+        domain_id = CONF.identity.default_domain_id
+        group = self.identity_api.create_group(
+            unit.new_group_ref(domain_id=domain_id))
+        user = self.identity_api.create_user(
+            unit.new_user_ref(domain_id=domain_id))
+        self.identity_api.add_user_to_group(user['id'], group['id'])
+
+        # The user is removed from the group once the memberships have been
+        # read to be cached.
+        list_user_ids_in_groups = self.identity_api._list_user_ids_in_groups
+
+        def read_then_remove(group_ids):
+            user_ids_in_group = list_user_ids_in_groups(group_ids)
+            self.identity_api.remove_user_from_group(user['id'], group['id'])
+            return user_ids_in_group
+
+        self.useFixture(fixtures.MockPatchObject(
+            self.identity_api, '_list_user_ids_in_groups',
+            side_effect=read_then_remove))
+        self.assertEqual(
+            [], self.identity_api.list_group_ids_for_user(user['id']))
+        self.assertEqual(
+            [], self.identity_api.list_user_ids_in_group(group['id']))
+
     def test_configurable_allowed_project_actions(self):
         domain = self._get_domain_fixture()
         project = unit.new_project_ref(domain_id=domain['id'])
@@ -2182,6 +2322,56 @@ class LDAPIdentityEnabledEmulation(LDAPIdentity):
         user_ref = user_api.get('123456789')
         self.assertIs(False, user_ref['enabled'])
 
+    def test_list_users_reads_enabled_group_once(self):
+        domain_id = CONF.identity.default_domain_id
+        enabled_user = self.identity_api.create_user(
+            self.new_user_ref(domain_id=domain_id))
+        disabled_user = self.identity_api.create_user(
+            self.new_user_ref(enabled=False, domain_id=domain_id))
+
+        driver = self.identity_api._select_identity_driver(domain_id)
+        get_enabled = self.useFixture(fixtures.MockPatchObject(
+            driver.user, '_get_enabled')).mock
+        get_members = self.useFixture(fixtures.MockPatchObject(
+            driver.user, '_get_enabled_members',
+            side_effect=driver.user._get_enabled_members)).mock
+
+        users = dict((ref['id'], ref) for ref in driver.list_users(
+            driver_hints.Hints()))
+        self.assertIs(True, users[enabled_user['id']]['enabled'])
+        self.assertIs(False, users[disabled_user['id']]['enabled'])
+        self.assertEqual(1, get_members.call_count)
+        self.assertFalse(get_enabled.called)
+
+    def test_enabled_members_cache_time(self):
+        self.config_fixture.config(group='ldap',
+                                   user_enabled_emulation_cache_time=600)
+        self.ldapdb.clear()
+        self.load_backends()
+        self.load_fixtures(default_fixtures)
+        domain_id = CONF.identity.default_domain_id
+        user = self.identity_api.create_user(
+            self.new_user_ref(domain_id=domain_id))
+        user_api = self.identity_api._select_identity_driver(domain_id).user
+        self.assertIs(True, user_api.get(user['id'])['enabled'])
+
+        # Changes made outside of keystone aren't seen until the members
+        # expire.
+        with user_api.get_connection() as conn:
+            conn.modify_s(user_api.enabled_emulation_dn,
+                          [(ldap.MOD_DELETE, user_api.member_attribute,
+                            [user_api._id_to_dn(user['id'])])])
+        self.assertIs(True, user_api.get(user['id'])['enabled'])
+        user_api._enabled_members = (user_api._enabled_members[0], 0)
+        self.assertIs(False, user_api.get(user['id'])['enabled'])
+
+        # Changes made by keystone are seen at once.
+        user['enabled'] = True
+        self.identity_api.update_user(user['id'], user)
+        self.assertIs(True, user_api.get(user['id'])['enabled'])
+        self.assertIs(True, user_api.get_all_by_ids([user['id']])[0][
+            'enabled'])
+
     def test_escape_member_dn(self):
         # The enabled member DN is properly escaped when querying for enabled
         # user.
@@ -2278,6 +2468,138 @@ class LDAPPosixGroupsTest(unit.TestCase):
         self.assertIn(new_group['id'], (x['id'] for x in group_refs))
 
 
+class LDAPIdentitySQLReplica(unit.TestCase):
+
+    def setUp(self):
+        super(LDAPIdentitySQLReplica, self).setUp()
+
+        self.useFixture(ldapdb.LDAPDatabase())
+        self.useFixture(database.Database())
+
+        self.load_backends()
+        self.load_fixtures(default_fixtures)
+
+        _assert_backends(self, identity='ldap')
+        self.driver = self.identity_api.driver
+        domain_id = CONF.identity.default_domain_id
+        user = unit.new_user_ref(domain_id=domain_id)
+        self.password = user['password']
+        self.user = self.identity_api.create_user(user)
+        self.group = self.identity_api.create_group(
+            unit.new_group_ref(domain_id=domain_id))
+        self.identity_api.add_user_to_group(self.user['id'],
+                                            self.group['id'])
+
+    def load_fixtures(self, fixtures):
+        # Override super impl since need to create group container.
+        create_group_container(self.identity_api)
+        super(LDAPIdentitySQLReplica, self).load_fixtures(fixtures)
+
+    def config_overrides(self):
+        super(LDAPIdentitySQLReplica, self).config_overrides()
+        self.config_fixture.config(group='identity', driver='ldap')
+        self.config_fixture.config(group='ldap', use_sql_replica=True)
+
+    def config_files(self):
+        config_files = super(LDAPIdentitySQLReplica, self).config_files()
+        config_files.append(unit.dirs.tests_conf('backend_ldap.conf'))
+        return config_files
+
+    def _disconnect(self):
+        for api in (self.driver.user, self.driver.group):
+            self.useFixture(fixtures.MockPatchObject(
+                api, 'get_connection',
+                side_effect=AssertionError('LDAP was searched')))
+
+    def test_reads_served_from_replica_once_synced(self):
+        counts = self.identity_api.sync_identity_replicas()
+        self.assertEqual([CONF.identity.default_domain_id], list(counts))
+        self.assertEqual(0, counts[CONF.identity.default_domain_id][
+            'deleted'])
+
+        self._disconnect()
+        user_id = self.user['id']
+        group_id = self.group['id']
+        self.assertEqual(self.user['name'],
+                         self.driver.get_user(user_id)['name'])
+        self.assertNotIn('dn', self.driver.get_user(user_id))
+        self.assertIn(user_id, [x['id'] for x in self.driver.list_users(
+            driver_hints.Hints())])
+        self.assertEqual([group_id], [x['id'] for x in
+                                      self.driver.list_groups_for_user(
+                                          user_id, driver_hints.Hints())])
+        self.assertEqual([user_id], [x['id'] for x in
+                                     self.driver.list_users_in_group(
+                                         group_id, driver_hints.Hints())])
+        self.driver.check_user_in_group(user_id, group_id)
+
+    def test_reads_use_ldap_until_synced(self):
+        search = self.useFixture(fixtures.MockPatchObject(
+            self.driver.user, '_ldap_get',
+            side_effect=self.driver.user._ldap_get)).mock
+        self.driver.get_user(self.user['id'])
+        self.assertTrue(search.called)
+
+    def test_authenticate_binds_to_ldap(self):
+        self.identity_api.sync_identity_replicas()
+        get_connection = self.useFixture(fixtures.MockPatchObject(
+            self.driver.user, 'get_connection',
+            side_effect=self.driver.user.get_connection)).mock
+        self.driver.authenticate(self.user['id'], self.password)
+        get_connection.assert_called_once_with(
+            self.driver.user._id_to_dn(self.user['id']),
+            self.password, end_user_auth=True)
+
+        self.assertRaises(AssertionError, self.driver.authenticate,
+                          self.user['id'], uuid.uuid4().hex)
+
+    def test_authenticate_reads_user_from_ldap(self):
+        self.identity_api.sync_identity_replicas()
+        # Disable the user in the directory without going through keystone.
+        self.driver.user.update(self.user['id'], {'enabled': False})
+        user_ref = self.driver.authenticate(self.user['id'], self.password)
+        self.assertFalse(user_ref['enabled'])
+
+    def test_concurrent_read_through_adds_user_once(self):
+        self.identity_api.sync_identity_replicas()
+        user = self.driver.user.create(
+            {'id': uuid.uuid4().hex, 'name': uuid.uuid4().hex,
+             'enabled': True})
+        # Another request adds the user to the replica first.
+        self.useFixture(fixtures.MockPatchObject(
+            self.driver.replica, 'put_user',
+            side_effect=sql.DBDuplicateEntry))
+        self.assertEqual(user['name'],
+                         self.driver.get_user(user['id'])['name'])
+        self.assertEqual(user['id'], self.driver.get_user_by_name(
+            user['name'], CONF.identity.default_domain_id)['id'])
+
+    def test_sync_removes_deleted_entries(self):
+        self.identity_api.sync_identity_replicas()
+        # Delete the user from the directory without going through keystone.
+        self.driver.user.delete(self.user['id'])
+        self.identity_api.sync_identity_replicas()
+
+        self.assertNotIn(self.user['id'], [
+            x['id'] for x in self.driver.list_users(driver_hints.Hints())])
+        self.assertEqual([], self.driver.list_users_in_group(
+            self.group['id'], driver_hints.Hints()))
+        self.assertRaises(exception.UserNotFound,
+                          self.driver.get_user, self.user['id'])
+
+    def test_user_created_after_sync_is_read_through(self):
+        self.identity_api.sync_identity_replicas()
+        user = self.driver.user.create(
+            {'id': uuid.uuid4().hex, 'name': uuid.uuid4().hex,
+             'enabled': True})
+        self.assertEqual(user['name'],
+                         self.driver.get_user(user['id'])['name'])
+
+        self._disconnect()
+        self.assertEqual(user['name'],
+                         self.driver.get_user(user['id'])['name'])
+
+
 class LdapIdentityWithMapping(
         BaseLDAPIdentity, unit.SQLDriverOverrides, unit.TestCase):
     """Class to test mapping of default LDAP backend.
@@ -2679,6 +3001,16 @@ class MultiLDAPandSQLIdentity(BaseLDAPIdentity, unit.SQLDriverOverrides,
         self.identity_api.get_user(self.users['userB']['id'])
         self.identity_api.get_user(self.users['userC']['id'])
 
+    def test_list_users_from_ids_reads_mappings_at_once(self):
+        user_ids = [self.users['user%s' % x]['id']
+                    for x in range(self.domain_count)]
+        with mock.patch.object(self.id_mapping_api, 'get_id_mapping',
+                               side_effect=AssertionError) as get_id_mapping:
+            users = self.identity_api.list_users_from_ids(
+                user_ids + [uuid.uuid4().hex])
+        self.assertFalse(get_id_mapping.called)
+        self.assertItemsEqual(user_ids, [user['id'] for user in users])
+
     def test_scanning_of_config_dir(self):
         """Test the Manager class scans the config directory.
 
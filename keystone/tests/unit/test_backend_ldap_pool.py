@@ -139,6 +139,44 @@ class LdapPoolCommonTestMixin(object):
                                           ldappool.MaxConnectionReachedError)
         ldappool_cm.size = CONF.ldap.pool_size
 
+    def test_search_multi_releases_connections(self):
+        # get related connection manager instance
+        ldappool_cm = self.conn_pools[CONF.ldap.url]
+        self.addCleanup(setattr, ldappool_cm, 'size', ldappool_cm.size)
+        ldappool_cm.size = 2
+
+        user_api = self.identity_api.driver.user
+        search = (user_api.tree_dn,
+                  user_api.LDAP_SCOPE,
+                  user_api._ldap_get_all_query(),
+                  user_api._ldap_attrs())
+        # Each search in flight holds a connection of the pool, so the 6
+        # searches only get one if the connections are released as their
+        # results are read.
+        with user_api.get_connection() as conn:
+            results = conn.search_multi([search] * 6, depth=2)
+        self.assertTrue(results[0])
+        self.assertEqual([results[0]] * 6, results)
+
+    def test_search_multi_waits_for_busy_pool(self):
+        # get related connection manager instance
+        ldappool_cm = self.conn_pools[CONF.ldap.url]
+        self.addCleanup(setattr, ldappool_cm, 'size', ldappool_cm.size)
+        ldappool_cm.size = 2
+
+        user_api = self.identity_api.driver.user
+        search = (user_api.tree_dn,
+                  user_api.LDAP_SCOPE,
+                  user_api._ldap_get_all_query(),
+                  user_api._ldap_attrs())
+        # With one of the 2 connections of the pool in use, the pool runs out
+        # of connections and the searches are then sent one at a time.
+        with user_api.get_connection() as conn:
+            with ldappool_cm.connection(CONF.ldap.user, CONF.ldap.password):
+                results = conn.search_multi([search] * 3, depth=4)
+        self.assertTrue(results[0])
+        self.assertEqual([results[0]] * 3, results)
+
     def test_pool_size_expands_correctly(self):
 
         who = CONF.ldap.user
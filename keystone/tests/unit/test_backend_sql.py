@@ -13,12 +13,14 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import datetime
 import functools
 import uuid
 
 import mock
 from oslo_db import exception as db_exception
 from oslo_db import options
+from oslo_utils import timeutils
 from six.moves import range
 import sqlalchemy
 from sqlalchemy import exc
@@ -194,6 +196,35 @@ class SqlModels(SqlTests):
                 ('inherited', sql.Boolean, False))
         self.assertExpectedSchema('assignment', cols)
 
+    def test_effective_assignment_target_model(self):
+        cols = (('user_id', sql.String, 64),
+                ('target_id', sql.String, 64),
+                ('is_domain', sql.Boolean, None),
+                ('build_token', sql.String, 64),
+                ('created_at', sql.DateTime, None))
+        self.assertExpectedSchema('effective_assignment_target', cols)
+
+    def test_effective_assignment_model(self):
+        cols = (('user_id', sql.String, 64),
+                ('target_id', sql.String, 64),
+                ('is_domain', sql.Boolean, None),
+                ('role_id', sql.String, 64))
+        self.assertExpectedSchema('effective_assignment', cols)
+
+    def test_ldap_replica_user_model(self):
+        cols = (('source_id', sql.String, 64),
+                ('id', sql.String, 64),
+                ('name', sql.String, 255),
+                ('enabled', sql.Boolean, None),
+                ('ref', sql.JsonBlob, None))
+        self.assertExpectedSchema('ldap_replica_user', cols)
+
+    def test_ldap_replica_membership_model(self):
+        cols = (('source_id', sql.String, 64),
+                ('user_id', sql.String, 64),
+                ('group_id', sql.String, 64))
+        self.assertExpectedSchema('ldap_replica_membership', cols)
+
     def test_user_group_membership(self):
         cols = (('group_id', sql.String, 64),
                 ('user_id', sql.String, 64))
@@ -228,6 +259,64 @@ class SqlIdentity(SqlTests,
             self.assertNotEqual(self.user_foo['password'],
                                 user_ref['password'])
 
+    def test_reading_users_does_not_load_password_history(self):
+        user = unit.new_user_ref(domain_id=CONF.identity.default_domain_id)
+        user = self.identity_api.create_user(user)
+        password = uuid.uuid4().hex
+        self.identity_api.update_user(user['id'], {'password': password})
+
+        statements = []
+
+        def _record_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with sql.session_for_read() as session:
+            engine = session.get_bind()
+        sqlalchemy.event.listen(engine, 'before_cursor_execute',
+                                _record_statement)
+        self.addCleanup(sqlalchemy.event.remove, engine,
+                        'before_cursor_execute', _record_statement)
+
+        driver = self.identity_api.driver
+        user_ref = driver.get_user(user['id'])
+        self.assertEqual(user['name'], user_ref['name'])
+        self.assertNotIn('password', user_ref)
+        self.assertIn(user['id'], [ref['id'] for ref in
+                                   driver.list_users(driver_hints.Hints())])
+        driver.list_users_from_ids([user['id']])
+        driver.get_user_by_name(user['name'], user['domain_id'])
+        self.assertNotEqual([], statements)
+        self.assertEqual(
+            [], [s for s in statements if 'password' in s.lower()])
+
+        # The password history is still loaded to check the password
+        driver.authenticate(user['id'], password)
+        self.assertNotEqual(
+            [], [s for s in statements if 'password' in s.lower()])
+
+    def test_authenticate_after_changing_password(self):
+        user = unit.new_user_ref(domain_id=CONF.identity.default_domain_id)
+        old_password = user['password']
+        user = self.identity_api.create_user(user)
+        new_password = uuid.uuid4().hex
+        self.identity_api.update_user(user['id'], {'password': new_password})
+
+        driver = self.identity_api.driver
+        user_ref = driver.authenticate(user['id'], new_password)
+        self.assertEqual(user['id'], user_ref['id'])
+        self.assertRaises(AssertionError, driver.authenticate, user['id'],
+                          old_password)
+
+        # The history read through _get_user is usable once the session is
+        # closed: only the current password is left unexpired.
+        with sql.session_for_read() as session:
+            user_ref = self.identity_api._get_user(session, user['id'])
+        passwords = user_ref.local_user.passwords
+        self.assertEqual(2, len(passwords))
+        self.assertIsNotNone(passwords[0].expires_at)
+        self.assertIsNone(passwords[1].expires_at)
+        self.assertIs(passwords[1], user_ref.password_ref)
+
     def test_create_user_with_null_password(self):
         user_dict = unit.new_user_ref(
             domain_id=CONF.identity.default_domain_id)
@@ -588,6 +677,84 @@ class SqlIdentity(SqlTests,
         _exercise_project_api(resource.NULL_DOMAIN_ID)
 
 
+class SqlResourceWithHierarchyIndex(SqlTests, resource_tests.ResourceTests):
+
+    def config_overrides(self):
+        super(SqlResourceWithHierarchyIndex, self).config_overrides()
+        self.config_fixture.config(group='resource',
+                                   hierarchy_index_cache_time=600)
+
+
+class SqlProjectHierarchy(SqlTests):
+
+    def setUp(self):
+        super(SqlProjectHierarchy, self).setUp()
+        self.driver = self.resource_api.driver
+        # root -> (child1 -> grandchild, child2)
+        self.projects = {}
+        for name, parent in [('root', None), ('child1', 'root'),
+                             ('child2', 'root'),
+                             ('grandchild', 'child1')]:
+            project = unit.new_project_ref(
+                domain_id=CONF.identity.default_domain_id,
+                parent_id=self.projects.get(parent, {}).get('id'))
+            self.resource_api.create_project(project['id'], project)
+            self.projects[name] = project
+
+    def _ids(self, refs):
+        return [ref['id'] for ref in refs]
+
+    def _assert_hierarchy(self):
+        p = self.projects
+        subtree = self._ids(self.driver.list_projects_in_subtree(
+            p['root']['id']))
+        self.assertItemsEqual([p['child1']['id'], p['child2']['id']],
+                              subtree[:2])
+        self.assertEqual([p['grandchild']['id']], subtree[2:])
+        self.assertEqual([], self.driver.list_projects_in_subtree(
+            p['grandchild']['id']))
+
+        self.assertEqual(
+            [p['child1']['id'], p['root']['id'],
+             CONF.identity.default_domain_id],
+            self._ids(self.driver.list_project_parents(
+                p['grandchild']['id'])))
+        self.assertRaises(exception.ProjectNotFound,
+                          self.driver.list_project_parents,
+                          uuid.uuid4().hex)
+
+        self.assertTrue(self.driver.is_leaf_project(p['child2']['id']))
+        self.assertFalse(self.driver.is_leaf_project(p['root']['id']))
+
+    def _assert_circular_reference_is_detected(self):
+        root = self.projects['root']
+        root['parent_id'] = self.projects['grandchild']['id']
+        self.driver.update_project(root['id'], root)
+
+        self.assertIsNone(self.driver.list_projects_in_subtree(root['id']))
+        self.assertIsNone(self.driver.list_project_parents(
+            self.projects['child2']['id']))
+
+    def test_hierarchy_with_recursive_query(self):
+        with sql.session_for_read() as session:
+            self.assertTrue(self.driver._supports_recursive_cte(session))
+        self._assert_hierarchy()
+
+    def test_circular_reference_with_recursive_query(self):
+        self._assert_circular_reference_is_detected()
+
+    @mock.patch('keystone.resource.backends.sql.Resource.'
+                '_supports_recursive_cte', return_value=False)
+    def test_hierarchy_without_recursive_query(self, mock_supported):
+        self._assert_hierarchy()
+
+    @mock.patch('keystone.resource.backends.sql.Resource.'
+                '_supports_recursive_cte', return_value=False)
+    def test_circular_reference_without_recursive_query(self,
+                                                        mock_supported):
+        self._assert_circular_reference_is_detected()
+
+
 class SqlTrust(SqlTests, trust_tests.TrustTests):
     pass
 
@@ -694,6 +861,159 @@ class SqlToken(SqlTests, token_tests.TokenTests):
         self.assertEqual({'batch_size': 1000}, mysql_strategy.keywords)
 
 
+class SqlEffectiveAssignments(SqlTests):
+
+    def config_overrides(self):
+        super(SqlEffectiveAssignments, self).config_overrides()
+        self.config_fixture.config(group='assignment',
+                                   materialize_effective_assignments=True)
+
+    def setUp(self):
+        super(SqlEffectiveAssignments, self).setUp()
+        domain_id = CONF.identity.default_domain_id
+        self.user = self.identity_api.create_user(
+            unit.new_user_ref(domain_id))
+        self.project = unit.new_project_ref(domain_id)
+        self.resource_api.create_project(self.project['id'], self.project)
+        self.roles = []
+        for _ in range(3):
+            role = unit.new_role_ref()
+            self.role_api.create_role(role['id'], role)
+            self.roles.append(role['id'])
+
+    def _get_roles(self):
+        return sorted(self.assignment_api.get_roles_for_user_and_project(
+            self.user['id'], self.project['id']))
+
+    def _get_stored_roles(self):
+        return self.assignment_api.driver.get_effective_role_ids(
+            self.user['id'], self.project['id'], False)
+
+    def test_roles_are_stored_when_computed(self):
+        self.assignment_api.create_grant(self.roles[0],
+                                         user_id=self.user['id'],
+                                         project_id=self.project['id'])
+        self.assertIsNone(self._get_stored_roles())
+        self.assertEqual([self.roles[0]], self._get_roles())
+        self.assertEqual([self.roles[0]], self._get_stored_roles())
+
+    def test_no_roles_are_stored(self):
+        self.assertEqual([], self._get_roles())
+        self.assertEqual([], self._get_stored_roles())
+
+    def test_grants_invalidate_stored_roles(self):
+        self._get_roles()
+        self.assignment_api.create_grant(self.roles[0],
+                                         user_id=self.user['id'],
+                                         project_id=self.project['id'])
+        self.assertIsNone(self._get_stored_roles())
+        self.assertEqual([self.roles[0]], self._get_roles())
+
+        self.assignment_api.delete_grant(self.roles[0],
+                                         user_id=self.user['id'],
+                                         project_id=self.project['id'])
+        self.assertEqual([], self._get_roles())
+
+    def test_group_membership_invalidates_stored_roles(self):
+        group = self.identity_api.create_group(
+            unit.new_group_ref(CONF.identity.default_domain_id))
+        self.assignment_api.create_grant(self.roles[0],
+                                         group_id=group['id'],
+                                         project_id=self.project['id'])
+        self.assertEqual([], self._get_roles())
+
+        self.identity_api.add_user_to_group(self.user['id'], group['id'])
+        self.assertEqual([self.roles[0]], self._get_roles())
+
+        self.assignment_api.create_grant(self.roles[1],
+                                         group_id=group['id'],
+                                         project_id=self.project['id'])
+        self.assertEqual(sorted(self.roles[:2]), self._get_roles())
+
+        self.identity_api.remove_user_from_group(self.user['id'], group['id'])
+        self.assertEqual([], self._get_roles())
+
+    def test_implied_roles_invalidate_stored_roles(self):
+        self.assignment_api.create_grant(self.roles[0],
+                                         user_id=self.user['id'],
+                                         project_id=self.project['id'])
+        self.assertEqual([self.roles[0]], self._get_roles())
+
+        self.role_api.create_implied_role(self.roles[0], self.roles[1])
+        self.assertEqual(sorted(self.roles[:2]), self._get_roles())
+
+        self.role_api.delete_implied_role(self.roles[0], self.roles[1])
+        self.assertEqual([self.roles[0]], self._get_roles())
+
+    def test_inherited_roles_on_new_project(self):
+        self.assignment_api.create_grant(
+            self.roles[0], user_id=self.user['id'],
+            project_id=self.project['id'], inherited_to_projects=True)
+        child = unit.new_project_ref(CONF.identity.default_domain_id,
+                                     parent_id=self.project['id'])
+        self.resource_api.create_project(child['id'], child)
+        self.assertEqual(
+            [self.roles[0]],
+            self.assignment_api.get_roles_for_user_and_project(
+                self.user['id'], child['id']))
+
+    def test_verify_and_rebuild(self):
+        self.assignment_api.create_grant(self.roles[0],
+                                         user_id=self.user['id'],
+                                         project_id=self.project['id'])
+        self._get_roles()
+        self.assertEqual([], self.assignment_api.verify_effective_role_ids())
+
+        key = (self.user['id'], self.project['id'], False)
+        self.assignment_api.driver.replace_effective_role_ids(
+            {key: [self.roles[2]]})
+        self.assertEqual(
+            [key + ([self.roles[2]], [self.roles[0]])],
+            self.assignment_api.verify_effective_role_ids())
+
+        self.assertEqual(1, self.assignment_api.rebuild_effective_role_ids())
+        self.assertEqual([self.roles[0]], self._get_stored_roles())
+        self.assertEqual([], self.assignment_api.verify_effective_role_ids())
+
+    def test_store_after_invalidation_is_discarded(self):
+        driver = self.assignment_api.driver
+        token = driver.begin_effective_role_ids(
+            self.user['id'], self.project['id'], False)
+        self.assertIsNone(driver.begin_effective_role_ids(
+            self.user['id'], self.project['id'], False))
+        driver.invalidate_effective_role_ids(user_ids=[self.user['id']])
+        self.assertFalse(driver.store_effective_role_ids(
+            self.user['id'], self.project['id'], False, token,
+            [self.roles[0]]))
+        self.assertIsNone(self._get_stored_roles())
+
+    def test_failed_build_is_taken_over_after_timeout(self):
+        driver = self.assignment_api.driver
+        self.assertIsNotNone(driver.begin_effective_role_ids(
+            self.user['id'], self.project['id'], False))
+        self.assignment_api.create_grant(self.roles[0],
+                                         user_id=self.user['id'],
+                                         project_id=self.project['id'])
+        # The build never completes, so the roles are computed but not
+        # stored until the build has timed out.
+        self.assertEqual([self.roles[0]], self._get_roles())
+        self.assertIsNone(self._get_stored_roles())
+
+        timeout = CONF.assignment.effective_assignment_build_timeout
+        later = timeutils.utcnow() + datetime.timedelta(seconds=timeout + 1)
+        with mock.patch.object(timeutils, 'utcnow', return_value=later):
+            self.assertEqual([self.roles[0]], self._get_roles())
+        self.assertEqual([self.roles[0]], self._get_stored_roles())
+
+    def test_invalidate_many_users(self):
+        self._get_roles()
+        user_ids = [uuid.uuid4().hex for _ in range(1200)]
+        user_ids.append(self.user['id'])
+        self.assignment_api.driver.invalidate_effective_role_ids(
+            user_ids=user_ids)
+        self.assertIsNone(self._get_stored_roles())
+
+
 class SqlCatalog(SqlTests, catalog_tests.CatalogTests):
 
     _legacy_endpoint_id_in_endpoint = True
@@ -785,6 +1105,49 @@ class SqlCatalog(SqlTests, catalog_tests.CatalogTests):
                           self.catalog_api.delete_region,
                           region['id'])
 
+    def test_v3_catalog_formats_skeleton_per_project(self):
+        service = unit.new_service_ref()
+        self.catalog_api.create_service(service['id'], service)
+        endpoint = unit.new_endpoint_ref(
+            service_id=service['id'], region_id=None,
+            url='http://localhost/$(project_id)s/$(user_id)s')
+        self.catalog_api.create_endpoint(endpoint['id'], endpoint)
+
+        user_id = uuid.uuid4().hex
+        for project_id in (uuid.uuid4().hex, uuid.uuid4().hex):
+            catalog = self.catalog_api.get_v3_catalog(user_id, project_id)
+            self.assertEqual(
+                'http://localhost/%s/%s' % (project_id, user_id),
+                catalog[0]['endpoints'][0]['url'])
+
+        # The URL of a domain scoped catalog can't be formatted.
+        catalog = self.catalog_api.get_v3_catalog(user_id, None)
+        self.assertEqual([], catalog[0]['endpoints'])
+
+    @unit.skip_if_cache_disabled('catalog')
+    def test_v3_catalog_skeleton_is_shared_between_projects(self):
+        service = unit.new_service_ref()
+        self.catalog_api.create_service(service['id'], service)
+
+        with mock.patch.object(self.catalog_api.driver,
+                               'get_v3_catalog_skeleton',
+                               wraps=self.catalog_api.driver.
+                               get_v3_catalog_skeleton) as skeleton:
+            for _ in range(3):
+                self.catalog_api.get_v3_catalog(uuid.uuid4().hex,
+                                                uuid.uuid4().hex)
+            self.assertEqual(1, skeleton.call_count)
+
+            # Changing an endpoint builds the skeleton again.
+            endpoint = unit.new_endpoint_ref(service_id=service['id'],
+                                             region_id=None)
+            self.catalog_api.create_endpoint(endpoint['id'], endpoint)
+            catalog = self.catalog_api.get_v3_catalog(uuid.uuid4().hex,
+                                                      uuid.uuid4().hex)
+            self.assertEqual(2, skeleton.call_count)
+        self.assertEqual([endpoint['id']],
+                         [e['id'] for e in catalog[0]['endpoints']])
+
 
 class SqlPolicy(SqlTests, policy_tests.PolicyTests):
     pass
@@ -884,6 +1247,46 @@ class SqlFilterTests(SqlTests, identity_tests.FilterTests):
             # Check the driver has removed the filter from the list hints
             self.assertFalse(hints.get_exact_filter_by_name('domain_id'))
 
+    def test_list_users_inexact_filtered_in_sql(self):
+        user_name_data = {
+            0: 'The Ministry of Silly Walks',
+            1: 'the ministry of silly walks',
+            2: 'Silly_Walks 100%',
+            3: 'SillyXWalks 1000',
+        }
+        user_list = self._create_test_data(
+            'user', 4, domain_id=CONF.identity.default_domain_id,
+            name_dict=user_name_data)
+        self.addCleanup(self._delete_test_data, 'user', user_list)
+
+        def list_user_ids(value, comparator, case_sensitive):
+            hints = driver_hints.Hints()
+            hints.add_filter('name', value, comparator=comparator,
+                             case_sensitive=case_sensitive)
+            users = self.identity_api.list_users(hints=hints)
+            # The driver has satisfied the filter
+            self.assertEqual([], hints.filters)
+            return set(user['id'] for user in users)
+
+        def user_ids(*indexes):
+            return set(user_list[i]['id'] for i in indexes)
+
+        self.assertEqual(user_ids(0, 1),
+                         list_user_ids('ministry', 'contains', False))
+        self.assertEqual(user_ids(1),
+                         list_user_ids('ministry', 'contains', True))
+        self.assertEqual(user_ids(0),
+                         list_user_ids('The', 'startswith', True))
+        self.assertEqual(user_ids(0, 1),
+                         list_user_ids('WALKS', 'endswith', False))
+        # Wildcards in the value are matched literally
+        self.assertEqual(user_ids(2),
+                         list_user_ids('silly_walks', 'startswith', False))
+        self.assertEqual(user_ids(2),
+                         list_user_ids('Silly_Walks', 'startswith', True))
+        self.assertEqual(user_ids(2), list_user_ids('0%', 'endswith', True))
+        self.assertEqual(set(), list_user_ids('Silly*', 'startswith', True))
+
     def test_filter_sql_injection_attack(self):
         """Test against sql injection attack on filters.
 
@@ -920,6 +1323,34 @@ class SqlLimitTests(SqlTests, identity_tests.LimitTests):
         super(SqlLimitTests, self).setUp()
         identity_tests.LimitTests.setUp(self)
 
+    def _test_list_entity_paginated(self, entity):
+        all_ids = sorted(ref['id'] for ref in self._list_entities(entity)())
+        self.config_fixture.config(list_limit=7)
+        listed_ids = []
+        marker = None
+        while True:
+            hints = driver_hints.Hints()
+            if marker is not None:
+                hints.set_marker(marker)
+            entities = self._list_entities(entity)(hints=hints)
+            # The driver has ordered the page and started it after the marker
+            self.assertTrue(hints.paginated)
+            listed_ids.extend(ref['id'] for ref in entities)
+            if not hints.limit['truncated']:
+                break
+            self.assertEqual(7, len(entities))
+            marker = entities[-1]['id']
+        self.assertEqual(all_ids, listed_ids)
+
+    def test_list_users_paginated(self):
+        self._test_list_entity_paginated('user')
+
+    def test_list_groups_paginated(self):
+        self._test_list_entity_paginated('group')
+
+    def test_list_projects_paginated(self):
+        self._test_list_entity_paginated('project')
+
 
 class FakeTable(sql.ModelBase):
     __tablename__ = 'test_table'
@@ -58,3 +58,49 @@ class ListHintsTests(test.TestCase):
         hints.set_limit(10, truncated=True)
         self.assertEqual(10, hints.limit['limit'])
         self.assertTrue(hints.limit['truncated'])
+
+    def test_marker(self):
+        hints = driver_hints.Hints()
+        self.assertIsNone(hints.marker)
+        self.assertFalse(hints.paginated)
+        self.assertFalse(hints.paged)
+        hints.set_marker('id1')
+        self.assertEqual('id1', hints.marker)
+        self.assertTrue(hints.paged)
+
+    def test_page_limit(self):
+        hints = driver_hints.Hints()
+        hints.set_limit(10)
+        self.assertFalse(hints.paged)
+        hints.set_page_limit(5)
+        self.assertEqual(5, hints.limit['limit'])
+        self.assertTrue(hints.paged)
+
+    def test_truncated_leaves_unpaginated_marker_list_whole(self):
+
+        class Driver(object):
+            @driver_hints.truncated
+            def list_entities(self, hints, paginated=False):
+                hints.paginated = paginated
+                return list(range(5))
+
+        hints = driver_hints.Hints()
+        hints.set_marker('id1')
+        hints.set_limit(2)
+        self.assertEqual(list(range(5)), Driver().list_entities(hints))
+        self.assertFalse(hints.limit['truncated'])
+        self.assertEqual([0, 1], Driver().list_entities(hints,
+                                                        paginated=True))
+        self.assertTrue(hints.limit['truncated'])
+
+    def test_truncated_leaves_unpaginated_page_whole(self):
+
+        class Driver(object):
+            @driver_hints.truncated
+            def list_entities(self, hints):
+                return list(range(5))
+
+        hints = driver_hints.Hints()
+        hints.set_page_limit(2)
+        self.assertEqual(list(range(5)), Driver().list_entities(hints))
+        self.assertFalse(hints.limit['truncated'])
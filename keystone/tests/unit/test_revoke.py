@@ -15,7 +15,9 @@ import datetime
 import uuid
 
 import mock
+from oslo_serialization import msgpackutils
 from oslo_utils import timeutils
+from six.moves import cPickle as pickle
 from six.moves import range
 
 from keystone.common import utils
@@ -161,6 +163,93 @@ class RevokeTests(object):
                           self.revoke_api.check_token,
                           token_values)
 
+    def test_check_token_sees_events_revoked_after_sync(self):
+        token_values = _sample_blank_token()
+        token_values['user_id'] = _new_id()
+        token_values['expires_at'] = _future_time()
+        self.revoke_api.check_token(token_values)
+
+        self.revoke_api.revoke_by_user(user_id=token_values['user_id'])
+        self.assertRaises(exception.TokenNotFound,
+                          self.revoke_api.check_token,
+                          token_values)
+
+    @mock.patch.object(timeutils, 'utcnow')
+    def test_sync_only_fetches_new_events_after_interval(self, mock_utcnow):
+        self.config_fixture.config(group='revoke', sync_interval=10)
+        now = datetime.datetime.utcnow()
+        mock_utcnow.return_value = now
+        token_values = _sample_blank_token()
+        token_values['user_id'] = _new_id()
+        token_values['expires_at'] = _future_time()
+        self.revoke_api.check_token(token_values)
+
+        # An event recorded by another process is not seen until the next
+        # sync is due.
+        self.revoke_api.driver.revoke(
+            revoke_model.RevokeEvent(user_id=token_values['user_id']))
+        self.revoke_api.check_token(token_values)
+        self.assertEqual(1, self.revoke_api.get_sync_stats()['syncs'])
+
+        mock_utcnow.return_value = now + datetime.timedelta(seconds=11)
+        self.assertRaises(exception.TokenNotFound,
+                          self.revoke_api.check_token,
+                          token_values)
+        stats = self.revoke_api.get_sync_stats()
+        self.assertEqual(2, stats['syncs'])
+        self.assertEqual(1, stats['events_fetched'])
+        self.assertEqual(1, stats['events'])
+        self.assertEqual(0, stats['sync_lag'])
+
+    @mock.patch.object(timeutils, 'utcnow')
+    def test_sync_prunes_expired_events(self, mock_utcnow):
+        now = datetime.datetime.utcnow()
+        mock_utcnow.return_value = now
+        self.revoke_api.revoke_by_user(user_id=_new_id())
+        self.revoke_api.check_token(_sample_blank_token())
+        self.assertEqual(1, self.revoke_api.get_sync_stats()['events'])
+
+        mock_utcnow.return_value = now + datetime.timedelta(hours=2)
+        self.revoke_api.check_token(_sample_blank_token())
+        stats = self.revoke_api.get_sync_stats()
+        self.assertEqual(0, stats['events'])
+        self.assertEqual(1, stats['events_pruned'])
+
+    @mock.patch.object(timeutils, 'utcnow')
+    def test_sync_sees_events_recorded_late(self, mock_utcnow):
+        self.config_fixture.config(group='revoke', sync_overlap=60)
+        now = datetime.datetime.utcnow()
+        mock_utcnow.return_value = now
+        self.revoke_api.revoke_by_user(user_id=_new_id())
+        self.revoke_api.check_token(_sample_blank_token())
+
+        # An event stamped by a process with a slower clock, or committed
+        # after the previous sync, is older than the newest event seen.
+        token_values = _sample_blank_token()
+        token_values['user_id'] = _new_id()
+        token_values['expires_at'] = _future_time()
+        self.revoke_api.driver.revoke(
+            revoke_model.RevokeEvent(
+                user_id=token_values['user_id'],
+                revoked_at=now - datetime.timedelta(seconds=30)))
+
+        mock_utcnow.return_value = now + datetime.timedelta(seconds=2)
+        self.assertRaises(exception.TokenNotFound,
+                          self.revoke_api.check_token,
+                          token_values)
+        stats = self.revoke_api.get_sync_stats()
+        self.assertEqual(2, stats['events'])
+        self.assertEqual(2, stats['events_fetched'])
+
+    def test_sync_updates_index_in_place(self):
+        self.revoke_api.revoke_by_user(user_id=_new_id())
+        index = self.revoke_api._event_store.sync()
+        self.assertEqual(1, len(index))
+
+        self.revoke_api.revoke_by_user(user_id=_new_id())
+        self.assertIs(index, self.revoke_api._event_store.sync())
+        self.assertEqual(2, len(index))
+
 
 class SqlRevokeTests(test_backend_sql.SqlTests, RevokeTests):
     def config_overrides(self):
@@ -230,12 +319,18 @@ class RevokeListTests(unit.TestCase):
 
     def _assertTokenRevoked(self, token_data):
         self.assertTrue(any([_matches(e, token_data) for e in self.events]))
+        self.assertTrue(
+            revoke_model.RevokeIndex(self.revoke_events).is_revoked(
+                token_data))
         return self.assertTrue(
             revoke_model.is_revoked(self.revoke_events, token_data),
             'Token should be revoked')
 
     def _assertTokenNotRevoked(self, token_data):
         self.assertFalse(any([_matches(e, token_data) for e in self.events]))
+        self.assertFalse(
+            revoke_model.RevokeIndex(self.revoke_events).is_revoked(
+                token_data))
         return self.assertFalse(
             revoke_model.is_revoked(self.revoke_events, token_data),
             'Token should not be revoked')
@@ -491,6 +586,68 @@ class RevokeListTests(unit.TestCase):
 
         self._assertTokenRevoked(token_data)
 
+    def test_index_matches_brute_force(self):
+        user_ids = [_new_id() for i in range(3)]
+        project_ids = [_new_id() for i in range(3)]
+        domain_ids = [_new_id() for i in range(3)]
+        role_ids = [_new_id() for i in range(3)]
+        for user_id in user_ids[:2]:
+            self._revoke_by_user(user_id)
+        self._revoke_by_grant(role_ids[0], user_id=user_ids[2],
+                              project_id=project_ids[0])
+        self._revoke_by_project_role_assignment(project_ids[1], role_ids[1])
+        self._revoke_by_domain_role_assignment(domain_ids[0], role_ids[2])
+        self._revoke_by_domain(domain_ids[1])
+        self._revoke_by_expiration(user_ids[2], _future_time(),
+                                   domain_id=domain_ids[2])
+        index = revoke_model.RevokeIndex(self.revoke_events)
+
+        for user_id in user_ids:
+            for project_id in project_ids + [None]:
+                for domain_id in domain_ids:
+                    for roles in ([], role_ids[:1], role_ids[1:]):
+                        token_data = _sample_blank_token()
+                        token_data['user_id'] = user_id
+                        token_data['project_id'] = project_id
+                        token_data['assignment_domain_id'] = domain_id
+                        token_data['roles'] = roles
+                        self.assertEqual(
+                            revoke_model.is_revoked(self.revoke_events,
+                                                    token_data),
+                            index.is_revoked(token_data))
+
+    def test_index_add_and_remove_event(self):
+        index = revoke_model.RevokeIndex()
+        event = revoke_model.RevokeEvent(user_id=_new_id())
+        self.assertTrue(index.add_event(event))
+        self.assertFalse(index.add_event(event))
+        self.assertEqual(1, len(index))
+
+        token_data = _sample_blank_token()
+        token_data['user_id'] = event.user_id
+        self.assertTrue(revoke_model.is_revoked(index, token_data))
+
+        index.remove_event(event)
+        self.assertEqual(0, len(index))
+        self.assertFalse(revoke_model.is_revoked(index, token_data))
+
+    def test_index_remove_event_while_checking(self):
+        index = revoke_model.RevokeIndex()
+        user_id = _new_id()
+        events = [revoke_model.RevokeEvent(user_id=user_id, project_id=x)
+                  for x in (_new_id(), _new_id())]
+        for event in events:
+            index.add_event(event)
+
+        # An event removed while a token is being checked doesn't make the
+        # check skip the events after it.
+        token_data = _sample_blank_token()
+        token_data['user_id'] = user_id
+        candidates = index.candidates(token_data)
+        self.assertIs(events[0], next(candidates))
+        index.remove_event(events[0])
+        self.assertEqual([events[1]], list(candidates))
+
     def _assertEmpty(self, collection):
         return self.assertEqual(0, len(collection), "collection not empty")
 
@@ -510,3 +667,56 @@ class RevokeListTests(unit.TestCase):
         for event in self.events:
             remove_event(self.revoke_events, event)
         self._assertEmpty(self.revoke_events)
+
+
+class RevokeEventEncodingTests(unit.BaseTestCase):
+
+    def _assertEventsEqual(self, expected, actual):
+        for name in revoke_model.REVOKE_KEYS + ['domain_scope_id']:
+            self.assertEqual(getattr(expected, name), getattr(actual, name))
+
+    def _sample_events(self):
+        revoked_at = timeutils.utcnow()
+        return [
+            revoke_model.RevokeEvent(user_id=_new_id()),
+            revoke_model.RevokeEvent(domain_id=_new_id(),
+                                     expires_at=_future_time()),
+            revoke_model.RevokeEvent(domain_id=_new_id(), role_id=_new_id()),
+            revoke_model.RevokeEvent(audit_chain_id=_new_id(),
+                                     project_id=_new_id(),
+                                     revoked_at=revoked_at,
+                                     issued_before=_past_time()),
+            revoke_model.RevokeEvent(
+                trust_id=u'\u0442\u0440\u0430\u0441\u0442',
+                consumer_id=_new_id(),
+                access_token_id=_new_id()),
+        ]
+
+    def test_pack_and_unpack(self):
+        for event in self._sample_events():
+            self._assertEventsEqual(
+                event,
+                revoke_model.unpack_event(revoke_model.pack_event(event)))
+
+    def test_pickle(self):
+        for event in self._sample_events():
+            for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+                self._assertEventsEqual(
+                    event, pickle.loads(pickle.dumps(event, protocol)))
+
+    def test_msgpack_handler(self):
+        events = self._sample_events()
+        unpacked = msgpackutils.loads(msgpackutils.dumps(events))
+        for event, unpacked_event in zip(events, unpacked):
+            self._assertEventsEqual(event, unpacked_event)
+
+    def test_only_set_fields_are_packed(self):
+        event = revoke_model.RevokeEvent(user_id=_new_id())
+        # Header, then user_id and revoked_at; issued_before is implied.
+        self.assertEqual(3 + 2 + 32 + 8,
+                         len(revoke_model.pack_event(event)))
+
+    def test_unpack_unknown_version(self):
+        data = revoke_model.pack_event(revoke_model.RevokeEvent())
+        self.assertRaises(ValueError, revoke_model.unpack_event,
+                          b'\xff' + data[1:])
@@ -1462,6 +1462,64 @@ class SqlUpgradeTests(SqlMigrateBase):
                                  'created_at',
                                  'last_active_at'])
 
+    def test_migration_108_add_effective_assignment_tables(self):
+        self.upgrade(107)
+        self.assertTableDoesNotExist('effective_assignment_target')
+        self.assertTableDoesNotExist('effective_assignment')
+        self.upgrade(108)
+        self.assertTableColumns('effective_assignment_target',
+                                ['user_id',
+                                 'target_id',
+                                 'is_domain',
+                                 'build_token',
+                                 'created_at'])
+        self.assertTableColumns('effective_assignment',
+                                ['user_id',
+                                 'target_id',
+                                 'is_domain',
+                                 'role_id'])
+
+    def test_migration_109_add_lower_name_indexes(self):
+        self.upgrade(108)
+        self.upgrade(109)
+        if self.engine.name != 'postgresql':
+            # The indexes are only created on PostgreSQL
+            return
+        index_names = [row[0] for row in self.engine.execute(
+            'SELECT indexname FROM pg_indexes') if row[0].endswith('_lower')]
+        self.assertItemsEqual(['ix_local_user_name_lower',
+                               'ix_group_name_lower',
+                               'ix_project_name_lower',
+                               'ix_role_name_lower'],
+                              index_names)
+
+    def test_migration_110_add_ldap_replica_tables(self):
+        self.upgrade(109)
+        self.assertTableDoesNotExist('ldap_replica_user')
+        self.assertTableDoesNotExist('ldap_replica_group')
+        self.assertTableDoesNotExist('ldap_replica_membership')
+        self.assertTableDoesNotExist('ldap_replica_state')
+        self.upgrade(110)
+        self.assertTableColumns('ldap_replica_user',
+                                ['source_id',
+                                 'id',
+                                 'name',
+                                 'enabled',
+                                 'ref'])
+        self.assertTableColumns('ldap_replica_group',
+                                ['source_id',
+                                 'id',
+                                 'name',
+                                 'ref'])
+        self.assertTableColumns('ldap_replica_membership',
+                                ['source_id',
+                                 'user_id',
+                                 'group_id'])
+        self.assertTableColumns('ldap_replica_state',
+                                ['source_id',
+                                 'change_value',
+                                 'synced_at'])
+
 
 class MySQLOpportunisticUpgradeTestCase(SqlUpgradeTests):
     FIXTURE = test_base.MySQLOpportunisticFixture
@@ -1061,6 +1061,10 @@ class RoleAssignmentFailureTestCase(RoleAssignmentBaseTestCase):
                                   group_id=self.default_group_id,
                                   expected_status=http_client.BAD_REQUEST)
 
+    def test_get_role_assignments_with_marker(self):
+        self.get('/role_assignments?marker=%s' % self.default_user_id,
+                 expected_status=http_client.BAD_REQUEST)
+
 
 class RoleAssignmentDirectTestCase(RoleAssignmentBaseTestCase):
     """Class for testing direct assignments on /v3/role_assignments API.
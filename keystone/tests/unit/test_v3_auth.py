@@ -1485,6 +1485,36 @@ class TokenAPITests(object):
             headers={'X-Subject-Token': v3_token})
         self.assertValidProjectScopedTokenResponse(r, require_catalog=False)
 
+    def test_validate_tokens(self):
+        unscoped_token = self._get_unscoped_token()
+        project_scoped_token = self._get_project_scoped_token()
+        revoked_token = self._get_project_scoped_token()
+        self._revoke_token(revoked_token)
+        body = {'tokens': [unscoped_token, uuid.uuid4().hex,
+                           project_scoped_token, revoked_token]}
+        r = self.post('/auth/tokens/validate', body=body,
+                      expected_status=http_client.OK)
+        unscoped, invalid, project_scoped, revoked = r.result['tokens']
+        self.assertEqual(self.user['id'], unscoped['token']['user']['id'])
+        self.assertNotIn('project', unscoped['token'])
+        self.assertIsNone(invalid)
+        self.assertEqual(self.project_id,
+                         project_scoped['token']['project']['id'])
+        self.assertIn('catalog', project_scoped['token'])
+        self.assertIsNone(revoked)
+
+    def test_validate_tokens_nocatalog(self):
+        project_scoped_token = self._get_project_scoped_token()
+        r = self.post('/auth/tokens/validate?nocatalog',
+                      body={'tokens': [project_scoped_token]},
+                      expected_status=http_client.OK)
+        self.assertNotIn('catalog', r.result['tokens'][0]['token'])
+
+    def test_validate_tokens_with_invalid_body(self):
+        for tokens in ([], 'not-a-list', [None]):
+            self.post('/auth/tokens/validate', body={'tokens': tokens},
+                      expected_status=http_client.BAD_REQUEST)
+
     def test_is_admin_token_by_ids(self):
         self.config_fixture.config(
             group='resource',
@@ -2438,6 +2468,20 @@ class TestFernetTokenAPIs(test_v3.RestfulTestCase, TokenAPITests,
         self.assertLess(len(token), 255)
         return token
 
+    @unit.skip_if_cache_disabled('token')
+    def test_validate_tokens_builds_token_data_once_per_scope(self):
+        tokens = [self._get_project_scoped_token() for i in range(3)]
+        tokens.append(self._get_unscoped_token())
+        helper = self.token_provider_api.driver.v3_token_data_helper
+        with mock.patch.object(helper, 'get_token_data',
+                               wraps=helper.get_token_data) as get_data:
+            results = self.token_provider_api.validate_tokens(tokens)
+        self.assertEqual(2, get_data.call_count)
+        for token_id in tokens:
+            self.assertEqual(
+                self.token_provider_api.validate_v3_token(token_id),
+                results[token_id])
+
     def test_validate_tampered_unscoped_token_fails(self):
         unscoped_token = self._get_unscoped_token()
         tampered_token = (unscoped_token[:50] + uuid.uuid4().hex +
@@ -38,6 +38,7 @@ from keystone.contrib.federation import routers
 from keystone import exception
 from keystone.federation import controllers as federation_controllers
 from keystone.federation import idp as keystone_idp
+from keystone.federation import utils as mapping_utils
 from keystone import notifications
 from keystone.tests import unit
 from keystone.tests.unit import core
@@ -1645,6 +1646,21 @@ class FederatedTokenTests(test_v3.RestfulTestCase, FederatedSetupMixin):
         self.assertIsNotNone(r.headers.get('X-Subject-Token'))
         self.assertValidMappedUser(r.json['token'])
 
+    def test_evaluate_reuses_compiled_rules(self):
+        rule_processor = self.useFixture(fixtures.MockPatchObject(
+            mapping_utils, 'RuleProcessor',
+            side_effect=mapping_utils.RuleProcessor)).mock
+        assertion = mapping_fixtures.EMPLOYEE_ASSERTION
+        self.federation_api.evaluate(self.IDP, self.PROTOCOL, assertion)
+        self.federation_api.evaluate(self.IDP, self.PROTOCOL, assertion)
+        self.assertEqual(1, rule_processor.call_count)
+
+        # The rules are compiled again once the mapping is updated.
+        self.federation_api.update_mapping(self.mapping['id'],
+                                           {'rules': self.rules['rules']})
+        self.federation_api.evaluate(self.IDP, self.PROTOCOL, assertion)
+        self.assertEqual(2, rule_processor.call_count)
+
     def test_issue_unscoped_token_disabled_idp(self):
         """Check if authentication works with disabled identity providers.
 
@@ -17,6 +17,7 @@ import datetime
 
 import freezegun
 from oslo_serialization import jsonutils
+from six.moves import http_client
 from six.moves import range
 
 import keystone.conf
@@ -446,3 +447,69 @@ class IdentityTestListLimitCase(IdentityTestFilteredCase):
         r = self.get('/services', auth=self.auth)
         self.assertEqual(10, len(r.result.get('services')))
         self.assertIsNone(r.result.get('truncated'))
+
+    def _test_entity_list_pagination(self, entity):
+        """GET /<entities>?limit=3, then follow the next links.
+
+        Test Plan:
+
+        - Update policy for no protection on api
+        - Ask for pages of 3 entities, following the next link of each page
+          until a page is not truncated
+        - Check that every entity is listed once, in order of ID
+
+        """
+        if entity == 'policy':
+            plural = 'policies'
+        else:
+            plural = '%ss' % entity
+
+        self._set_policy({"identity:list_%s" % plural: []})
+        url = '/%s?limit=3' % plural
+        pages = []
+        while url:
+            r = self.get(url, auth=self.auth)
+            page = self._get_id_list_from_ref_list(r.result.get(plural))
+            self.assertLessEqual(len(page), 3)
+            pages.append(page)
+            next_url = r.result['links']['next']
+            if r.result.get('truncated'):
+                self.assertIsNotNone(next_url)
+                url = next_url.split('/v3', 1)[1]
+            else:
+                self.assertIsNone(next_url)
+                url = None
+
+        self.assertGreater(len(pages), 1)
+        id_list = [entity_id for page in pages for entity_id in page]
+        self.assertEqual(sorted(id_list), id_list)
+        self.assertEqual(len(set(id_list)), len(id_list))
+        r = self.get('/%s' % plural, auth=self.auth)
+        self.assertEqual(
+            sorted(self._get_id_list_from_ref_list(r.result.get(plural))),
+            id_list)
+
+    def test_users_list_pagination(self):
+        self._test_entity_list_pagination('user')
+
+    def test_projects_list_pagination(self):
+        self._test_entity_list_pagination('project')
+
+    def test_non_driver_list_pagination(self):
+        """Check lists can be paginated without driver level support."""
+        self._test_entity_list_pagination('policy')
+
+    def test_list_limit_smaller_than_list_limit_config(self):
+        self._set_policy({"identity:list_services": []})
+        self.config_fixture.config(list_limit=5)
+        r = self.get('/services?limit=2', auth=self.auth)
+        self.assertEqual(2, len(r.result.get('services')))
+        self.assertIs(r.result.get('truncated'), True)
+        r = self.get('/services?limit=8', auth=self.auth)
+        self.assertEqual(5, len(r.result.get('services')))
+
+    def test_invalid_limit(self):
+        self._set_policy({"identity:list_services": []})
+        for limit in ('0', '-1', 'abc'):
+            self.get('/services?limit=%s' % limit, auth=self.auth,
+                     expected_status=http_client.BAD_REQUEST)
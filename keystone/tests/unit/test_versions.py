@@ -181,6 +181,9 @@ FEDERATED_IDP_SPECIFIC_WEBSSO = ('/auth/OS-FEDERATION/identity_providers/'
 V3_JSON_HOME_RESOURCES = {
     json_home.build_v3_resource_relation('auth_tokens'): {
         'href': '/auth/tokens'},
+    json_home.build_v3_resource_relation('auth_tokens_validate'): {
+        'href': '/auth/tokens/validate',
+        'hints': {'status': 'experimental'}},
     json_home.build_v3_resource_relation('auth_catalog'): {
         'href': '/auth/catalog'},
     json_home.build_v3_resource_relation('auth_projects'): {
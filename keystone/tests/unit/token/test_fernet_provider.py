@@ -16,6 +16,8 @@ import hashlib
 import os
 import uuid
 
+import fixtures
+import mock
 import msgpack
 from oslo_utils import timeutils
 from six.moves import urllib
@@ -213,6 +215,103 @@ class TestValidate(unit.TestCase):
         self.assertRaises(exception.TokenNotFound,
                           self.token_provider_api.validate_v3_token, token_id)
 
+    def test_validate_token_context_has_no_catalog(self):
+        domain_ref = unit.new_domain_ref()
+        domain_ref = self.resource_api.create_domain(domain_ref['id'],
+                                                     domain_ref)
+        user_ref = unit.new_user_ref(domain_ref['id'])
+        user_ref = self.identity_api.create_user(user_ref)
+        role_ref = unit.new_role_ref()
+        self.role_api.create_role(role_ref['id'], role_ref)
+        self.assignment_api.create_grant(role_ref['id'],
+                                         user_id=user_ref['id'],
+                                         domain_id=domain_ref['id'])
+
+        token_id, token_data_ = self.token_provider_api.issue_v3_token(
+            user_ref['id'], ['password'], domain_id=domain_ref['id'])
+
+        with mock.patch.object(self.catalog_api,
+                               'get_v3_catalog') as get_v3_catalog:
+            token_data = self.token_provider_api.validate_token_context(
+                token_id)
+            self.assertFalse(get_v3_catalog.called)
+
+        token = token_data['token']
+        self.assertNotIn('catalog', token)
+        self.assertEqual(user_ref['id'], token['user']['id'])
+        self.assertEqual(domain_ref['id'], token['domain']['id'])
+        self.assertEqual([role_ref['id']], [r['id'] for r in token['roles']])
+
+        # The full token data is still built with the catalog.
+        token_data = self.token_provider_api.validate_token(token_id)
+        self.assertIn('catalog', token_data['token'])
+
+    def test_validate_token_context_revoked(self):
+        user_ref = unit.new_user_ref(CONF.identity.default_domain_id)
+        user_ref = self.identity_api.create_user(user_ref)
+        token_id, token_data_ = self.token_provider_api.issue_v3_token(
+            user_ref['id'], ['password'])
+        self.token_provider_api.validate_token_context(token_id)
+
+        self.token_provider_api.revoke_token(token_id)
+        self.assertRaises(exception.TokenNotFound,
+                          self.token_provider_api.validate_token_context,
+                          token_id)
+
+    def _create_project_scoped_user(self):
+        domain_id = CONF.identity.default_domain_id
+        user_ref = self.identity_api.create_user(unit.new_user_ref(domain_id))
+        project_ref = unit.new_project_ref(domain_id)
+        self.resource_api.create_project(project_ref['id'], project_ref)
+        role_ref = unit.new_role_ref()
+        self.role_api.create_role(role_ref['id'], role_ref)
+        self.assignment_api.create_grant(role_ref['id'],
+                                         user_id=user_ref['id'],
+                                         project_id=project_ref['id'])
+        return user_ref, project_ref, role_ref
+
+    @unit.skip_if_cache_disabled('token')
+    def test_validate_tokens_of_same_scope_builds_token_data_once(self):
+        user_ref, project_ref, role_ref = self._create_project_scoped_user()
+        token_ids = [
+            self.token_provider_api.issue_v3_token(
+                user_ref['id'], ['password'], project_id=project_ref['id'])[0]
+            for _ in range(2)]
+
+        helper = self.token_provider_api.driver.v3_token_data_helper
+        with mock.patch.object(helper, 'get_token_data',
+                               wraps=helper.get_token_data) as get_token_data:
+            tokens = [self.token_provider_api.validate_v3_token(token_id)
+                      for token_id in token_ids]
+            self.assertEqual(1, get_token_data.call_count)
+
+        self.assertNotEqual(tokens[0]['token']['audit_ids'],
+                            tokens[1]['token']['audit_ids'])
+        for token in tokens:
+            self.assertEqual(['password'], token['token']['methods'])
+            self.assertEqual(project_ref['id'],
+                             token['token']['project']['id'])
+
+    def test_new_grant_is_in_tokens_of_cached_scope(self):
+        user_ref, project_ref, role_ref = self._create_project_scoped_user()
+        token_id = self.token_provider_api.issue_v3_token(
+            user_ref['id'], ['password'], project_id=project_ref['id'])[0]
+        token = self.token_provider_api.validate_v3_token(token_id)
+        self.assertEqual([role_ref['id']],
+                         [r['id'] for r in token['token']['roles']])
+
+        other_role_ref = unit.new_role_ref()
+        self.role_api.create_role(other_role_ref['id'], other_role_ref)
+        self.assignment_api.create_grant(other_role_ref['id'],
+                                         user_id=user_ref['id'],
+                                         project_id=project_ref['id'])
+
+        token_id = self.token_provider_api.issue_v3_token(
+            user_ref['id'], ['password'], project_id=project_ref['id'])[0]
+        token = self.token_provider_api.validate_v3_token(token_id)
+        self.assertItemsEqual([role_ref['id'], other_role_ref['id']],
+                              [r['id'] for r in token['token']['roles']])
+
 
 class TestTokenFormatter(unit.TestCase):
     def setUp(self):
@@ -610,3 +709,61 @@ class TestLoadKeys(unit.TestCase):
         keys = fernet_utils.load_keys()
         self.assertEqual(2, len(keys))
         self.assertTrue(len(keys[0]))
+
+
+class TestLoadMultiFernet(unit.TestCase):
+    def setUp(self):
+        super(TestLoadMultiFernet, self).setUp()
+        self.useFixture(ksfixtures.KeyRepository(self.config_fixture))
+        self.config_fixture.config(group='fernet_tokens',
+                                   key_repository_check_interval=3600)
+
+    def test_keys_are_loaded_once(self):
+        crypto = fernet_utils.load_multi_fernet()
+        with mock.patch.object(fernet_utils, 'load_keys') as load_keys:
+            self.assertIs(crypto, fernet_utils.load_multi_fernet())
+            self.assertIs(crypto, fernet_utils.load_multi_fernet())
+        self.assertFalse(load_keys.called)
+
+    def test_keys_are_reloaded_after_rotation(self):
+        crypto = fernet_utils.load_multi_fernet()
+        token = crypto.encrypt(b'payload')
+        fernet_utils.rotate_keys()
+        new_crypto = fernet_utils.load_multi_fernet()
+        self.assertIsNot(crypto, new_crypto)
+        # The old primary key is still a secondary key.
+        self.assertEqual(b'payload', new_crypto.decrypt(token))
+
+    def test_keys_are_reloaded_when_repository_changes(self):
+        self.config_fixture.config(group='fernet_tokens',
+                                   key_repository_check_interval=0)
+        crypto = fernet_utils.load_multi_fernet()
+        with mock.patch.object(fernet_utils._KeyCache, '_signature_of',
+                               return_value=('changed',)):
+            self.assertIsNot(crypto, fernet_utils.load_multi_fernet())
+
+    def test_keys_are_reloaded_when_key_is_rewritten_in_place(self):
+        self.config_fixture.config(group='fernet_tokens',
+                                   key_repository_check_interval=0)
+        crypto = fernet_utils.load_multi_fernet()
+        key_file = os.path.join(CONF.fernet_tokens.key_repository, '0')
+        stat_info = os.stat(key_file)
+        with open(key_file, 'w') as f:
+            f.write(base64.urlsafe_b64encode(os.urandom(32)).decode('utf-8'))
+        # Make sure the modification time changes even on file systems with
+        # a coarse timestamp resolution.
+        os.utime(key_file, (stat_info.st_atime, stat_info.st_mtime + 10))
+        self.assertIsNot(crypto, fernet_utils.load_multi_fernet())
+
+    def test_keys_are_reloaded_when_repository_is_reconfigured(self):
+        crypto = fernet_utils.load_multi_fernet()
+        self.useFixture(ksfixtures.KeyRepository(self.config_fixture))
+        self.assertIsNot(crypto, fernet_utils.load_multi_fernet())
+
+    def test_empty_repository_is_not_cached(self):
+        self.config_fixture.config(group='fernet_tokens',
+                                   key_repository=self.useFixture(
+                                       fixtures.TempDir()).path)
+        self.assertIsNone(fernet_utils.load_multi_fernet())
+        fernet_utils.initialize_key_repository()
+        self.assertIsNotNone(fernet_utils.load_multi_fernet())
@@ -46,10 +46,23 @@ MEMOIZE_TOKENS = cache.get_memoization_decorator(
     group='token',
     region=TOKENS_REGION)
 
+# This builds a discrete cache region for the parts of the token data that
+# only depend on the scope of a token, such as its roles and catalog, so they
+# are shared between all the tokens with the same scope. Any change to what
+# they are built from invalidates the entire region.
+TOKEN_SCOPE_REGION = oslo_cache.create_region()
+MEMOIZE_TOKEN_SCOPE = cache.get_memoization_decorator(
+    group='token',
+    region=TOKEN_SCOPE_REGION)
+
 # NOTE(morganfainberg): This is for compatibility in case someone was relying
 # on the old location of the UnsupportedTokenVersionException for their code.
 UnsupportedTokenVersionException = exception.UnsupportedTokenVersionException
 
+# Exceptions that make a single token invalid when validating tokens in bulk.
+INVALID_TOKEN_EXCEPTIONS = (exception.NotFound, exception.Unauthorized,
+                            exception.Forbidden)
+
 # supported token versions
 V2 = token_model.V2
 V3 = token_model.V3
@@ -177,6 +190,38 @@ class Manager(manager.Manager):
                 notifications.register_event_callback(event, resource_type,
                                                       callback_fns)
 
+        # Anything the scope-derived token data is built from.
+        scope_callbacks = {
+            notifications.ACTIONS.created: [
+                'region', 'service', 'endpoint',
+            ],
+            notifications.ACTIONS.updated: [
+                'user', 'group', 'project', 'domain', 'role',
+                'region', 'service', 'endpoint',
+            ],
+            notifications.ACTIONS.deleted: [
+                'user', 'group', 'project', 'domain', 'role',
+                'region', 'service', 'endpoint',
+                'OS-TRUST:trust', 'OS-OAUTH1:consumer',
+                'OS-OAUTH1:access_token',
+            ],
+            notifications.ACTIONS.disabled: [
+                'user', 'project', 'domain',
+            ],
+            notifications.ACTIONS.internal: [
+                notifications.INVALIDATE_USER_TOKEN_PERSISTENCE,
+                notifications.INVALIDATE_USER_PROJECT_TOKEN_PERSISTENCE,
+                notifications.INVALIDATE_COMPUTED_ASSIGNMENTS,
+                notifications.INVALIDATE_COMPUTED_CATALOG,
+            ],
+        }
+
+        callback = self._invalidate_token_scope_callback
+        for event, resource_types in scope_callbacks.items():
+            for resource_type in resource_types:
+                notifications.register_event_callback(event, resource_type,
+                                                      callback)
+
     @property
     def _needs_persistence(self):
         return self.driver.needs_persistence()
@@ -292,6 +337,77 @@ class Manager(manager.Manager):
             LOG.debug('Unable to validate token: %s', e)
             raise exception.TokenNotFound(token_id=token_id)
 
+    def validate_tokens(self, token_ids):
+        """Validate several v3 tokens at once.
+
+        Non-persistent tokens share the cached roles, catalog and the rest
+        of the token body of their scope, so it is only built once for all
+        the tokens carrying it. Expiry and revocation are then checked for
+        each token against the indexed revocation events.
+
+        :param token_ids: list of token IDs
+        :returns: a dict mapping each token ID to its token data, or to None
+                  if the token is not valid
+
+        """
+        results = {}
+        if self._needs_persistence:
+            for token_id in token_ids:
+                try:
+                    results[token_id] = self.validate_v3_token(token_id)
+                except INVALID_TOKEN_EXCEPTIONS as e:
+                    LOG.debug('Unable to validate token: %s', e)
+                    results[token_id] = None
+            return results
+
+        results.update(self.driver.validate_non_persistent_tokens(
+            [token_id for token_id in token_ids if token_id]))
+        for token_id in token_ids:
+            token_data = results.get(token_id)
+            if token_data is None:
+                results[token_id] = None
+                continue
+            try:
+                self._is_valid_token(token_data)
+            except exception.TokenNotFound as e:
+                LOG.debug('Unable to validate token: %s', e)
+                results[token_id] = None
+        return results
+
+    def validate_token_context(self, token_id):
+        """Validate a token for building the auth context of a request.
+
+        The token data is the same as validate_token returns, except that
+        non-persistent tokens are rebuilt without the service catalog, which
+        the auth context doesn't need. It is cached apart from the full token
+        data, so tokens used on keystone's own API never pay for building the
+        catalog.
+
+        :param token_id: the token id
+        :returns: token data
+        :raises keystone.exception.TokenNotFound: If the token is invalid.
+
+        """
+        if self._needs_persistence:
+            # Persisted token data is stored whole, so there is nothing to
+            # save by leaving the catalog out.
+            return self.validate_token(token_id)
+        token = self._validate_token_context(token_id)
+        self._is_valid_token(token)
+        return token
+
+    @MEMOIZE_TOKENS
+    def _validate_token_context(self, token_id):
+        if not token_id:
+            raise exception.TokenNotFound(_('No token in the request'))
+
+        try:
+            return self.driver.validate_non_persistent_token(
+                token_id, include_catalog=False)
+        except exception.Unauthorized as e:
+            LOG.debug('Unable to validate token: %s', e)
+            raise exception.TokenNotFound(token_id=token_id)
+
     @MEMOIZE_TOKENS
     def validate_non_persistent_token(self, token_id):
         return self.driver.validate_non_persistent_token(token_id)
@@ -440,6 +556,7 @@ class Manager(manager.Manager):
         # tokens, but we include the invalidation in case this ever changes
         # in the future.
         self.validate_non_persistent_token.invalidate(self, token_id)
+        self._validate_token_context.invalidate(self, token_id)
 
     def revoke_token(self, token_id, revoke_chain=False):
         token_ref = token_model.KeystoneToken(
@@ -462,6 +579,10 @@ class Manager(manager.Manager):
     def list_revoked_tokens(self):
         return self._persistence.list_revoked_tokens()
 
+    def _invalidate_token_scope_callback(self, service, resource_type,
+                                         operation, payload):
+        TOKEN_SCOPE_REGION.invalidate()
+
     def _trust_deleted_event_callback(self, service, resource_type, operation,
                                       payload):
         if CONF.token.revoke_by_id:
@@ -597,16 +718,39 @@ class Provider(object):
         raise exception.NotImplemented()  # pragma: no cover
 
     @abc.abstractmethod
-    def validate_non_persistent_token(self, token_id):
+    def validate_non_persistent_token(self, token_id, include_catalog=True):
         """Validate a given non-persistent token id and return the token_data.
 
         :param token_id: the token id
         :type token_id: string
+        :param include_catalog: optional, include the catalog in token data
+        :type include_catalog: boolean
         :returns: token data
         :raises keystone.exception.TokenNotFound: When the token is invalid
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def validate_non_persistent_tokens(self, token_ids):
+        """Validate several non-persistent token ids at once.
+
+        Providers may override this to share work between tokens, the default
+        implementation validates each token on its own.
+
+        :param token_ids: the token ids
+        :type token_ids: list
+        :returns: a dict mapping each token id to its token data, or to None
+                  if the token is invalid
+        """
+        results = {}
+        for token_id in token_ids:
+            try:
+                results[token_id] = self.validate_non_persistent_token(
+                    token_id)
+            except INVALID_TOKEN_EXCEPTIONS as e:
+                LOG.debug('Unable to validate token: %s', e)
+                results[token_id] = None
+        return results
+
     @abc.abstractmethod
     def validate_v3_token(self, token_ref):
         """Validate the given V3 token and return the token_data.
@@ -297,7 +297,7 @@ class V3TokenDataHelper(object):
         if project_id:
             roles = self.assignment_api.get_roles_for_user_and_project(
                 user_id, project_id)
-        return [self.role_api.get_role(role_id) for role_id in roles]
+        return self.role_api.get_roles(roles)
 
     def populate_roles_for_federated_user(self, token_data, group_ids,
                                           project_id=None, domain_id=None,
@@ -763,17 +763,55 @@ class BaseProvider(provider.Provider):
             token_id = token_ref['token_data']['access']['token']['id']
             raise exception.TokenNotFound(token_id=token_id)
 
-    def validate_non_persistent_token(self, token_id):
+    def validate_non_persistent_token(self, token_id, include_catalog=True):
         try:
-            (user_id, methods, audit_ids, domain_id, project_id, trust_id,
-                federated_info, access_token_id, created_at, expires_at) = (
-                    self.token_formatter.validate_token(token_id))
+            token_values = self.token_formatter.validate_token(token_id)
         except exception.ValidationError as e:
             raise exception.TokenNotFound(e)
+        return self._build_non_persistent_token_data(
+            *token_values, include_catalog=include_catalog)
+
+    def _build_non_persistent_token_data(self, user_id, methods, audit_ids,
+                                         domain_id, project_id, trust_id,
+                                         federated_info, access_token_id,
+                                         created_at, expires_at,
+                                         include_catalog=True):
+        scope = self._non_persistent_token_scope(
+            user_id, methods, audit_ids, domain_id, project_id, trust_id,
+            federated_info, access_token_id, created_at, expires_at)
+        # The memoization key can only be built from positional arguments.
+        scope_data = self._get_non_persistent_token_scope_data(
+            *(scope + (include_catalog,)))
+
+        # The scope data is shared by every token with the same scope, so
+        # it is copied before the values of this token are set.
+        token_data = dict(scope_data['token'])
+        token_data['methods'] = methods
+        token_data['audit_ids'] = audit_ids
+        token_data['issued_at'] = created_at
+        token_data['expires_at'] = expires_at
+        return {'token': token_data}
+
+    @provider.MEMOIZE_TOKEN_SCOPE
+    def _get_non_persistent_token_scope_data(self, user_id, domain_id,
+                                             project_id, trust_id,
+                                             access_token_id, federation_key,
+                                             include_catalog):
+        """Build the part of the token data that only depends on its scope.
 
+        This covers the user, scope, roles, catalog and service providers,
+        which are what makes rebuilding a token expensive. The methods, audit
+        IDs and dates of the token are left to the caller.
+
+        """
         token_dict = None
         trust_ref = None
-        if federated_info:
+        if federation_key:
+            idp_id, protocol_id, group_ids = federation_key
+            federated_info = {'idp_id': idp_id,
+                              'protocol_id': protocol_id,
+                              'group_ids': [{'id': group_id}
+                                            for group_id in group_ids]}
             # NOTE(lbragstad): We need to rebuild information about the
             # federated token as well as the federated token roles. This is
             # because when we validate a non-persistent token, we don't have a
@@ -795,15 +833,49 @@ class BaseProvider(provider.Provider):
 
         return self.v3_token_data_helper.get_token_data(
             user_id,
-            method_names=methods,
+            method_names=[],
             domain_id=domain_id,
             project_id=project_id,
-            issued_at=created_at,
-            expires=expires_at,
             trust=trust_ref,
             token=token_dict,
+            include_catalog=include_catalog,
             access_token=access_token,
-            audit_info=audit_ids)
+            audit_info=[])
+
+    @staticmethod
+    def _non_persistent_token_scope(user_id, methods, audit_ids, domain_id,
+                                    project_id, trust_id, federated_info,
+                                    access_token_id, created_at, expires_at):
+        """Return the part of a token's values its token body depends on."""
+        federation_key = None
+        if federated_info:
+            federation_key = (
+                federated_info['idp_id'],
+                federated_info['protocol_id'],
+                tuple(sorted(g['id'] for g in federated_info['group_ids'])))
+        return (user_id, domain_id, project_id, trust_id, access_token_id,
+                federation_key)
+
+    def validate_non_persistent_tokens(self, token_ids):
+        """Validate several non-persistent token ids at once.
+
+        Each token is built like :meth:`validate_non_persistent_token` does,
+        so the body shared by the tokens of a scope is read from the scope
+        cache after the first one.
+
+        :returns: a dict mapping each token ID to its token data, or to None
+                  if the token is not valid
+
+        """
+        results = {}
+        for token_id in token_ids:
+            try:
+                results[token_id] = self.validate_non_persistent_token(
+                    token_id)
+            except provider.INVALID_TOKEN_EXCEPTIONS as e:
+                LOG.debug('Unable to validate token: %s', e)
+                results[token_id] = None
+        return results
 
     def validate_v3_token(self, token_ref):
         # FIXME(gyee): performance or correctness? Should we return the
@@ -56,14 +56,16 @@ class TokenFormatter(object):
         This @property just needs to return an object that implements
         ``encrypt(plaintext)`` and ``decrypt(ciphertext)``.
 
+        The keys are loaded once per process and only reloaded when the key
+        repository changes, see :func:`utils.load_multi_fernet`.
+
         """
-        keys = utils.load_keys()
+        crypto = utils.load_multi_fernet()
 
-        if not keys:
+        if crypto is None:
             raise exception.KeysNotFound()
 
-        fernet_instances = [fernet.Fernet(key) for key in keys]
-        return fernet.MultiFernet(fernet_instances)
+        return crypto
 
     def pack(self, payload):
         """Pack a payload for transport as a token.
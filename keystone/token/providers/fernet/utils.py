@@ -12,6 +12,8 @@
 
 import os
 import stat
+import threading
+import time
 
 from cryptography import fernet
 from oslo_log import log
@@ -132,6 +134,7 @@ def _create_new_key(keystone_user_id, keystone_group_id):
             os.setegid(old_egid)
 
     LOG.info(_LI('Created a new key: %s'), key_file)
+    invalidate_key_cache()
 
 
 def initialize_key_repository(keystone_user_id=None, keystone_group_id=None):
@@ -220,6 +223,7 @@ def rotate_keys(keystone_user_id=None, keystone_group_id=None):
         key_to_purge = key_files[index_to_purge]
         LOG.info(_LI('Excess key to purge: %s'), key_to_purge)
         os.remove(key_to_purge)
+    invalidate_key_cache()
 
 
 def load_keys():
@@ -262,3 +266,95 @@ def load_keys():
 
     # return the encryption_keys, sorted by key number, descending
     return [keys[x] for x in sorted(keys.keys(), reverse=True)]
+
+
+class _KeyCache(object):
+    """Process-wide cache of the keys in the key repository.
+
+    The keys are reloaded from disk only when the configured repository
+    changes, when the repository directory or any file in it changes, or
+    after :func:`invalidate_key_cache`. The repository is stat'ed at most
+    once every `[fernet_tokens] key_repository_check_interval` seconds.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.invalidate()
+
+    def invalidate(self):
+        self._repository = None
+        self._signature = None
+        self._next_check = 0
+        self._crypto = None
+
+    @staticmethod
+    def _signature_of(repository):
+        try:
+            stat_info = os.stat(repository)
+            filenames = os.listdir(repository)
+        except OSError:
+            return None
+        # A key file can be rewritten in place, which doesn't change the
+        # directory, so each file is part of the signature too.
+        files = []
+        for filename in sorted(filenames):
+            try:
+                file_info = os.stat(os.path.join(repository, filename))
+            except OSError:  # nosec : the file was removed, ignore it.
+                continue
+            files.append((filename, file_info.st_ino, file_info.st_mtime,
+                          file_info.st_size))
+        return (stat_info.st_ino, stat_info.st_mtime, tuple(files))
+
+    def _reload(self, repository, signature):
+        keys = load_keys()
+        if not keys:
+            # Never cache an empty key repository, so keys are picked up as
+            # soon as the repository is initialized.
+            self.invalidate()
+            return None
+        self._crypto = fernet.MultiFernet(
+            [fernet.Fernet(key) for key in keys])
+        self._repository = repository
+        self._signature = signature
+        return self._crypto
+
+    def get(self):
+        repository = CONF.fernet_tokens.key_repository
+        now = time.time()
+        crypto = self._crypto
+        if (crypto is not None and repository == self._repository and
+                now < self._next_check):
+            return crypto
+
+        with self._lock:
+            crypto = self._crypto
+            signature = self._signature_of(repository)
+            if (crypto is None or repository != self._repository or
+                    signature != self._signature):
+                crypto = self._reload(repository, signature)
+            if crypto is not None:
+                self._next_check = (
+                    now + CONF.fernet_tokens.key_repository_check_interval)
+            return crypto
+
+
+_KEY_CACHE = _KeyCache()
+
+
+def load_multi_fernet():
+    """Return a MultiFernet for the keys in the key repository.
+
+    The result is cached for the whole process, see :class:`_KeyCache`.
+
+    :returns: a ``cryptography.fernet.MultiFernet`` instance, or None if the
+              key repository contains no keys
+
+    """
+    return _KEY_CACHE.get()
+
+
+def invalidate_key_cache():
+    """Force the keys to be reloaded from disk the next time they are used."""
+    _KEY_CACHE.invalidate()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compare LDAP identity driver reads with pipelined searches.
+
+Creates users with enabled emulation in the fake LDAP server used by the
+tests, makes the server take ``--latency`` milliseconds to answer each
+search, and reports the time taken with each ``[ldap] search_pipeline_depth``
+in ``--depths`` to:
+
+* ``list``: list all the users. The members of the enabled emulation group
+  are read with one search, so there is nothing to pipeline and this is a
+  baseline that the depth shouldn't change,
+* ``from_ids``: look up all the users by ID, which also searches for the IDs
+  ``ID_FILTER_CHUNK_SIZE`` at a time.
+
+A depth of one sends the searches one at a time, as the driver did before
+searches were pipelined.
+
+Usage: python tools/benchmark_ldap_pipeline.py [--users N] [--latency MS]
+                                               [--depths N,N,...]
+                                               [--rounds N] [--pool]
+
+"""
+
+import argparse
+import sys
+import timeit
+import uuid
+
+from keystone.common import driver_hints
+import keystone.conf
+from keystone.identity.backends.ldap import common as common_ldap
+from keystone.identity.backends.ldap import core as ldap_identity
+from keystone.tests.unit import fakeldap
+
+
+CONF = keystone.conf.CONF
+
+
+def configure(depths, pool):
+    keystone.conf.configure()
+    CONF([], project='keystone', default_config_files=[])
+    CONF.set_override('user', 'cn=Admin', group='ldap')
+    CONF.set_override('password', 'password', group='ldap')
+    CONF.set_override('suffix', 'cn=example,cn=com', group='ldap')
+    CONF.set_override('user_enabled_emulation', True, group='ldap')
+    if pool:
+        common_ldap.PooledLDAPHandler.Connector = fakeldap.FakeLdapPool
+        CONF.set_override('url', 'fakepool://memory', group='ldap')
+        CONF.set_override('use_pool', True, group='ldap')
+        # Keep a connection for the searches that aren't pipelined.
+        CONF.set_override('pool_size', max(depths) + 1, group='ldap')
+    else:
+        common_ldap.register_handler('fake://', fakeldap.FakeLdap)
+        CONF.set_override('url', 'fake://memory', group='ldap')
+
+
+def populate(driver, users):
+    user_ids = []
+    for _ in range(users):
+        user_id = uuid.uuid4().hex
+        driver.user.create({'id': user_id, 'name': user_id, 'enabled': True})
+        user_ids.append(user_id)
+    return user_ids
+
+
+def measure(name, read_users, rounds):
+    count = len(read_users())
+    elapsed = min(timeit.repeat(read_users, number=1, repeat=rounds))
+    print('%-10s %8d users %10.1f ms' % (name, count, elapsed * 1000))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=2.0,
+                        help='milliseconds taken to answer each search')
+    parser.add_argument('--depths', default='1,4,16')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--pool', action='store_true',
+                        help='use the pooled LDAP handler')
+    args = parser.parse_args(argv)
+    depths = [int(depth) for depth in args.depths.split(',')]
+
+    configure(depths, args.pool)
+    driver = ldap_identity.Identity()
+    user_ids = populate(driver, args.users)
+
+    fakeldap.search_latency = args.latency / 1000
+    print('%d users, %.1f ms per search, best of %d rounds' %
+          (args.users, args.latency, args.rounds))
+    for depth in depths:
+        driver.user.search_pipeline_depth = depth
+        print('depth %d' % depth)
+        measure('list', lambda: driver.list_users(driver_hints.Hints()),
+                args.rounds)
+        measure('from_ids', lambda: driver.list_users_from_ids(user_ids),
+                args.rounds)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
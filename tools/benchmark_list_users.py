@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compare the time taken to list users with the SQL identity driver.
+
+Creates a database of local users, each with a history of passwords, and
+reports the time taken to list them all with:
+
+* ``eager``: a query that loads the local users and password histories with
+  subquery eager loading and serializes the whole user, as the driver did
+  before the password history was left out of reads,
+* ``driver``: ``Identity.list_users``.
+
+Usage: python tools/benchmark_list_users.py [--users N] [--passwords N]
+                                            [--rounds N] [--connection URL]
+
+The default connection is an in-memory SQLite database. Any other database
+must be empty.
+
+"""
+
+import argparse
+import datetime
+import sys
+import timeit
+import uuid
+
+from sqlalchemy import orm
+
+from keystone.common import driver_hints
+from keystone.common import sql
+import keystone.conf
+from keystone.identity.backends import base
+from keystone.identity.backends import sql as identity_sql
+from keystone.identity.backends import sql_model as model
+# Imported for the tables the identity tables have foreign keys to.
+from keystone.federation.backends import sql as federation_sql  # noqa
+
+
+CONF = keystone.conf.CONF
+
+_BATCH_SIZE = 1000
+
+
+def populate(users, passwords):
+    now = datetime.datetime.utcnow()
+    with sql.session_for_write() as session:
+        sql.ModelBase.metadata.create_all(session.get_bind())
+        local_user_id = 0
+        for start in range(0, users, _BATCH_SIZE):
+            user_rows = []
+            local_user_rows = []
+            password_rows = []
+            for _ in range(start, min(start + _BATCH_SIZE, users)):
+                user_id = uuid.uuid4().hex
+                local_user_id += 1
+                user_rows.append({'id': user_id, 'enabled': True,
+                                  'extra': {}, 'created_at': now})
+                local_user_rows.append({'id': local_user_id,
+                                        'user_id': user_id,
+                                        'domain_id': 'default',
+                                        'name': user_id})
+                for i in range(passwords):
+                    password_rows.append({
+                        'local_user_id': local_user_id,
+                        'password': uuid.uuid4().hex,
+                        'created_at': now + datetime.timedelta(seconds=i)})
+            session.execute(model.User.__table__.insert(), user_rows)
+            session.execute(model.LocalUser.__table__.insert(),
+                            local_user_rows)
+            if password_rows:
+                session.execute(model.Password.__table__.insert(),
+                                password_rows)
+
+
+def list_users_eager():
+    with sql.session_for_read() as session:
+        query = session.query(model.User).outerjoin(model.LocalUser)
+        query = query.options(
+            orm.subqueryload(model.User.local_user).subqueryload(
+                model.LocalUser.passwords),
+            orm.subqueryload(model.User.federated_users),
+            orm.subqueryload(model.User.nonlocal_users))
+        return [base.filter_user(ref.to_dict()) for ref in query]
+
+
+def measure(name, list_users, rounds):
+    count = len(list_users())
+    elapsed = min(timeit.repeat(list_users, number=1, repeat=rounds))
+    print('%-8s %8d users %10.1f ms' % (name, count, elapsed * 1000))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--passwords', type=int, default=3)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--connection', default='sqlite://')
+    args = parser.parse_args(argv)
+
+    keystone.conf.configure()
+    sql.initialize()
+    CONF([], project='keystone', default_config_files=[])
+    CONF.set_override('connection', args.connection, group='database')
+
+    populate(args.users, args.passwords)
+    print('%d users with %d passwords each, best of %d rounds' %
+          (args.users, args.passwords, args.rounds))
+    driver = identity_sql.Identity()
+    measure('eager', list_users_eager, args.rounds)
+    measure('driver', lambda: driver.list_users(driver_hints.Hints()),
+            args.rounds)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
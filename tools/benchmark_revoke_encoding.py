@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compare the cache encodings of revocation events.
+
+Builds a list of revocation events shaped like the ones keystone records
+(mostly user, audit id and grant revocations) and reports the encoded size and
+the time taken to encode and decode them with:
+
+* ``legacy``: the msgpack encoding of each event's attribute dict, as used by
+  the request local cache before events had a dense encoding,
+* ``packed``: ``revoke_model.pack_event``, which the request local cache and
+  pickle (used by memcached) now use,
+* ``pickle``: pickling the whole list, as dogpile's memcached backends do.
+
+Usage: python tools/benchmark_revoke_encoding.py [--events N] [--rounds N]
+
+"""
+
+import argparse
+import datetime
+import sys
+import timeit
+import uuid
+
+from oslo_serialization import msgpackutils
+from oslo_utils import timeutils
+from six.moves import cPickle as pickle
+
+from keystone.models import revoke_model
+
+
+def _new_id():
+    return uuid.uuid4().hex
+
+
+def build_events(count):
+    now = timeutils.utcnow()
+    expires_at = now + datetime.timedelta(hours=1)
+    shapes = [
+        lambda: revoke_model.RevokeEvent(user_id=_new_id()),
+        lambda: revoke_model.RevokeEvent(audit_id=_new_id()[:22]),
+        lambda: revoke_model.RevokeEvent(audit_chain_id=_new_id()[:22],
+                                         project_id=_new_id()),
+        lambda: revoke_model.RevokeEvent(user_id=_new_id(),
+                                         role_id=_new_id(),
+                                         project_id=_new_id()),
+        lambda: revoke_model.RevokeEvent(domain_id=_new_id(),
+                                         expires_at=expires_at),
+    ]
+    return [shapes[i % len(shapes)]() for i in range(count)]
+
+
+def legacy_dumps(event):
+    values = {name: getattr(event, name)
+              for name in revoke_model.REVOKE_KEYS + ['domain_scope_id']}
+    return msgpackutils.dumps(values)
+
+
+def legacy_loads(data):
+    return revoke_model.RevokeEvent(**msgpackutils.loads(data))
+
+
+def measure(name, events, dumps, loads, rounds, count=None):
+    count = count or len(events)
+    encoded = [dumps(e) for e in events]
+    size = sum(len(e) for e in encoded)
+    encode = min(timeit.repeat(lambda: [dumps(e) for e in events],
+                               number=1, repeat=rounds))
+    decode = min(timeit.repeat(lambda: [loads(e) for e in encoded],
+                               number=1, repeat=rounds))
+    print('%-8s %10d bytes %8.1f bytes/event %9.2f ms encode '
+          '%9.2f ms decode' % (name, size, float(size) / count,
+                               encode * 1000, decode * 1000))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--events', type=int, default=10000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    events = build_events(args.events)
+    print('%d events, best of %d rounds' % (len(events), args.rounds))
+    measure('legacy', events, legacy_dumps, legacy_loads, args.rounds)
+    measure('packed', events, revoke_model.pack_event,
+            revoke_model.unpack_event, args.rounds)
+    measure('pickle', [events],
+            lambda e: pickle.dumps(e, pickle.HIGHEST_PROTOCOL),
+            pickle.loads, args.rounds, count=len(events))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])